@@ -1,5 +1,14 @@
+import os
+import sys
 from flask import Flask
-from src.config import Config  # your config file
+
+# src/ modules import each other by top-level name (run.py does the same); importing
+# them as `src.x` as well would load every module, and its singletons, twice
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from config import Config  # your config file
 
 def create_app():
     app = Flask(__name__)
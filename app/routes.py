@@ -1,7 +1,24 @@
-from flask import Blueprint, render_template, redirect, url_for, jsonify, request, session, flash
-import subprocess, sys, os
+from flask import Blueprint, render_template, redirect, url_for, jsonify, request, session, flash, Response, stream_with_context, g, make_response
+import os
+import time
+import csv, io, json
+import functools
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from src.ticket_manager import fetch_all_tickets
+from ticket_manager import (
+    query_tickets, daily_summary, ticket_counts_by_day, iter_tickets,
+    ticket_store_version, ticket_preview_version, sync_ticket_mirror_in_background,
+)
+from ingest_supervisor import read_ingest_status
+from automation_runner import automation_runner
+from event_bus import event_bus
+from live_feed import live_feed
+from metrics import metrics
+from config import Config
+from log_pipeline import tail_lines, read_new_lines
 from werkzeug.security import check_password_hash, generate_password_hash
 import os
 
@@ -11,16 +28,161 @@ main = Blueprint("main", __name__)
 # 🔒 Login Configuration
 # ------------------------------
 ADMIN_USER = os.getenv("ADMIN_USER", "admin")
-ADMIN_PASS_HASH = os.getenv(
-    "ADMIN_PASS_HASH",
-    generate_password_hash(os.getenv("ADMIN_PASS", "password123"))
-)
+ADMIN_PASS_HASH = os.getenv("ADMIN_PASS_HASH")
+# Lets a Prometheus scraper read /api/metrics with "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+def admin_pass_hash():
+    # Hashing ADMIN_PASS is slow by design, so it happens on the first login, not at import
+    global ADMIN_PASS_HASH
+    if ADMIN_PASS_HASH is None:
+        ADMIN_PASS_HASH = generate_password_hash(os.getenv("ADMIN_PASS", "password123"))
+    return ADMIN_PASS_HASH
+
 
 # ------------------------------
-# 🧠 App State
+# ⏱ Request Timing
 # ------------------------------
-automation_process = None
-automation_running = False
+@main.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@main.after_request
+def _record_timing(response):
+    started = g.pop("request_started", None)
+    if started is not None and request.endpoint:
+        # Streamed responses are timed up to the first byte
+        metrics.observe(f"http_{request.endpoint.split('.')[-1]}", time.perf_counter() - started,
+                        error=response.status_code >= 500)
+    return response
+
+
+# ------------------------------
+# 🗜 Response Cache, ETags & Gzip
+# ------------------------------
+COMPRESSIBLE_TYPES = ("text/html", "application/json", "text/plain", "text/csv")
+# Changes when templates or this file change, so a deploy never revalidates an old page
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+RELEASE = str(max(
+    os.path.getmtime(os.path.join(TEMPLATES_DIR, name)) for name in os.listdir(TEMPLATES_DIR)
+) + os.path.getmtime(__file__))
+
+
+class PageCache:
+    """Rendered responses per query signature, least recently used dropped first."""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, etag):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["etag"] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+_page_cache = PageCache(Config.PAGE_CACHE_SIZE)
+
+
+def _accepts_gzip():
+    return request.accept_encodings["gzip"] > 0
+
+
+def _gzip_variant(body):
+    return gzip.compress(body, compresslevel=6) if len(body) >= Config.GZIP_MIN_BYTES else None
+
+
+def cached_view(vary=None):
+    """
+    Serve a dashboard view from a cache keyed on the query and the ticket-store
+    version (a counter the database bumps on every ticket change). The strong
+    ETag comes from the same inputs, so If-None-Match is answered with 304 from
+    a single SQLite read, before the view runs; the mirror refresh that might
+    call Google is started in the background instead of being waited for.
+    `vary()` returns anything else the page shows, e.g. the reader status.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            sync_ticket_mirror_in_background()
+            signature = (request.endpoint, tuple(sorted(request.args.items(multi=True))), vary() if vary else None)
+            etag = hashlib.sha1(repr((RELEASE, ticket_store_version(), signature)).encode()).hexdigest()
+            use_gzip = _accepts_gzip()
+
+            # A client that already has this version is answered without rendering anything,
+            # even when this worker has no copy of the page (fresh worker, evicted entry)
+            matched = next((tag for tag in (f"{etag}-gz", etag) if request.if_none_match.contains(tag)), None)
+            if matched:
+                response = Response(status=304)
+                response.set_etag(matched)
+                response.headers["Vary"] = "Accept-Encoding"
+                response.headers["Cache-Control"] = "private, no-cache"
+                metrics.inc("page_cache_not_modified")
+                return response
+
+            entry = _page_cache.get(signature, etag)
+            if entry is None:
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = {"etag": etag, "body": body, "gzip": _gzip_variant(body), "mimetype": response.mimetype}
+                _page_cache.put(signature, entry)
+                metrics.inc("page_cache_misses")
+            else:
+                metrics.inc("page_cache_hits")
+
+            compressed = use_gzip and entry["gzip"] is not None
+            response = Response(entry["gzip"] if compressed else entry["body"], mimetype=entry["mimetype"])
+            # Each encoding is its own representation and needs its own strong ETag
+            response.set_etag(f"{etag}-gz" if compressed else etag)
+            if compressed:
+                response.headers["Content-Encoding"] = "gzip"
+            response.headers["Vary"] = "Accept-Encoding"
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def _gzip_response(response):
+    """Gzip a large HTML/JSON response in place when the client accepts it."""
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_TYPES
+            or not _accepts_gzip()):
+        return response
+    compressed = _gzip_variant(response.get_data())
+    if compressed is None:
+        return response
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-gz")
+    return response
+
+
+@main.after_request
+def _compress(response):
+    """Gzip other large responses. Ones with an ETag were already compressed (or not)
+    before If-None-Match was checked, which must see the final ETag."""
+    if response.get_etag()[0]:
+        return response
+    return _gzip_response(response)
 
 
 # ------------------------------
@@ -45,7 +207,7 @@ def login():
         username = request.form.get("username")
         password = request.form.get("password")
 
-        if username == ADMIN_USER and check_password_hash(ADMIN_PASS_HASH, password):
+        if username == ADMIN_USER and check_password_hash(admin_pass_hash(), password):
             session["logged_in"] = True
             flash("Login successful!", "success")
             return redirect(url_for("main.index"))
@@ -66,33 +228,39 @@ def logout():
 # ------------------------------
 # 🏠 Dashboard (Protected)
 # ------------------------------
+@main.record_once
+def _start_reader_watchdog(state):
+    # Each web worker keeps an eye on the reader; launches are serialized between them
+    automation_runner.start_watchdog()
+
+
+def _reader_status():
+    """Reader status, read once per request however many places show it."""
+    if "reader_status" not in g:
+        g.reader_status = automation_runner.status()
+    return g.reader_status
+
+
+def _index_vary():
+    return _reader_status()["status"], datetime.now().strftime("%Y-%m-%d")
+
+
 @main.route("/")
 @login_required
+@cached_view(vary=_index_vary)
 def index():
     """Home + Dashboard combined"""
-    global automation_running
-    status = "🟢 Running" if automation_running else "🔴 Stopped"
+    status = _reader_status()["status"]
 
-    # Fetch ticket data
-    tickets = []
+    # Count today's tickets from the local mirror
+    today = datetime.now().strftime("%Y-%m-%d")
     try:
-        tickets = fetch_all_tickets()
+        summary = daily_summary(today)
     except Exception as e:
         print("Error fetching tickets:", e)
+        summary = {"total": 0, "open": 0, "closed": 0}
 
-    # Count tickets (daily summary)
-    today = datetime.now().strftime("%Y-%m-%d")
-    today_tickets = [t for t in tickets if t.get("timestamp", "").startswith(today)]
-    open_tickets = [t for t in today_tickets if t.get("status", "").lower() == "open"]
-    closed_tickets = [t for t in today_tickets if t.get("status", "").lower() == "closed"]
-
-    daily_summary = {
-        "total": len(today_tickets),
-        "open": len(open_tickets),
-        "closed": len(closed_tickets),
-    }
-
-    return render_template("index.html", status=status, summary=daily_summary)
+    return render_template("index.html", status=status, summary=summary)
 
 
 # ------------------------------
@@ -101,40 +269,170 @@ def index():
 @main.route("/start")
 @login_required
 def start():
-    global automation_process, automation_running
-    if not automation_running:
-        script_path = os.path.join(os.getcwd(), "src", "email_reader.py")
-        automation_process = subprocess.Popen([sys.executable, script_path])
-        automation_running = True
+    automation_runner.start()
     return redirect(url_for("main.index"))
 
 
 @main.route("/stop")
 @login_required
 def stop():
-    global automation_process, automation_running
-    if automation_running and automation_process:
-        try:
-            automation_process.terminate()
-        except Exception:
-            pass
-        automation_running = False
-        automation_process = None
+    automation_runner.stop()
     return redirect(url_for("main.index"))
 
 
+@main.route("/api/status")
+@login_required
+def api_status():
+    """
+    Reader liveness from the shared runner state (heartbeat + lock file).
+    Reader state is shared through SQLite, so every gunicorn worker gives the same answer.
+    """
+    state = automation_runner.status()
+    # The heartbeat age changes on every call; the ETag only follows what a client shows
+    return _conditional_json(state, etag_of={k: state[k] for k in ("state", "desired", "pid", "host", "started_at")})
+
+
+def _conditional_json(payload, etag_of=None):
+    """JSON response with an ETag, answered with 304 when the client's copy is current."""
+    response = jsonify(payload)
+    digest = hashlib.sha1(json.dumps(payload if etag_of is None else etag_of, sort_keys=True).encode()).hexdigest()
+    response.set_etag(digest, weak=etag_of is not None)
+    response.headers["Cache-Control"] = "no-cache"
+    return _gzip_response(response).make_conditional(request)
+
+
+# ------------------------------
+# 📡 Live Events (Protected)
+# ------------------------------
+def _sse(kind, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+@main.route("/api/events")
+@login_required
+def api_events():
+    """
+    Server-Sent Events: "status", "ticket" and "stats" as they happen, starting
+    with the current status and stats. Streams end after SSE_STREAM_SECONDS and
+    the browser reconnects on its own; /api/status and /api/stats serve clients
+    without EventSource.
+    """
+    # Each stream holds a worker thread until it ends; the slot is taken up front
+    # so concurrent requests cannot all pass the check
+    sub = event_bus.subscribe(limit=Config.SSE_MAX_CLIENTS)
+    if sub is None:
+        return jsonify({"error": "too many live connections; poll /api/status instead"}), 503
+    live_feed.start()
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            for kind, data in live_feed.snapshot():
+                yield _sse(kind, data)
+            deadline = time.monotonic() + Config.SSE_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                event = sub.get(timeout=min(Config.SSE_KEEPALIVE_SECONDS, max(0.0, deadline - time.monotonic())))
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield _sse(event[1], event[2], event[0])
+        finally:
+            event_bus.unsubscribe(sub)
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Also frees the slot when the client is gone before the stream started
+    response.call_on_close(lambda: event_bus.unsubscribe(sub))
+    return response
+
+
+@main.route("/api/metrics")
+def api_metrics():
+    """
+    Per-stage latency histograms, error rates and counters from this web process
+    and every reader process. JSON by default; ?format=prometheus for scraping.
+    """
+    token_ok = METRICS_TOKEN and request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}"
+    if not (session.get("logged_in") or token_ok):
+        return jsonify({"error": "login or metrics token required"}), 401
+    if request.args.get("format") == "prometheus":
+        return Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+    return jsonify(metrics.report())
+
+
+@main.route("/api/ingest")
+@login_required
+def api_ingest():
+    """Per-worker ingestion throughput reported by the supervisor."""
+    return jsonify(read_ingest_status() or {"workers": {}, "total_messages": 0})
+
+
+# ------------------------------
+# 🪵 Logs (Protected)
+# ------------------------------
+@main.route("/logs")
+@login_required
+def logs():
+    """Live view of automation.log"""
+    return render_template("logs.html")
+
+
+@main.route("/api/logs")
+@login_required
+def api_logs():
+    """
+    The last `lines` lines of the log (default 200), or with `cursor` only the
+    lines written since that cursor. Every response carries the cursor to send next.
+    """
+    count = max(1, min(request.args.get("lines", 200, type=int), 1000))
+    cursor = request.args.get("cursor")
+    try:
+        if cursor:
+            lines, cursor, reset = read_new_lines(Config.LOG_FILE, cursor, max_lines=count)
+        else:
+            (lines, cursor), reset = tail_lines(Config.LOG_FILE, count), True
+    except FileNotFoundError:
+        lines, cursor, reset = [], None, True
+    return jsonify({"lines": lines, "cursor": cursor, "reset": reset})
+
+
 # ------------------------------
 # 🎟 Tickets Page (Protected)
 # ------------------------------
 @main.route("/tickets")
 @login_required
+@cached_view(vary=ticket_preview_version)  # a preview can be stored just after its ticket
 def tickets():
+    """Paginated ticket list with status / date range / sender filters."""
+    filters = {
+        "status": request.args.get("status", "").strip(),
+        "date_from": request.args.get("date_from", "").strip(),
+        "date_to": request.args.get("date_to", "").strip(),
+        "sender": request.args.get("sender", "").strip(),
+        "sort": request.args.get("sort", "timestamp"),
+        "order": request.args.get("order", "desc"),
+    }
+    per_page = request.args.get("per_page", 50, type=int)
+    cursor = request.args.get("cursor")
+
     try:
-        all_tickets = fetch_all_tickets()
+        page = query_tickets(per_page=per_page, cursor=cursor, **{k: v or None for k, v in filters.items()})
     except Exception as e:
         print("Error fetching tickets:", e)
-        all_tickets = []
-    return render_template("tickets.html", tickets=all_tickets)
+        page = {"tickets": [], "next_cursor": None}
+
+    return render_template(
+        "tickets.html",
+        tickets=page["tickets"],
+        next_cursor=page["next_cursor"],
+        filters=filters,
+        per_page=per_page,
+        is_first_page=not cursor,
+    )
 
 
 # ------------------------------
@@ -149,21 +447,70 @@ def analysis():
 
 @main.route("/api/ticket_stats")
 @login_required
+@cached_view()
 def api_ticket_stats():
     """Provide data for Chart.js"""
     try:
-        tickets = fetch_all_tickets()
+        items = ticket_counts_by_day()
     except Exception as e:
         print("Error fetching tickets:", e)
         return jsonify([])
 
-    counts = {}
-    for t in tickets:
-        ts = t.get("timestamp")
-        if not ts:
-            continue
-        date = ts.split(" ")[0]
-        counts[date] = counts.get(date, 0) + 1
-
-    items = sorted(counts.items(), key=lambda x: x[0])
     return jsonify(items)
+
+
+@main.route("/api/stats")
+@login_required
+def api_stats():
+    """Tickets per day as [{date, count}] from the precomputed aggregates; supports If-None-Match."""
+    try:
+        items = ticket_counts_by_day()
+    except Exception as e:
+        print("Error fetching tickets:", e)
+        items = []
+    return _conditional_json([{"date": day, "count": count} for day, count in items])
+
+
+# ------------------------------
+# 📤 Ticket Export (Protected)
+# ------------------------------
+EXPORT_FIELDS = ["id", "timestamp", "from", "subject", "status"]
+
+
+@main.route("/api/tickets/export")
+@login_required
+def export_tickets():
+    """Stream the ticket log as CSV (default) or JSON Lines, optionally limited to a date range."""
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in ("csv", "jsonl"):
+        return jsonify({"error": "format must be 'csv' or 'jsonl'"}), 400
+    date_from = request.args.get("date_from") or None
+    date_to = request.args.get("date_to") or None
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for i, ticket in enumerate(iter_tickets(date_from, date_to), start=1):
+            writer.writerow(ticket)
+            if i % 500 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def generate_jsonl():
+        for ticket in iter_tickets(date_from, date_to):
+            yield json.dumps(ticket, ensure_ascii=False) + "\n"
+
+    if fmt == "csv":
+        body, mimetype = generate_csv(), "text/csv"
+    else:
+        body, mimetype = generate_jsonl(), "application/x-ndjson"
+
+    filename = f"tickets-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
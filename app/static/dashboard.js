@@ -1,73 +1,149 @@
 // app/static/dashboard.js
 
+function setText(id, text) {
+  const el = document.getElementById(id);
+  if (el) el.innerText = text;
+}
+
 async function fetchStatus() {
   try {
-    const res = await fetch('/api/status');
+    // no-cache: the browser revalidates with If-None-Match and gets a 304 when nothing changed
+    const res = await fetch('/api/status', { cache: 'no-cache' });
     const data = await res.json();
-    document.getElementById('status-text').innerText = data.status;
+    setText('status-text', data.status);
   } catch (err) {
     console.error(err);
-    document.getElementById('status-text').innerText = 'Error';
+    setText('status-text', 'Error');
   }
 }
 
+// Byte-offset cursor from the last /api/logs call; only newer lines are fetched
+let logCursor = null;
+const MAX_LOG_LINES = 1000;
+
 async function fetchLogs() {
   try {
-    const res = await fetch('/api/logs');
+    const url = logCursor ? `/api/logs?cursor=${encodeURIComponent(logCursor)}` : '/api/logs?lines=200';
+    const res = await fetch(url);
     const data = await res.json();
-    document.getElementById('log-output').innerText = data.lines.join('\n');
+    const output = document.getElementById('log-output');
+    const atBottom = output.scrollTop + output.clientHeight >= output.scrollHeight - 5;
+
+    // reset: first load, or the log was rotated - replace rather than append
+    let lines = data.reset ? data.lines : output.innerText.split('\n').filter(Boolean).concat(data.lines);
+    if (lines.length > MAX_LOG_LINES) lines = lines.slice(-MAX_LOG_LINES);
+    if (data.reset || data.lines.length) output.innerText = lines.join('\n');
+    logCursor = data.cursor;
+
+    if (atBottom) output.scrollTop = output.scrollHeight;
   } catch (err) {
     console.error(err);
   }
 }
 
+function renderChart(data) {
+  const ctx = document.getElementById('ticketsChart');
+  if (!ctx) return;
+  // destroy existing chart if any
+  if (window.myChart) window.myChart.destroy();
+  window.myChart = new Chart(ctx, {
+    type: 'bar',
+    data: {
+      labels: data.map(d => d.date),
+      datasets: [{
+        label: 'Tickets',
+        data: data.map(d => d.count),
+        borderWidth: 1
+      }]
+    },
+    options: {
+      scales: { y: { beginAtZero: true } }
+    }
+  });
+}
+
 async function fetchStatsAndRenderChart() {
   try {
-    const res = await fetch('/api/stats');
-    const data = await res.json();
-    const labels = data.map(d => d.date);
-    const counts = data.map(d => d.count);
-
-    const ctx = document.getElementById('ticketsChart');
-    if (!ctx) return;
-    // destroy existing chart if any
-    if (window.myChart) window.myChart.destroy();
-    window.myChart = new Chart(ctx, {
-      type: 'bar',
-      data: {
-        labels: labels,
-        datasets: [{
-          label: 'Tickets',
-          data: counts,
-          borderWidth: 1
-        }]
-      },
-      options: {
-        scales: { y: { beginAtZero: true } }
-      }
-    });
+    const res = await fetch('/api/stats', { cache: 'no-cache' });
+    renderChart(await res.json());
   } catch (err) {
     console.error(err);
   }
 }
 
-// wire buttons and auto-poll
-document.addEventListener('DOMContentLoaded', () => {
+// A "stats" event: the full per-day series, or just the days that changed
+function applyStats(stats) {
+  if (stats.today) {
+    setText('today-total', stats.today.total);
+    setText('today-open', stats.today.open);
+    setText('today-closed', stats.today.closed);
+  }
+  const chart = window.myChart;
+  if (stats.full || !chart) {
+    renderChart(stats.days);
+    return;
+  }
+  const labels = chart.data.labels;
+  const counts = chart.data.datasets[0].data;
+  stats.days.forEach(({ date, count }) => {
+    const i = labels.indexOf(date);
+    if (i >= 0) {
+      counts[i] = count;
+    } else {
+      // keep the days in order
+      let at = labels.findIndex(label => label > date);
+      if (at < 0) at = labels.length;
+      labels.splice(at, 0, date);
+      counts.splice(at, 0, count);
+    }
+  });
+  chart.update();
+}
+
+function showTicket(ticket) {
+  const list = document.getElementById('recent-tickets');
+  if (!list) return;
+  const item = document.createElement('li');
+  item.innerText = `${ticket.id} — ${ticket.subject} (${ticket.from})`;
+  list.prepend(item);
+  while (list.children.length > 10) list.removeChild(list.lastChild);
+}
+
+// Live updates over Server-Sent Events; returns false when the browser has no EventSource
+function startLiveFeed(onUnavailable) {
+  if (!window.EventSource) return false;
+  const source = new EventSource('/api/events');
+  source.addEventListener('status', e => setText('status-text', JSON.parse(e.data).status));
+  source.addEventListener('stats', e => applyStats(JSON.parse(e.data)));
+  source.addEventListener('ticket', e => showTicket(JSON.parse(e.data)));
+  source.onerror = () => {
+    // CLOSED means the server refused the stream (e.g. too many clients): poll instead
+    if (source.readyState === EventSource.CLOSED) onUnavailable();
+  };
+  return true;
+}
+
+function startPolling() {
   fetchStatus();
   // update status every 5s
   setInterval(fetchStatus, 5000);
+  if (document.getElementById('ticketsChart')) {
+    fetchStatsAndRenderChart();
+    // refresh chart every 60s
+    setInterval(fetchStatsAndRenderChart, 60 * 1000);
+  }
+}
+
+// wire buttons and live updates
+document.addEventListener('DOMContentLoaded', () => {
+  if (!startLiveFeed(startPolling)) startPolling();
 
   // logs page refresh button
   const refreshBtn = document.getElementById('refresh-logs');
   if (refreshBtn) {
     refreshBtn.addEventListener('click', fetchLogs);
     fetchLogs();
-  }
-
-  // analysis page
-  if (document.getElementById('ticketsChart')) {
-    fetchStatsAndRenderChart();
-    // refresh chart every 60s
-    setInterval(fetchStatsAndRenderChart, 60 * 1000);
+    // follow the log: each poll only transfers lines written since the last one
+    setInterval(fetchLogs, 3000);
   }
 });
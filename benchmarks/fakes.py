@@ -0,0 +1,306 @@
+"""
+Local stand-ins for the services the pipeline talks to, for offline benchmarks:
+an IMAP server, an SMTP server and an in-memory Google Sheets `values()` API.
+They implement just enough of each protocol for email_reader / email_sender /
+ticket_manager, and run on 127.0.0.1 in background threads.
+"""
+import re
+import select
+import socketserver
+import threading
+import time
+
+
+def _parse_set(spec, largest):
+    """IMAP sequence set ('1:3,7,9:*') -> set of numbers."""
+    numbers = set()
+    for part in spec.split(","):
+        if ":" in part:
+            a, b = (largest if x == "*" else int(x) for x in part.split(":"))
+            numbers.update(range(min(a, b), max(a, b) + 1))
+        else:
+            numbers.add(largest if part == "*" else int(part))
+    return numbers
+
+
+# -------------------------------
+# 📥 Fake IMAP Server
+# -------------------------------
+class FakeMailbox:
+    def __init__(self):
+        self.messages = []  # {"uid", "raw", "flags"}
+        self.uidvalidity = 1
+        self.next_uid = 1
+        self.lock = threading.Lock()
+
+    def add(self, raw):
+        with self.lock:
+            self.messages.append({"uid": self.next_uid, "raw": raw, "flags": set()})
+            self.next_uid += 1
+
+
+class _ImapHandler(socketserver.StreamRequestHandler):
+    def send(self, data):
+        self.wfile.write(data if isinstance(data, bytes) else data.encode())
+
+    def handle(self):
+        box = self.server.mailbox
+        self.send("* OK fake IMAP ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.decode().rstrip("\r\n").partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            by_uid = command == "UID"
+            if by_uid:
+                command, _, args = args.partition(" ")
+                command = command.upper()
+
+            if command == "CAPABILITY":
+                self.send(f"* CAPABILITY IMAP4rev1{' IDLE' if self.server.idle else ''}\r\n")
+            elif command == "LOGOUT":
+                self.send(f"* BYE\r\n{tag} OK done\r\n")
+                return
+            elif command in ("SELECT", "EXAMINE"):
+                self.send(f"* {len(box.messages)} EXISTS\r\n* OK [UIDVALIDITY {box.uidvalidity}]\r\n"
+                          f"* OK [UIDNEXT {box.next_uid}]\r\n{tag} OK [READ-WRITE] done\r\n")
+                continue
+            elif command == "STATUS":
+                self.send(f"* STATUS INBOX (UIDVALIDITY {box.uidvalidity} UIDNEXT {box.next_uid} "
+                          f"MESSAGES {len(box.messages)})\r\n")
+            elif command == "SEARCH":
+                self.send(f"* SEARCH {' '.join(map(str, self._search(box, args, by_uid)))}\r\n")
+            elif command == "FETCH":
+                self._fetch(box, args, by_uid)
+            elif command == "STORE":
+                spec, _, _ = args.partition(" ")
+                for _, message in self._select(box, spec, by_uid):
+                    message["flags"].add("\\Seen")
+            elif command == "IDLE":
+                if self.server.idle == "reject":
+                    self.send(f"{tag} NO IDLE not allowed for this account\r\n")
+                else:
+                    self._idle(box, tag)
+                continue
+            elif command not in ("LOGIN", "NOOP"):
+                self.send(f"{tag} BAD unknown command\r\n")
+                continue
+            self.send(f"{tag} OK done\r\n")
+
+    def _select(self, box, spec, by_uid):
+        largest = (box.next_uid - 1) if by_uid else len(box.messages)
+        wanted = _parse_set(spec, largest) if largest else set()
+        return [(n, m) for n, m in enumerate(box.messages, 1) if (m["uid"] if by_uid else n) in wanted]
+
+    def _search(self, box, criteria, by_uid):
+        criteria = criteria.upper()
+        if criteria.startswith("UNSEEN"):
+            hits = [(n, m) for n, m in enumerate(box.messages, 1) if "\\Seen" not in m["flags"]]
+        elif criteria.startswith("UID"):
+            hits = self._select(box, criteria.split()[1], True)
+        else:
+            hits = list(enumerate(box.messages, 1))
+        return [m["uid"] if by_uid else n for n, m in hits]
+
+    def _fetch(self, box, args, by_uid):
+        spec, _, items = args.partition(" ")
+        items = items.upper()
+        for n, message in self._select(box, spec, by_uid):
+            header, _, body = message["raw"].partition(b"\r\n\r\n")
+            parts = []
+            fields = re.search(r"BODY(?:\.PEEK)?\[HEADER\.FIELDS \(([^)]*)\)\]", items)
+            if fields:
+                wanted = fields.group(1).split()
+                lines = re.split(rb"\r\n(?![ \t])", header)
+                picked = b"".join(l + b"\r\n" for l in lines if l.split(b":")[0].strip().upper().decode() in wanted)
+                parts.append((f"BODY[HEADER.FIELDS ({fields.group(1)})]", picked + b"\r\n"))
+            text = re.search(r"BODY(?:\.PEEK)?\[TEXT\](?:<(\d+)\.(\d+)>)?", items)
+            if text:
+                start = int(text.group(1) or 0)
+                length = int(text.group(2)) if text.group(2) else len(body)
+                parts.append((f"BODY[TEXT]<{start}>" if text.group(1) else "BODY[TEXT]", body[start:start + length]))
+            if "RFC822" in items or "BODY[]" in items or "BODY.PEEK[]" in items:
+                parts.append(("BODY[]", message["raw"]))
+
+            out = f"* {n} FETCH (UID {message['uid']}".encode()
+            for name, data in parts:
+                out += f" {name} {{{len(data)}}}\r\n".encode() + data
+            self.send(out + b")\r\n")
+
+    def _idle(self, box, tag):
+        self.send("+ idling\r\n")
+        self.wfile.flush()
+        seen = len(box.messages)
+        while True:
+            readable, _, _ = select.select([self.connection], [], [], 0.05)
+            if readable:
+                line = self.rfile.readline()
+                if not line or line.strip().upper() == b"DONE":
+                    break
+            if len(box.messages) > seen:
+                seen = len(box.messages)
+                self.send(f"* {seen} EXISTS\r\n")
+                self.wfile.flush()
+        self.send(f"{tag} OK IDLE terminated\r\n")
+
+
+class FakeImapServer(socketserver.ThreadingTCPServer):
+    """
+    Plain-text IMAP server with one mailbox (every folder name maps to it).
+    idle=False leaves IDLE out of CAPABILITY; idle="reject" advertises it but refuses the command.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, idle=True):
+        super().__init__(("127.0.0.1", 0), _ImapHandler)
+        self.mailbox = FakeMailbox()
+        self.idle = idle
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+# -------------------------------
+# 📤 Fake SMTP Server
+# -------------------------------
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def send(self, text):
+        self.wfile.write(text.encode())
+
+    def handle(self):
+        self.send("220 fake SMTP ready\r\n")
+        in_data, lines = False, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line in (b".\r\n", b".\n"):
+                    in_data = False
+                    self.server.received(b"".join(lines))
+                    lines = []
+                    self.send("250 queued\r\n")
+                else:
+                    lines.append(line)
+                continue
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self.send("250-fake\r\n250 8BITMIME\r\n")
+            elif command.startswith("DATA"):
+                in_data = True
+                self.send("354 go ahead\r\n")
+            elif command.startswith("QUIT"):
+                self.send("221 bye\r\n")
+                return
+            else:
+                self.send("250 ok\r\n")
+
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    """SMTP sink without TLS or AUTH; counts the messages it accepts."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.messages = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def received(self, data):
+        with self._lock:
+            self.messages += 1
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+# -------------------------------
+# 📊 Fake Google Sheets API
+# -------------------------------
+class _Request:
+    def __init__(self, sheets, func):
+        self._sheets = sheets
+        self._func = func
+
+    def execute(self, **kwargs):
+        if self._sheets.latency:
+            time.sleep(self._sheets.latency)
+        with self._sheets.lock:
+            self._sheets.calls += 1
+            return self._func()
+
+
+def _a1_rows(a1_range):
+    """'Sheet!A5:E' -> (5, None); 'Sheet!A:E' -> (1, None); 'Sheet!E7' -> (7, 7)."""
+    cells = a1_range.split("!")[-1]
+    match = re.match(r"[A-Z](\d*)(?::[A-Z](\d*))?$", cells)
+    start = int(match.group(1) or 1)
+    end = match.group(2)
+    return start, (int(end) if end else (start if match.group(1) and ":" not in cells else None))
+
+
+class FakeSheets:
+    """
+    In-memory replacement for the object returned by sheets_client.get().
+    Supports spreadsheets().values() append / get / batchGet / update / batchUpdate
+    on a single grid; `latency` (seconds) is added to every execute() to mimic the
+    real API's round trip.
+    """
+
+    def __init__(self, header=("ID", "Timestamp", "From", "Subject", "Status"), latency=0.0):
+        self.rows = [list(header)] if header else []
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _read(self, a1_range):
+        start, end = _a1_rows(a1_range)
+        cells = a1_range.split("!")[-1]
+        first, last = "ABCDE".index(cells[0]), "ABCDE".index(cells.split(":")[-1][0])
+        # Like the real API, trailing empty cells and rows are left out
+        rows = [[cell for cell in r[first:last + 1]] for r in self.rows[start - 1:end]]
+        rows = [r[:max([i + 1 for i, cell in enumerate(r) if cell != ""] or [0])] for r in rows]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _write(self, a1_range, values):
+        start, _ = _a1_rows(a1_range)
+        column = "ABCDE".index(a1_range.split("!")[-1][0])
+        for offset, row in enumerate(values):
+            index = start - 1 + offset
+            while len(self.rows) <= index:
+                self.rows.append([])
+            target = self.rows[index]
+            target.extend([""] * (column + len(row) - len(target)))
+            target[column:column + len(row)] = row
+
+    def append(self, spreadsheetId, range, body, **kwargs):
+        return _Request(self, lambda: self.rows.extend(list(r) for r in body["values"]) or {})
+
+    def get(self, spreadsheetId, range, **kwargs):
+        return _Request(self, lambda: {"values": self._read(range)})
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        return _Request(self, lambda: {"valueRanges": [{"range": r, "values": self._read(r)} for r in ranges]})
+
+    def update(self, spreadsheetId, range, body, **kwargs):
+        return _Request(self, lambda: self._write(range, body["values"]) or {})
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        return _Request(self, lambda: [self._write(d["range"], d["values"]) for d in body["data"]] and {})
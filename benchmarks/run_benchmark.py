@@ -0,0 +1,185 @@
+"""
+End-to-end benchmark of the ticketing pipeline against local stand-ins.
+
+Seeds a fake IMAP server with N messages (MIME-encoded subjects and senders),
+runs check_inbox over them (search -> header fetch -> decode -> add_ticket ->
+ticket storage -> mark seen), then drains the queued auto-replies through
+send_auto_reply to a fake SMTP server. Prints throughput plus count / mean /
+p50 / p99 for every stage recorded by src/metrics.py.
+
+    python benchmarks/run_benchmark.py --messages 2000
+    python benchmarks/run_benchmark.py --backend sqlite --json
+    python benchmarks/run_benchmark.py --sheets-latency-ms 150   # closer to the real API
+
+Nothing touches the network: Gmail and SendGrid are skipped (no token.json, no
+SENDGRID_API_KEY) so replies go over SMTP to the local sink.
+"""
+import argparse
+import contextlib
+import imaplib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from email.charset import Charset, QP
+from email.header import Header
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+
+from fakes import FakeImapServer, FakeSmtpServer, FakeSheets
+
+NAMES = ["José Álvarez", "Zoë Brontë", "李雷", "Øyvind Søren", "Ana Lima", "Ivan Petrov"]
+Q_UTF8 = Charset("utf-8")
+Q_UTF8.header_encoding = QP
+
+TOPICS = ["Login fails", "Réinitialiser le mot de passe", "Rechnung über 50 €", "订单没有发货", "App crashes", "Refund"]
+
+
+def synthetic_message(i):
+    """One message with RFC 2047 encoded Subject/From, alternating B and Q encodings."""
+    charset = Q_UTF8 if i % 2 else "utf-8"
+    sender = f"{Header(NAMES[i % len(NAMES)], charset).encode()} <user{i}@example.com>"
+    encoded_subject = Header(f"{TOPICS[i % len(TOPICS)]} #{i}", charset).encode()
+    body = "Hello,\r\n\r\n" + "Please help with my account. " * random.randint(2, 20) + "\r\n"
+    return (
+        f"Message-ID: <bench-{i}@example.com>\r\n"
+        f"From: {sender}\r\n"
+        f"To: support@example.com\r\n"
+        f"Subject: {encoded_subject}\r\n"
+        f"Date: Sat, 18 Oct 2025 10:00:00 +0000\r\n"
+        f"MIME-Version: 1.0\r\n"
+        f"Content-Type: text/plain; charset=utf-8\r\n"
+        f"\r\n{body}"
+    ).encode("utf-8")
+
+
+def configure_environment(args, workdir, imap, smtp):
+    """Point Config at the fakes. Must run before any src module is imported."""
+    os.environ.update({
+        "DATA_DIR": workdir,
+        "TICKET_BACKEND": args.backend,
+        "EMAIL_ADDRESS": "support@example.com",
+        "EMAIL_APP_PASSWORD": "",
+        "IMAP_SERVER": f"127.0.0.1:{imap.port}",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp.port),
+        "SMTP_STARTTLS": "false",
+        "SHEET_ID": "benchmark",
+        "REPLY_WORKERS": str(args.reply_workers),
+        "REPLY_POLL_SECONDS": "0.05",
+        "IMAP_FETCH_BATCH": str(args.fetch_batch),
+        "SHEET_MIRROR_INTERVAL_SECONDS": "0.5",
+    })
+    os.environ.pop("SENDGRID_API_KEY", None)
+    os.environ.pop("MAILBOXES_JSON", None)
+    os.environ.pop("MAILBOXES_FILE", None)
+    sys.path.insert(0, SRC_DIR)
+    # Relative paths (automation.log, token.json) resolve inside the scratch directory
+    os.chdir(workdir)
+
+
+def run(args):
+    random.seed(args.seed)
+    imap, smtp = FakeImapServer(), FakeSmtpServer()
+    for i in range(args.messages):
+        imap.mailbox.add(synthetic_message(i))
+
+    workdir = tempfile.mkdtemp(prefix="ticketing-bench-")
+    configure_environment(args, workdir, imap, smtp)
+
+    import google_clients
+    sheets = FakeSheets(latency=args.sheets_latency_ms / 1000)
+    google_clients.sheets_client.set_service(sheets)
+
+    quiet = contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext()
+    with quiet:
+        import email_reader
+        from email_sender import send_auto_reply, smtp_pool
+        from metrics import metrics
+        from reply_queue import reply_queue, ReplyWorkerPool
+        logging.getLogger().setLevel(logging.INFO if args.verbose else logging.ERROR)
+
+        # --- ingest ---
+        mail = imaplib.IMAP4("127.0.0.1", imap.port)
+        mail.login("support@example.com", "x")
+        mail.select("INBOX")
+        started = time.perf_counter()
+        with metrics.timer("ingest_pass"):
+            processed = email_reader.check_inbox(mail)
+        ingest_seconds = time.perf_counter() - started
+        mail.logout()
+
+        # --- replies ---
+        started = time.perf_counter()
+        pool = ReplyWorkerPool(reply_queue, metrics.timed("reply_total")(send_auto_reply))
+        pool.start()
+        while reply_queue.stats()["depth"] and time.perf_counter() - started < args.timeout:
+            time.sleep(0.02)
+        reply_seconds = time.perf_counter() - started
+        pool.stop()
+        smtp_pool.close()
+
+    report = metrics.report()
+    return {
+        "messages": args.messages,
+        "backend": args.backend,
+        "sheets_latency_ms": args.sheets_latency_ms,
+        "ingest": {
+            "processed": processed,
+            "seconds": round(ingest_seconds, 3),
+            "emails_per_second": round(processed / ingest_seconds, 1) if ingest_seconds else 0.0,
+        },
+        "replies": {
+            "delivered": smtp.messages,
+            "seconds": round(reply_seconds, 3),
+            "replies_per_second": round(smtp.messages / reply_seconds, 1) if reply_seconds else 0.0,
+            "left_in_queue": reply_queue.stats()["depth"],
+        },
+        "sheets_api_calls": sheets.calls,
+        "stages": report["stages"],
+        "counters": report["counters"],
+    }
+
+
+def print_report(result):
+    print(f"\n📊 {result['messages']} messages, backend={result['backend']}, "
+          f"sheets latency={result['sheets_latency_ms']}ms")
+    ingest, replies = result["ingest"], result["replies"]
+    print(f"  Ingest : {ingest['processed']} emails in {ingest['seconds']}s "
+          f"→ {ingest['emails_per_second']} emails/s")
+    print(f"  Replies: {replies['delivered']} sent in {replies['seconds']}s "
+          f"→ {replies['replies_per_second']} replies/s ({replies['left_in_queue']} left in queue)")
+    print(f"  Sheets API calls: {result['sheets_api_calls']}\n")
+    print(f"  {'stage':<20}{'count':>8}{'errors':>8}{'mean ms':>11}{'p50 ms':>11}{'p99 ms':>11}")
+    for name, s in result["stages"].items():
+        print(f"  {name:<20}{s['count']:>8}{s['errors']:>8}{s['mean_ms']:>11.3f}{s['p50_ms']:>11.3f}{s['p99_ms']:>11.3f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the ticketing pipeline.")
+    parser.add_argument("-n", "--messages", type=int, default=1000, help="synthetic messages to seed")
+    parser.add_argument("--backend", default="sheets", choices=["sheets", "sqlite", "sqlite+sheets"])
+    parser.add_argument("--sheets-latency-ms", type=float, default=0.0, help="delay added to each fake Sheets call")
+    parser.add_argument("--reply-workers", type=int, default=4)
+    parser.add_argument("--fetch-batch", type=int, default=500, help="UIDs per IMAP FETCH/STORE")
+    parser.add_argument("--timeout", type=float, default=300, help="max seconds to wait for replies")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="keep the pipeline's own logging")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
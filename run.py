@@ -9,6 +9,9 @@ CREDENTIALS_DIR = os.path.join(BASE_DIR, "credentials")  # not inside src!
 os.makedirs(CREDENTIALS_DIR, exist_ok=True)
 sys.path.insert(0, SRC_DIR)
 
+from startup_report import startup_report  # STARTUP_REPORT=1 prints an import-time breakdown
+startup_report.start()
+
 from app import create_app
 
 
@@ -39,6 +42,7 @@ recreate_file_from_env(
 
 # 🚀 Create Flask app
 app = create_app()
+startup_report.finish("Web app")
 
 if __name__ == "__main__":
     app.run(debug=True)
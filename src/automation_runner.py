@@ -0,0 +1,283 @@
+import logging
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from config import Config
+from event_bus import event_bus
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to heartbeats alone
+    fcntl = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runner (
+    id           INTEGER PRIMARY KEY CHECK (id = 1),
+    desired      TEXT NOT NULL DEFAULT 'stopped',  -- running | stopped, set from the dashboard
+    pid          INTEGER,                          -- the active reader, while it is up
+    host         TEXT,
+    started_at   REAL,
+    heartbeat_at REAL,
+    launched_at  REAL                              -- last time a web worker launched a reader
+);
+INSERT OR IGNORE INTO runner (id) VALUES (1);
+"""
+
+STATUS_LABELS = {
+    "running": "🟢 Running",
+    "starting": "🟡 Starting",
+    "unresponsive": "🟠 Not responding",
+    "stopped": "🔴 Stopped",
+}
+
+SUPERVISOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_supervisor.py")
+
+
+# -------------------------------
+# 🏃 Automation Runner (shared state)
+# -------------------------------
+class AutomationRunner:
+    """
+    Start/stop/status for the mail reader, shared by every web worker.
+
+    State lives in SQLite rather than in module globals: the dashboard records
+    whether the reader *should* run, and the reader records its PID and a
+    heartbeat. The reader also holds an exclusive lock on READER_LOCK_FILE for
+    its whole life, so a second reader started by another worker exits at once.
+
+    status() only reads. Launching happens on start(), and on the watchdog
+    thread each web worker runs, which relaunches a reader that should be
+    running but has died and publishes "status" events when the answer changes.
+    """
+
+    def __init__(self, path=None, lock_file=None):
+        self.path = path or Config.READER_STATE_DB
+        self.lock_file = lock_file or Config.READER_LOCK_FILE
+        self.heartbeat_interval = Config.RUNNER_HEARTBEAT_SECONDS
+        self._local = threading.local()
+        self._last_heartbeat = 0.0
+        self._children = []
+        self._published = None
+        self._watchdog = None
+        self._watchdog_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _state(self):
+        return dict(self._connection().execute("SELECT * FROM runner WHERE id = 1").fetchone())
+
+    def _update(self, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._connection().execute(f"UPDATE runner SET {assignments} WHERE id = 1", list(fields.values()))
+
+    # --- used by the web workers ---
+    def start(self):
+        """Ask for the reader to run and launch it unless one is already up."""
+        self._update(desired="running")
+        self._reap_children()
+        self._launch_if_needed()
+        self.publish_status()
+
+    def stop(self):
+        """Ask the reader to exit; it checks this on every heartbeat."""
+        self._update(desired="stopped")
+        state = self._state()
+        # Same machine: no need to wait for the next heartbeat
+        if state["pid"] and state["host"] == socket.gethostname():
+            try:
+                os.kill(state["pid"], signal.SIGTERM)
+            except OSError:
+                pass
+        self.publish_status()
+
+    def status(self):
+        """
+        Reader liveness as seen from any worker: running, starting, unresponsive
+        (process there but no heartbeat) or stopped. Reads the shared state only.
+        """
+        state = self._state()
+        now = time.time()
+        beating = bool(state["pid"] and state["heartbeat_at"]
+                       and now - state["heartbeat_at"] < 3 * self.heartbeat_interval)
+        alive = _process_exists(state["pid"]) if state["pid"] and state["host"] == socket.gethostname() else None
+
+        if beating and alive is not False:
+            name = "running"
+        elif alive:
+            name = "unresponsive"
+        elif state["launched_at"] and now - state["launched_at"] < Config.RUNNER_LAUNCH_GRACE_SECONDS:
+            name = "starting"
+        else:
+            name = "stopped"
+
+        return {
+            "state": name,
+            "status": STATUS_LABELS[name],
+            "desired": state["desired"],
+            "pid": state["pid"] if name in ("running", "unresponsive") else None,
+            "host": state["host"],
+            "started_at": state["started_at"],
+            "heartbeat_age_seconds": round(now - state["heartbeat_at"], 1) if state["heartbeat_at"] else None,
+        }
+
+    def publish_status(self):
+        """status(), also published as a "status" event if it changed since the last one from here."""
+        result = self.status()
+        changed = (result["state"], result["desired"], result["pid"])
+        if changed != self._published:
+            self._published = changed
+            event_bus.publish("status", result)
+        return result
+
+    def watch(self):
+        """One watchdog pass: relaunch a reader that should be running but is gone."""
+        self._reap_children()
+        result = self.status()
+        if result["state"] == "stopped" and result["desired"] == "running":
+            if self._launch_if_needed():
+                logging.warning("The mail reader was not running; relaunched it.")
+        return self.publish_status()
+
+    def start_watchdog(self, interval=None):
+        """Run watch() every `interval` seconds (default: the heartbeat interval) on a daemon thread."""
+        with self._watchdog_lock:
+            if self._watchdog is None or not self._watchdog.is_alive():
+                self._watchdog = threading.Thread(
+                    target=self._watch_loop, args=(interval or self.heartbeat_interval,),
+                    name="reader-watchdog", daemon=True,
+                )
+                self._watchdog.start()
+
+    def _watch_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.watch()
+            except Exception as e:
+                logging.error(f"❌ Reader watchdog pass failed: {e}")
+
+    def _launch_if_needed(self):
+        # Serialize launches between web workers; whoever loses just returns
+        with _FileLock(self.lock_file + ".launch") as acquired:
+            if not acquired:
+                return False
+            state = self._state()
+            now = time.time()
+            if state["launched_at"] and now - state["launched_at"] < Config.RUNNER_LAUNCH_GRACE_SECONDS:
+                return False
+            if self._lock_is_held() or (
+                fcntl is None and state["heartbeat_at"] and now - state["heartbeat_at"] < 3 * self.heartbeat_interval
+            ):
+                return False
+            self._update(launched_at=now)
+            # A new session keeps the reader alive when this web worker is recycled
+            self._children.append(subprocess.Popen([sys.executable, SUPERVISOR_SCRIPT], start_new_session=True))
+            logging.info("▶ Launched the mail reader.")
+            return True
+
+    def _reap_children(self):
+        self._children = [child for child in self._children if child.poll() is None]
+
+    def _lock_is_held(self):
+        """True if a reader holds the lock file, False if not, None if locks are unavailable."""
+        if fcntl is None:
+            return None
+        with _FileLock(self.lock_file) as acquired:
+            return not acquired
+
+    # --- used by the reader process ---
+    def acquire_reader_lock(self, wait=2.0):
+        """
+        Take the single-reader lock for the life of this process. Returns the open
+        lock (keep a reference) or None if another reader already has it.
+        """
+        lock = _FileLock(self.lock_file)
+        deadline = time.monotonic() + wait
+        # Retry briefly: a web worker may be probing the lock at this instant
+        while not lock.acquire():
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.1)
+        return lock
+
+    def register(self):
+        """Record this process as the active reader (a reader started by hand counts as a start)."""
+        now = time.time()
+        self._update(desired="running", pid=os.getpid(), host=socket.gethostname(),
+                     started_at=now, heartbeat_at=now, launched_at=None)
+        self._last_heartbeat = time.monotonic()
+
+    def heartbeat(self):
+        """Record that the reader is alive. Returns False once the dashboard asked it to stop."""
+        if time.monotonic() - self._last_heartbeat >= self.heartbeat_interval:
+            self._update(heartbeat_at=time.time())
+            self._last_heartbeat = time.monotonic()
+        return self._state()["desired"] == "running"
+
+    def unregister(self):
+        self._update(pid=None, heartbeat_at=None)
+
+
+def _process_exists(pid):
+    """True if `pid` is a live process on this machine, None where that cannot be checked."""
+    if os.name != "posix":
+        return None  # os.kill(pid, 0) would terminate it on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+class _FileLock:
+    """Non-blocking exclusive flock on a file; a no-op that always succeeds without fcntl."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        if fcntl is None:
+            return True
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+automation_runner = AutomationRunner()
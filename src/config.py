@@ -13,6 +13,31 @@ class Config:
     EMAIL_PASSWORD = os.getenv("EMAIL_APP_PASSWORD")
     IMAP_SERVER = os.getenv("IMAP_SERVER", "imap.gmail.com")
     SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+    SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+    IMAP_FOLDER = os.getenv("IMAP_FOLDER", "INBOX")
+
+    # IDLE is re-issued before servers drop it (RFC 2177 allows 29 minutes)
+    IMAP_IDLE_TIMEOUT = int(os.getenv("IMAP_IDLE_TIMEOUT_SECONDS", 25 * 60))
+    IMAP_RECONNECT_MAX_DELAY = int(os.getenv("IMAP_RECONNECT_MAX_DELAY_SECONDS", 300))
+    IMAP_FETCH_BATCH = int(os.getenv("IMAP_FETCH_BATCH", 500))  # UIDs per FETCH/STORE
+    # Per-message fetch limits: header bytes, and body bytes read for the ticket preview
+    # (0 = headers only). Attachments are never downloaded, whatever their size.
+    MAIL_HEADER_MAX_BYTES = int(os.getenv("MAIL_HEADER_MAX_BYTES", 64 * 1024))
+    MAIL_HEADER_MAX_CHARS = int(os.getenv("MAIL_HEADER_MAX_CHARS", 1000))  # decoded Subject/From
+    BODY_PREVIEW_BYTES = int(os.getenv("BODY_PREVIEW_BYTES", 16 * 1024))
+    BODY_PREVIEW_CHARS = int(os.getenv("BODY_PREVIEW_CHARS", 500))
+    # Passes that retry a message the server returned nothing for (or that failed to
+    # parse) before the checkpoint moves past it for good
+    SKIPPED_MESSAGE_RETRIES = int(os.getenv("SKIPPED_MESSAGE_RETRIES", 3))
+
+    # Every mailbox/folder watched by the ingest supervisor: a JSON list, inline or in
+    # a file (see ingest_supervisor.load_mailboxes); read by the supervisor only
+    MAILBOXES_JSON = os.getenv("MAILBOXES_JSON")
+    MAILBOXES_FILE = os.getenv("MAILBOXES_FILE")
+    WORKER_RESTART_MAX_DELAY = int(os.getenv("WORKER_RESTART_MAX_DELAY_SECONDS", 60))
+    INGEST_REPORT_SECONDS = float(os.getenv("INGEST_REPORT_SECONDS", 60))
 
     # --------------------------
     # 📊 Google Sheets / Service Account
@@ -31,13 +56,97 @@ class Config:
     SHEET_ID = os.getenv("SHEET_ID", "1eYLJZ0fKVfvn0Rg1NEb3cRB7S9c1mi0J35ARiUBQyjw")
     SHEET_NAME = os.getenv("SHEET_NAME", "Ticket Log")
 
+    # Ticket rows are buffered and appended in one call per batch
+    SHEET_BATCH_SIZE = int(os.getenv("SHEET_BATCH_SIZE", 100))
+    SHEET_FLUSH_SECONDS = float(os.getenv("SHEET_FLUSH_SECONDS", 5))
+
+    # How long fetched tickets are served from memory before a refresh
+    TICKET_CACHE_TTL = float(os.getenv("TICKET_CACHE_TTL_SECONDS", 30))
+
+    # --------------------------
+    # 🗄 Local Data (SQLite mirror of the ticket sheet)
+    # --------------------------
+    DATA_DIR = os.getenv(
+        "DATA_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+    )
+    TICKET_DB = os.getenv("TICKET_DB_PATH", os.path.join(DATA_DIR, "tickets.db"))
+    MIRROR_SYNC_INTERVAL = float(os.getenv("MIRROR_SYNC_INTERVAL_SECONDS", 30))
+    # Status edits made directly in the sheet are picked up by a scan of the whole
+    # status column; it runs this often rather than on every (incremental) sync
+    MIRROR_STATUS_SCAN_INTERVAL = float(os.getenv("MIRROR_STATUS_SCAN_INTERVAL_SECONDS", 900))
+
+    # Google API discovery documents, cached so building a client needs no lookup
+    DISCOVERY_CACHE_DIR = os.getenv("DISCOVERY_CACHE_DIR", os.path.join(DATA_DIR, "discovery"))
+    DISCOVERY_CACHE_MAX_AGE = float(os.getenv("DISCOVERY_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+
+    # Where tickets are kept:
+    #   sheets        - the Google Sheet is the record, SQLite is a read mirror
+    #   sqlite        - SQLite only
+    #   sqlite+sheets - SQLite is the record, changes are copied to the sheet in the background
+    TICKET_BACKEND = os.getenv("TICKET_BACKEND", "sheets").lower()
+    SHEET_MIRROR_INTERVAL = float(os.getenv("SHEET_MIRROR_INTERVAL_SECONDS", 10))
+    SHEET_MIRROR_BATCH = int(os.getenv("SHEET_MIRROR_BATCH", 500))  # rows per mirror write
+
+    # Mail reader state (last processed UID per mailbox)
+    READER_STATE_DB = os.getenv("READER_STATE_DB_PATH", os.path.join(DATA_DIR, "reader_state.db"))
+
+    # Only the process holding this lock may read mail; it heartbeats into READER_STATE_DB
+    READER_LOCK_FILE = os.getenv("READER_LOCK_FILE", os.path.join(DATA_DIR, "reader.lock"))
+    RUNNER_HEARTBEAT_SECONDS = float(os.getenv("RUNNER_HEARTBEAT_SECONDS", 5))
+    RUNNER_LAUNCH_GRACE_SECONDS = float(os.getenv("RUNNER_LAUNCH_GRACE_SECONDS", 30))
+
+    # Per-worker throughput written by the ingest supervisor
+    INGEST_STATUS_FILE = os.getenv("INGEST_STATUS_FILE", os.path.join(DATA_DIR, "ingest_status.json"))
+
+    # --------------------------
+    # 📮 Auto-Reply Queue
+    # --------------------------
+    REPLY_QUEUE_DB = os.getenv("REPLY_QUEUE_DB_PATH", os.path.join(DATA_DIR, "reply_queue.db"))
+    REPLY_WORKERS = int(os.getenv("REPLY_WORKERS", 4))
+    REPLY_MAX_ATTEMPTS = int(os.getenv("REPLY_MAX_ATTEMPTS", 5))
+    REPLY_RETRY_BASE_SECONDS = float(os.getenv("REPLY_RETRY_BASE_SECONDS", 30))
+    REPLY_POLL_SECONDS = float(os.getenv("REPLY_POLL_SECONDS", 2))
+    REPLY_CLAIM_BATCH = int(os.getenv("REPLY_CLAIM_BATCH", 25))  # replies a worker sends together
+    GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", 50))
+
+    # A reply backend that fails this many times in a row is skipped for the cool-down
+    BACKEND_FAILURE_THRESHOLD = int(os.getenv("BACKEND_FAILURE_THRESHOLD", 3))
+    BACKEND_COOLDOWN_SECONDS = float(os.getenv("BACKEND_COOLDOWN_SECONDS", 300))
+
     # --------------------------
     # ⚙️ App Configuration
     # --------------------------
-    POLL_INTERVAL = int(os.getenv("POLL_INTERVAL_SECONDS", 300))
+    NODE_ID = os.getenv("NODE_ID")  # distinguishes reader instances in ticket IDs
+    POLL_INTERVAL = int(os.getenv("POLL_INTERVAL_SECONDS", 300))  # used when IDLE is unavailable
     SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key_here")
+    # Threads per gunicorn worker (the Procfile passes the same variable to --threads)
+    WEB_THREADS = int(os.getenv("WEB_THREADS", 16))
+    # Live dashboard feed (/api/events): how often each web worker checks for changes,
+    # how many streams it serves, and how long one stream lasts before the browser reconnects.
+    # Every open stream holds a worker thread, so a few are always left for other requests.
+    LIVE_FEED_POLL_SECONDS = float(os.getenv("LIVE_FEED_POLL_SECONDS", 2))
+    SSE_MAX_CLIENTS = int(os.getenv("SSE_MAX_CLIENTS", max(1, WEB_THREADS - 4)))
+    SSE_STREAM_SECONDS = float(os.getenv("SSE_STREAM_SECONDS", 300))
+    SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", 15))
+    # Rendered dashboard pages kept per query until the ticket store changes, and the
+    # smallest HTML/JSON body worth gzip-compressing
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 256))
+    GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", 1024))
+    # Print an import-time breakdown when the web app or the reader starts
+    STARTUP_REPORT = os.getenv("STARTUP_REPORT", "false").lower() in ("1", "true", "yes")
+
+    # --------------------------
+    # ⏱ Metrics
+    # --------------------------
+    # Reader processes write their stage timings here; /api/metrics merges them
+    METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(DATA_DIR, "metrics"))
+    METRICS_EXPORT_SECONDS = float(os.getenv("METRICS_EXPORT_SECONDS", 10))
+    METRICS_RETENTION_SECONDS = float(os.getenv("METRICS_RETENTION_SECONDS", 24 * 3600))
 
     # --------------------------
     # 🪵 Logging
     # --------------------------
-    LOG_FILE = os.path.join(os.getcwd(), "automation.log")
+    LOG_FILE = os.getenv("LOG_FILE", os.path.join(os.getcwd(), "automation.log"))
+    LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))  # rotate at this size
+    LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))          # rotated files kept
@@ -1,6 +1,5 @@
 import imaplib
-import email
-from email.header import decode_header
+import hashlib
 from config import Config
 from dotenv import load_dotenv
 import os
@@ -8,44 +7,30 @@ import time
 import logging
 import sys
 import re
-from ticket_manager import add_ticket
-from email_sender import send_auto_reply  # Send confirmation email
+import signal
+import threading
+from ticket_manager import add_ticket, flush_tickets, discard_pending_tickets, find_ticket, reopen_ticket
+from email_sender import send_auto_reply, send_auto_replies  # Send confirmation emails
+from imap_session import ImapSession
+from uid_checkpoint import uid_checkpoint
+from message_index import message_index
+from mime_parser import decode_mime_words, parse_message, body_preview
+from reply_queue import reply_queue, ReplyWorkerPool
+from metrics import metrics
+from log_pipeline import setup_logging
+from automation_runner import automation_runner
 
 # Load environment variables
 load_dotenv()
 
 # --- Logging Configuration ---
-LOG_FILE = "automation.log"
-
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
-# Also print logs to console
-console = logging.StreamHandler()
-console.setLevel(logging.INFO)
-formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s", "%H:%M:%S")
-console.setFormatter(formatter)
-logging.getLogger().addHandler(console)
-
-
-# -------------------------------
-# ✉️ Helper: Decode MIME & Extract Sender
-# -------------------------------
-def decode_mime_words(header_value):
-    """Decode MIME-encoded email headers (e.g., =?UTF-8?...)."""
-    if not header_value:
-        return ""
-    decoded_parts = decode_header(header_value)
-    return ''.join(
-        part.decode(charset or 'utf-8') if isinstance(part, bytes) else part
-        for part, charset in decoded_parts
-    )
+# Records go through a queue; a background thread writes automation.log (rotated) and the console
+setup_logging()
 
 
+# -------------------------------
+# ✉️ Helper: Extract Sender
+# -------------------------------
 def extract_sender(from_header):
     """
     Extract sender in 'Name (email@example.com)' format.
@@ -68,17 +53,68 @@ def extract_sender(from_header):
         return from_header.strip()
 
 
+# -------------------------------
+# 🧵 Helper: Message Identity & Threading
+# -------------------------------
+MESSAGE_ID_PATTERN = re.compile(r"<[^<>\s]+>")
+SUBJECT_TICKET_PATTERN = re.compile(r"\(ID:\s*(T-[\w-]+)\)")
+# Our confirmations carry Message-IDs like <...T-20251018143005123-3fa91c-0007@host>
+REPLY_TICKET_PATTERN = re.compile(r"\.(T-[\w-]+)@")
+
+
+def message_key(msg):
+    """The message's Message-ID, or a digest of From/Date/Subject when it has none."""
+    ids = MESSAGE_ID_PATTERN.findall(msg["Message-ID"] or "")
+    if ids:
+        return ids[0]
+    raw = "\n".join(str(msg[name] or "") for name in ("From", "Date", "Subject"))
+    return "sha1:" + hashlib.sha1(raw.encode("utf-8", "replace")).hexdigest()
+
+
+def referenced_ids(msg):
+    """Message-IDs this message answers: In-Reply-To first, then References newest first."""
+    ids = MESSAGE_ID_PATTERN.findall(msg["In-Reply-To"] or "")
+    ids += reversed(MESSAGE_ID_PATTERN.findall(msg["References"] or ""))
+    return ids
+
+
+def thread_ticket_id(subject, references, known, is_ticket):
+    """
+    Ticket an incoming message follows up on, or None for a new request.
+    Checked in order: a referenced message we already indexed (`known` maps
+    Message-ID -> ticket ID), one of our confirmations, then the "(ID: T-...)"
+    tag in the subject. `is_ticket(ticket_id)` filters out IDs we never issued.
+    """
+    for ref in references:
+        if ref in known:
+            return known[ref]
+    candidates = [m.group(1) for m in map(REPLY_TICKET_PATTERN.search, references) if m]
+    match = SUBJECT_TICKET_PATTERN.search(subject)
+    if match:
+        candidates.append(match.group(1))
+    for ticket_id in dict.fromkeys(candidates):
+        if is_ticket(ticket_id):
+            return ticket_id
+    return None
+
+
 # -------------------------------
 # 📥 Connect to Gmail
 # -------------------------------
-def connect_to_mailbox():
-    """Connect to Gmail via IMAP using credentials from .env"""
+def default_account():
+    """The single account configured through EMAIL_ADDRESS / EMAIL_APP_PASSWORD."""
+    return {"email": Config.EMAIL, "password": Config.EMAIL_PASSWORD, "imap_server": Config.IMAP_SERVER}
+
+
+def connect_to_mailbox(account=None, folder=None):
+    """Connect to Gmail via IMAP using credentials from .env (or the given account)"""
+    account = account or default_account()
     logging.info("Connecting to Gmail IMAP server...")
     try:
-        mail = imaplib.IMAP4_SSL(Config.IMAP_SERVER)
-        mail.login(Config.EMAIL, Config.EMAIL_PASSWORD)
-        logging.info(f"Logged in successfully as: {Config.EMAIL}")
-        mail.select("inbox")
+        mail = imaplib.IMAP4_SSL(account["imap_server"])
+        mail.login(account["email"], account["password"])
+        logging.info(f"Logged in successfully as: {account['email']}")
+        mail.select(folder or Config.IMAP_FOLDER)
         return mail
     except imaplib.IMAP4.error as e:
         logging.error(f"IMAP login failed: {e}")
@@ -86,26 +122,236 @@ def connect_to_mailbox():
 
 
 # -------------------------------
-# 📧 Process Inbox
+# 📦 Bulk UID Helpers
 # -------------------------------
-def check_inbox(mail):
-    """Check inbox for unread emails, create tickets, and send confirmation replies."""
-    status, messages = mail.search(None, "UNSEEN")
+# Content-Type / -Transfer-Encoding are needed to parse the body preview
+HEADER_FIELDS = "(SUBJECT FROM DATE MESSAGE-ID IN-REPLY-TO REFERENCES CONTENT-TYPE CONTENT-TRANSFER-ENCODING)"
+UID_PATTERN = re.compile(rb"UID (\d+)")
+FETCH_START_PATTERN = re.compile(rb"^\d+ \(")
+STATUS_PATTERN = re.compile(rb"(UIDVALIDITY|UIDNEXT) (\d+)")
+
+
+def uid_set(uids):
+    """Compress UIDs into an IMAP sequence set, e.g. [1, 2, 3, 7] -> '1:3,7'."""
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(a) if a == b else f"{a}:{b}" for a, b in ranges)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fetch_items():
+    """
+    FETCH items for one message: the HEADER_FIELDS headers and, for the ticket
+    preview, the start of the body. Both are partial fetches (<0.n>), so the
+    server never sends more than the configured limits, however large the
+    message. BODY.PEEK leaves the \\Seen flag alone.
+    """
+    items = f"UID BODY.PEEK[HEADER.FIELDS {HEADER_FIELDS}]<0.{Config.MAIL_HEADER_MAX_BYTES}>"
+    if Config.BODY_PREVIEW_BYTES > 0:
+        items += f" BODY.PEEK[TEXT]<0.{Config.BODY_PREVIEW_BYTES}>"
+    return f"({items})"
+
+
+@metrics.timed("imap_fetch")
+def fetch_messages(mail, uids):
+    """
+    Fetch headers and body previews for many messages in a few UID FETCH round-trips.
+    Returns {uid: (header bytes, body bytes or None)}.
+    """
+    messages = {}
+    for chunk in _chunks(uids, Config.IMAP_FETCH_BATCH):
+        status, data = mail.uid("FETCH", uid_set(chunk), fetch_items())
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"UID FETCH failed: {data}")
+
+        # One message arrives as one tuple per literal, then the closing bytes;
+        # the UID may be before the literals or (some servers) after them
+        records = []
+        for item in data:
+            line = item[0] if isinstance(item, tuple) else item
+            if not isinstance(line, bytes):
+                continue
+            if isinstance(item, tuple):
+                if FETCH_START_PATTERN.match(line):
+                    records.append({})
+                if not records:
+                    continue
+                records[-1]["text" if b"[TEXT]" in line.upper() else "header"] = item[1]
+            if records and "uid" not in records[-1]:
+                match = UID_PATTERN.search(line)
+                if match:
+                    records[-1]["uid"] = int(match.group(1))
+
+        for record in records:
+            if "uid" in record and "header" in record:
+                messages[record["uid"]] = (record["header"], record.get("text"))
+    return messages
+
+
+def mailbox_status(mail, folder):
+    """Return (UIDVALIDITY, UIDNEXT) for `folder`."""
+    status, data = mail.status(folder, "(UIDVALIDITY UIDNEXT)")
     if status != "OK":
-        logging.error("Error searching inbox.")
-        return
+        raise imaplib.IMAP4.error(f"STATUS failed: {data}")
+    values = dict(STATUS_PATTERN.findall(data[0]))
+    return int(values[b"UIDVALIDITY"]), int(values.get(b"UIDNEXT", 1))
 
-    email_ids = messages[0].split()
-    logging.info(f"Found {len(email_ids)} new unread emails.")
 
-    for e_id in email_ids:
-        _, msg_data = mail.fetch(e_id, "(RFC822)")
-        msg = email.message_from_bytes(msg_data[0][1])
+@metrics.timed("imap_search")
+def find_new_uids(mail, mailbox_key, folder):
+    """
+    UIDs to process this pass, plus (uidvalidity, uidnext) for the checkpoint.
+    Searches `UID last+1:*` when the checkpoint is valid; otherwise (first run or
+    UIDVALIDITY changed) falls back to a one-off full scan for UNSEEN mail.
+    """
+    uidvalidity, uidnext = mailbox_status(mail, folder)
+    checkpoint = uid_checkpoint.load(mailbox_key)
+
+    if checkpoint and checkpoint[0] == uidvalidity:
+        last_uid = checkpoint[1]
+        status, messages = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+    else:
+        if checkpoint:
+            logging.warning(f"UIDVALIDITY changed for {mailbox_key}; rescanning unread mail.")
+        last_uid = 0
+        status, messages = mail.uid("SEARCH", None, "UNSEEN")
+
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID SEARCH failed: {messages}")
+    # `n:*` always matches the newest message, even when its UID is below n
+    uids = [int(uid) for uid in messages[0].split() if int(uid) > last_uid]
+    return uids, uidvalidity, uidnext
 
-        # Decode subject safely
-        subject = decode_mime_words(msg["Subject"])
-        raw_from = decode_mime_words(msg["From"])
-        sender = extract_sender(raw_from)
+
+@metrics.timed("imap_store")
+def mark_seen(mail, uids):
+    """Flag messages as \\Seen with one UID STORE per chunk."""
+    for chunk in _chunks(sorted(uids), Config.IMAP_FETCH_BATCH):
+        mail.uid("STORE", uid_set(chunk), "+FLAGS", "(\\Seen)")
+
+
+# -------------------------------
+# 📧 Process Inbox
+# -------------------------------
+_skip_counts = {}  # (mailbox key, UIDVALIDITY, UID) -> passes that had to skip it
+
+
+def hold_back_skipped(mailbox_key, uidvalidity, skipped):
+    """
+    Skipped UIDs the checkpoint must stay below, so the next `UID n:*` search
+    retries them. After SKIPPED_MESSAGE_RETRIES passes a UID is given up on.
+    """
+    held = set()
+    for uid in skipped:
+        count = _skip_counts.get((mailbox_key, uidvalidity, uid), 0) + 1
+        _skip_counts[(mailbox_key, uidvalidity, uid)] = count
+        if count <= Config.SKIPPED_MESSAGE_RETRIES:
+            held.add(uid)
+        else:
+            logging.error(f"❌ Giving up on message UID {uid} in {mailbox_key} after {count - 1} retries.")
+    return held
+
+
+def forget_skipped(mailbox_key, uidvalidity, checkpoint):
+    """Drop retry counts the checkpoint has moved past (or from an older UIDVALIDITY)."""
+    for key in [k for k in _skip_counts if k[0] == mailbox_key and (k[1] != uidvalidity or k[2] <= checkpoint)]:
+        del _skip_counts[key]
+
+
+def check_inbox(mail, folder=None, account=None):
+    """
+    Check the selected folder for new emails, create tickets, and queue confirmation
+    replies. Returns the number of messages processed.
+    """
+    folder = folder or Config.IMAP_FOLDER
+    mailbox_key = f"{(account or default_account())['email']}/{folder}"
+    try:
+        uids, uidvalidity, uidnext = find_new_uids(mail, mailbox_key, folder)
+    except imaplib.IMAP4.error as e:
+        logging.error(f"Error searching {mailbox_key}: {e}")
+        return 0
+
+    logging.info(f"Found {len(uids)} new emails in {mailbox_key}.")
+    # Everything below UIDNEXT (as of the search) is now accounted for
+    next_checkpoint = max([uidnext - 1] + uids)
+    if not uids:
+        uid_checkpoint.save(mailbox_key, uidvalidity, next_checkpoint)
+        forget_skipped(mailbox_key, uidvalidity, next_checkpoint)
+        return 0
+
+    fetched = fetch_messages(mail, uids)
+    messages = []
+    previews = {}  # message key -> body preview
+    skipped = []   # retried next pass: left unread, and the checkpoint stays below them
+    for uid in uids:
+        if uid not in fetched:
+            logging.warning(f"No headers returned for message UID {uid}; skipping.")
+            skipped.append(uid)
+            continue
+        with metrics.timer("mime_decode"):
+            try:
+                msg = parse_message(*fetched[uid])
+            except Exception as e:
+                logging.error(f"❌ Could not parse message UID {uid}: {e}")
+                metrics.inc("unparseable_messages")
+                skipped.append(uid)
+                continue
+
+            # Decode subject safely
+            subject = decode_mime_words(msg["Subject"])
+            raw_from = decode_mime_words(msg["From"])
+            sender = extract_sender(raw_from)
+            key = message_key(msg)
+            previews[key] = body_preview(msg)
+        messages.append((uid, key, referenced_ids(msg), subject, sender))
+
+    # One index lookup for the whole pass: messages seen before and the ones replied to
+    known = message_index.lookup(
+        [key for _, key, *_ in messages] + [ref for _, _, refs, *_ in messages for ref in refs]
+    )
+    created = {}  # message key -> ticket ID, for tickets opened during this pass
+
+    def is_ticket(ticket_id):
+        return (ticket_id in created.values() or message_index.has_ticket(ticket_id)
+                or find_ticket(ticket_id) is not None)
+
+    processed = []
+    followups = []
+    written = []        # (ticket_id, ticket data) for every ticket committed during this pass
+    created_uids = {}   # message key -> UID, for tickets opened during this pass
+
+    def committed(tickets):
+        # Called by whichever flush writes a batch (inline when full, timer, or the
+        # one below); indexing right away means a re-read never tickets them again
+        message_index.record([
+            (ticket["message_key"], ticket_id, "new", previews.get(ticket["message_key"], ""))
+            for ticket_id, ticket in tickets
+        ])
+        written.extend(tickets)
+
+    for uid, key, references, subject, sender in messages:
+        processed.append(uid)
+        if key in known or key in created:
+            # Already turned into a ticket, e.g. marking it read failed last time
+            logging.info(f"⏭ Message {key} already has ticket {known.get(key) or created[key]}; skipping.")
+            metrics.inc("duplicate_messages")
+            continue
+
+        ticket_id = thread_ticket_id(subject, references, {**known, **created}, is_ticket)
+        if ticket_id:
+            # A follow-up: no new row and no second confirmation
+            logging.info(f"🧵 Reply from {sender} threaded onto ticket {ticket_id}: {subject}")
+            followups.append((key, ticket_id, uid))
+            known[key] = ticket_id
+            continue
 
         logging.info(f"Processing Email: {subject} (From: {sender})")
 
@@ -115,21 +361,68 @@ def check_inbox(mail):
             "subject": subject,
             "from": sender,
             "status": "New",
+            "message_key": key,
         }
 
-        # Add to Google Sheet and send confirmation
+        # Add to Google Sheet; the confirmation is queued once the ticket is written
         try:
-            ticket_id = add_ticket(ticket_data)
-            logging.info(f"✅ Ticket added to sheet: {ticket_id}")
-
-            send_auto_reply(sender, subject, ticket_id)
+            ticket_id = add_ticket(ticket_data, on_written=committed)
+            logging.info(f"✅ Ticket queued for sheet: {ticket_id}")
+            created[key] = ticket_id
+            created_uids[key] = uid
         except Exception as e:
             logging.error(f"❌ Failed to process '{subject}': {e}")
 
-        # Mark as read
-        mail.store(e_id, "+FLAGS", "\\Seen")
+    # Write every ticket still queued from this pass in one batch
+    flush_error = None
+    try:
+        flush_tickets()
+    except Exception as e:
+        # Batches written earlier in the pass (full batch or timer) are kept;
+        # only the unwritten rows are dropped and their emails left unread
+        discard_pending_tickets()
+        flush_error = e
+
+    # Tickets opened this pass but not written, and the messages that depend on them
+    lost = set(created.values()) - {ticket_id for ticket_id, _ in written}
+    unwritten = {uid for key, uid in created_uids.items() if created[key] in lost}
+    unwritten |= {uid for _, ticket_id, uid in followups if ticket_id in lost}
+    followups = [(key, ticket_id) for key, ticket_id, uid in followups if uid not in unwritten]
+    if flush_error is not None:
+        logging.error(
+            f"❌ Failed to write tickets to sheet: {flush_error}. "
+            f"{len(unwritten)} message(s) left unread to retry on the next pass."
+        )
+
+    # Remember what each follow-up belongs to, so a re-read never threads it twice
+    message_index.record([(key, ticket_id, "reply", previews.get(key, "")) for key, ticket_id in followups])
+    for ticket_id in dict.fromkeys(ticket_id for _, ticket_id in followups):
+        try:
+            if reopen_ticket(ticket_id):
+                logging.info(f"🔁 Ticket {ticket_id} reopened by a customer reply.")
+        except Exception as e:
+            logging.error(f"❌ Could not reopen ticket {ticket_id}: {e}")
+    metrics.inc("threaded_replies", len(followups))
 
-    logging.info("All unread emails processed.\n")
+    # Hand confirmations to the reply workers; sending never blocks ingestion
+    reply_queue.enqueue_many([(t["from"], t["subject"], ticket_id) for ticket_id, t in written])
+
+    # Only mark messages as read (and move the checkpoint) once their tickets are committed
+    processed = [uid for uid in processed if uid not in unwritten]
+    held = unwritten | hold_back_skipped(mailbox_key, uidvalidity, skipped)
+    if held:
+        next_checkpoint = min(next_checkpoint, min(held) - 1)
+    mark_seen(mail, processed)
+    uid_checkpoint.save(mailbox_key, uidvalidity, next_checkpoint)
+    forget_skipped(mailbox_key, uidvalidity, next_checkpoint)
+    metrics.inc("emails_processed", len(processed))
+
+    stats = reply_queue.stats()
+    logging.info(
+        f"All new emails processed. Reply queue: {stats['depth']} waiting "
+        f"(oldest {stats['oldest_age_seconds']}s), {stats['failed']} failed.\n"
+    )
+    return len(processed)
 
 
 # -------------------------------
@@ -137,7 +430,7 @@ def check_inbox(mail):
 # -------------------------------
 def countdown(seconds):
     """Show live countdown timer in terminal"""
-    for remaining in range(seconds, 0, -1):
+    for remaining in range(int(seconds), 0, -1):
         sys.stdout.write(f"\r⏳ Next check in: {remaining:3d}s ")
         sys.stdout.flush()
         time.sleep(1)
@@ -145,22 +438,75 @@ def countdown(seconds):
     sys.stdout.flush()
 
 
+# -------------------------------
+# 🔁 Reader Loop
+# -------------------------------
+def run_reader(account=None, folders=None, on_pass=None, wait=None):
+    """
+    Watch one account's folders until interrupted. A single folder is watched with
+    IMAP IDLE; several folders share one connection and are polled in turn.
+    `on_pass(folder, processed, seconds)` is called after every inbox check.
+    """
+    account = account or default_account()
+    folders = folders or [Config.IMAP_FOLDER]
+    session = ImapSession(
+        lambda: connect_to_mailbox(account, folders[0]), wait=wait, use_idle=len(folders) == 1
+    )
+    try:
+        while True:
+            mail = session.mailbox()
+            try:
+                for folder in folders:
+                    if len(folders) > 1:
+                        mail.select(folder)
+                    started = time.monotonic()
+                    processed = check_inbox(mail, folder, account)
+                    if on_pass:
+                        on_pass(folder, processed, time.monotonic() - started)
+                session.wait_for_mail()
+            except (imaplib.IMAP4.error, OSError) as e:
+                # abort (connection lost) and error (a command refused) alike: start a new session
+                logging.warning(f"IMAP session for {account['email']} failed ({e}); reconnecting...")
+                session.drop()
+    finally:
+        session.close()
+
+
 # -------------------------------
 # ▶️ Main Loop
 # -------------------------------
+def _heartbeat_until_stopped():
+    """Keep this reader's heartbeat going; exit the process once the dashboard asks it to stop."""
+    while automation_runner.heartbeat():
+        time.sleep(1)
+    logging.info("⏹ Stop requested from the dashboard.")
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
 if __name__ == "__main__":
+    # Same single-reader lock as the supervisor: a reader started by hand never
+    # runs alongside it (or alongside another hand-started reader)
+    reader_lock = automation_runner.acquire_reader_lock()
+    if reader_lock is None:
+        logging.info("Another mail reader is already running; exiting.")
+        sys.exit(0)
+    automation_runner.register()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    threading.Thread(target=_heartbeat_until_stopped, name="reader-heartbeat", daemon=True).start()
+
     logging.info("Auto-Ticketing System Started. Monitoring emails...\n")
+    metrics.start_exporter("reader")
+    reply_workers = ReplyWorkerPool(reply_queue, send_auto_reply, send_batch=send_auto_replies)
+    reply_workers.start()
     try:
-        while True:
-            mail = connect_to_mailbox()
-            if mail:
-                check_inbox(mail)
-                mail.logout()
-            logging.info(f"Waiting {Config.POLL_INTERVAL} seconds before next check...\n")
-            countdown(Config.POLL_INTERVAL)
+        run_reader(wait=countdown)
     except KeyboardInterrupt:
         logging.info("Exiting safely. Auto-Ticketing System stopped by user.")
     except Exception as e:
         logging.error(f"Unexpected error occurred: {e}")
+    finally:
+        reply_workers.stop()
+        automation_runner.unregister()
+        reader_lock.release()
 
 ## press Ctrl+C to stop the script safely ##
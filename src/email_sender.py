@@ -1,28 +1,220 @@
 import os
 import base64
 import logging
+import queue
+import re
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
+from email.utils import make_msgid
 from email.mime.multipart import MIMEMultipart
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 from config import Config
+from google_clients import GoogleServiceHolder
+from metrics import metrics
 
 # Gmail API scopes
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
+TOKEN_FILE = "token.json"
 
 
-def send_auto_reply(to_email, subject, ticket_id):
+# -------------------------------
+# 🚦 Circuit Breaker
+# -------------------------------
+class CircuitBreaker:
     """
-    Sends an auto-reply email using Gmail API, SendGrid, or SMTP (fallback).
-    Priority: Gmail API → SendGrid → SMTP.
+    Skips a backend after `threshold` consecutive failures for `cooldown` seconds.
+    After the cool-down one trial call is let through; success closes the circuit.
     """
-    logging.info(f"Attempting to send auto-reply to {to_email} (Ticket ID: {ticket_id})")
 
-    # Email body (HTML)
-    html_content = f"""
+    def __init__(self, name, threshold=None, cooldown=None):
+        self.name = name
+        self.threshold = threshold or Config.BACKEND_FAILURE_THRESHOLD
+        self.cooldown = cooldown or Config.BACKEND_COOLDOWN_SECONDS
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._failures >= self.threshold:
+                if self._opened_at is None:
+                    logging.warning(f"🚦 {self.name} failed {self._failures} times; skipping it for {self.cooldown:.0f}s.")
+                self._opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+
+breakers = {
+    "gmail": CircuitBreaker("Gmail API"),
+    "sendgrid": CircuitBreaker("SendGrid"),
+    "smtp": CircuitBreaker("SMTP"),
+}
+
+
+# -------------------------------
+# 🔌 Long-lived Backend Clients
+# -------------------------------
+def _gmail_credentials():
+    from google.oauth2.credentials import Credentials
+    return Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+
+
+gmail_client = GoogleServiceHolder("gmail", "v1", _gmail_credentials)
+
+_sendgrid_client = None
+_sendgrid_key = None
+_sendgrid_lock = threading.Lock()
+
+
+def get_sendgrid_client(api_key):
+    """Reuse one SendGrid client (and its HTTP session) per API key."""
+    global _sendgrid_client, _sendgrid_key
+    with _sendgrid_lock:
+        if _sendgrid_client is None or _sendgrid_key != api_key:
+            from sendgrid import SendGridAPIClient  # imported on first use; it is slow to load
+            _sendgrid_client = SendGridAPIClient(api_key)
+            _sendgrid_key = api_key
+        return _sendgrid_client
+
+
+class SmtpPool:
+    """
+    Small pool of logged-in SMTP connections that are kept open between replies.
+    Connections idle longer than `max_idle` are checked with NOOP before reuse, and
+    a send that hits a dropped connection is retried once on a fresh one.
+    """
+
+    def __init__(self, host=None, port=None, size=None, max_idle=60):
+        self.host = host or Config.SMTP_SERVER
+        self.port = port or Config.SMTP_PORT
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue(maxsize=size or Config.SMTP_POOL_SIZE)
+
+    def _connect(self):
+        logging.info("🔐 Connecting to SMTP server...")
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        if Config.SMTP_STARTTLS:
+            server.starttls()
+        if Config.EMAIL_PASSWORD:
+            server.login(Config.EMAIL, Config.EMAIL_PASSWORD)
+        return server
+
+    def _acquire(self):
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < self.max_idle:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            _close_quietly(server)
+
+    def _release(self, server):
+        try:
+            self._idle.put_nowait((server, time.monotonic()))
+        except queue.Full:
+            _close_quietly(server)
+
+    def send_message(self, msg):
+        server = self._acquire()
+        try:
+            server.send_message(msg)
+        except Exception as e:
+            if not _connection_dropped(e):
+                # The server answered (refused recipient, DATA error, ...): resending won't help
+                _close_quietly(server)
+                raise
+            # Stale keep-alive connection: retry once on a fresh one
+            _close_quietly(server)
+            server = self._connect()
+            try:
+                server.send_message(msg)
+            except Exception:
+                _close_quietly(server)
+                raise
+        self._release(server)
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close_quietly(server)
+
+
+def _connection_dropped(error):
+    # SMTPException subclasses OSError, so a plain OSError check would also match
+    # the server's own error replies; only a disconnect or a socket error counts
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def _close_quietly(server):
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+
+smtp_pool = SmtpPool()
+
+
+SENDER_ADDRESS = re.compile(r"\(([^()\s]+@[^()\s]+)\)\s*$")
+
+
+def reply_address(sender):
+    """
+    Bare address to reply to. Tickets store senders as "Name (email@example.com)"
+    (see extract_sender); mail servers need just the address part.
+    """
+    match = SENDER_ADDRESS.search(sender or "")
+    return match.group(1) if match else (sender or "").strip()
+
+
+def reply_message_id(ticket_id):
+    """
+    Message-ID for a confirmation. It embeds the ticket ID, so a customer's reply
+    (whose In-Reply-To points here) is threaded onto the ticket by email_reader.
+    """
+    domain = (Config.EMAIL or "").rpartition("@")[2] or None
+    return make_msgid(idstring=ticket_id, domain=domain)
+
+
+def reply_html(subject, ticket_id):
+    """HTML body of the ticket confirmation email."""
+    return f"""
     <html>
     <body style="font-family: Arial, sans-serif; color: #333;">
         <p>Dear Customer,</p>
@@ -41,26 +233,49 @@ def send_auto_reply(to_email, subject, ticket_id):
     </html>
     """
 
+
+def _gmail_raw_message(to_email, subject, ticket_id):
+    message = MIMEText(reply_html(subject, ticket_id), "html")
+    message["to"] = reply_address(to_email)
+    message["subject"] = f"[Ticket Received] {subject} (ID: {ticket_id})"
+    message["Message-ID"] = reply_message_id(ticket_id)
+    return base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
+
+
+def send_auto_reply(to_email, subject, ticket_id, use_gmail=True):
+    """
+    Sends an auto-reply email using Gmail API, SendGrid, or SMTP (fallback).
+    Priority: Gmail API → SendGrid → SMTP. `use_gmail=False` starts at SendGrid.
+    """
+    to_email = reply_address(to_email)
+    logging.info(f"Attempting to send auto-reply to {to_email} (Ticket ID: {ticket_id})")
+
+    # Email body (HTML)
+    html_content = reply_html(subject, ticket_id)
+
     # ========================================
     # 1️⃣ Try Gmail API (if token.json exists)
     # ========================================
     try:
-        if os.path.exists("token.json"):
-            creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-            service = build("gmail", "v1", credentials=creds)
-
-            message = MIMEText(html_content, "html")
-            message["to"] = to_email
-            message["subject"] = f"[Ticket Received] {subject} (ID: {ticket_id})"
+        if not use_gmail:
+            pass
+        elif not os.path.exists(TOKEN_FILE):
+            logging.warning("⚠️ token.json not found. Trying SendGrid next...")
+        elif not breakers["gmail"].allow():
+            logging.info("⏭ Gmail API is cooling down after repeated failures. Trying SendGrid...")
+        else:
+            service = gmail_client.get()
 
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
-            service.users().messages().send(userId="me", body={"raw": raw_message}).execute()
+            raw_message = _gmail_raw_message(to_email, subject, ticket_id)
+            with metrics.timer("reply_gmail"):
+                service.users().messages().send(userId="me", body={"raw": raw_message}).execute()
 
+            breakers["gmail"].record_success()
+            metrics.inc("replies_sent_gmail")
             logging.info(f"✅ Auto-reply sent successfully via Gmail API to {to_email}")
             return True
-        else:
-            logging.warning("⚠️ token.json not found. Trying SendGrid next...")
     except Exception as e:
+        breakers["gmail"].record_failure()
         logging.error(f"❌ Gmail API failed ({e}). Trying SendGrid...")
 
     # ========================================
@@ -68,47 +283,120 @@ def send_auto_reply(to_email, subject, ticket_id):
     # ========================================
     try:
         sendgrid_api = os.getenv("SENDGRID_API_KEY")
-        if sendgrid_api:
+        if sendgrid_api and not breakers["sendgrid"].allow():
+            logging.info("⏭ SendGrid is cooling down after repeated failures. Using SMTP fallback...")
+        elif sendgrid_api:
+            from sendgrid.helpers.mail import Mail
             message = Mail(
                 from_email=Config.EMAIL,
                 to_emails=to_email,
                 subject=f"[Ticket Received] {subject} (ID: {ticket_id})",
                 html_content=html_content,
             )
-            sg = SendGridAPIClient(sendgrid_api)
-            response = sg.send(message)
+            sg = get_sendgrid_client(sendgrid_api)
+            with metrics.timer("reply_sendgrid") as timer:
+                response = sg.send(message)
+                timer.failed = response.status_code not in (200, 202)
 
             if response.status_code in (200, 202):
+                breakers["sendgrid"].record_success()
+                metrics.inc("replies_sent_sendgrid")
                 logging.info(f"✅ Auto-reply sent successfully via SendGrid to {to_email}")
                 return True
             else:
+                breakers["sendgrid"].record_failure()
                 logging.error(f"❌ SendGrid returned status {response.status_code}: {response.body}")
         else:
             logging.warning("⚠️ SENDGRID_API_KEY not found in environment. Using SMTP fallback...")
     except Exception as e:
+        breakers["sendgrid"].record_failure()
         logging.error(f"❌ SendGrid failed ({e}). Trying SMTP fallback...")
 
     # ========================================
     # 3️⃣ Final Fallback — Gmail SMTP
     # ========================================
+    if not breakers["smtp"].allow():
+        logging.error("❌ SMTP is cooling down after repeated failures; reply will be retried later.")
+        metrics.inc("replies_unsent")
+        return False
+
     try:
         sender_email = Config.EMAIL
-        sender_pass = Config.EMAIL_PASSWORD
 
         msg = MIMEMultipart("alternative")
         msg["Subject"] = f"[Ticket Received] {subject} (ID: {ticket_id})"
         msg["From"] = sender_email
         msg["To"] = to_email
+        msg["Message-ID"] = reply_message_id(ticket_id)
         msg.attach(MIMEText(html_content, "html"))
 
-        logging.info("🔐 Connecting to Gmail SMTP...")
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_pass)
-            server.send_message(msg)
+        with metrics.timer("reply_smtp"):
+            smtp_pool.send_message(msg)
 
+        breakers["smtp"].record_success()
+        metrics.inc("replies_sent_smtp")
         logging.info(f"✅ Auto-reply sent successfully via SMTP to {to_email}")
         return True
     except Exception as e:
+        breakers["smtp"].record_failure()
         logging.error(f"❌ SMTP general error: {e}")
+        metrics.inc("replies_unsent")
         return False
+
+
+# -------------------------------
+# 📦 Gmail Batch Send
+# -------------------------------
+def send_auto_replies(replies):
+    """
+    Send many confirmations at once. `replies` is a list of
+    (to_email, subject, ticket_id) tuples; returns a list of booleans in the same order.
+
+    Messages go through Gmail API batch requests (GMAIL_BATCH_SIZE per HTTP call,
+    below Gmail's limit of 100). Any message the batch could not deliver falls
+    back to SendGrid/SMTP individually via send_auto_reply.
+    """
+    results = [False] * len(replies)
+
+    if replies and os.path.exists(TOKEN_FILE) and breakers["gmail"].allow():
+        try:
+            _gmail_batch_send(replies, results)
+        except Exception as e:
+            breakers["gmail"].record_failure()
+            logging.error(f"❌ Gmail API batch failed ({e}). Falling back per message...")
+        else:
+            if any(results):
+                breakers["gmail"].record_success()
+            else:
+                breakers["gmail"].record_failure()
+
+    for i, (to_email, subject, ticket_id) in enumerate(replies):
+        if not results[i]:
+            results[i] = send_auto_reply(to_email, subject, ticket_id, use_gmail=False)
+    return results
+
+
+def _gmail_batch_send(replies, results):
+    service = gmail_client.get()
+    size = max(1, min(Config.GMAIL_BATCH_SIZE, 100))
+
+    for start in range(0, len(replies), size):
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            to_email, _, ticket_id = replies[index]
+            if exception is None:
+                results[index] = True
+                metrics.inc("replies_sent_gmail")
+                logging.info(f"✅ Auto-reply sent successfully via Gmail API batch to {to_email}")
+            else:
+                logging.error(f"❌ Gmail API batch send failed for {ticket_id} ({exception}).")
+
+        batch = service.new_batch_http_request(callback=on_response)
+        for index in range(start, min(start + size, len(replies))):
+            raw_message = _gmail_raw_message(*replies[index])
+            batch.add(
+                service.users().messages().send(userId="me", body={"raw": raw_message}),
+                request_id=str(index),
+            )
+        with metrics.timer("reply_gmail_batch"):
+            batch.execute()
@@ -0,0 +1,72 @@
+import itertools
+import queue
+import threading
+
+
+# -------------------------------
+# 📣 In-Process Event Bus
+# -------------------------------
+class Subscription:
+    """One listener's queue of (event_id, kind, data) tuples."""
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def get(self, timeout=None):
+        """Next event, or None after `timeout` seconds without one."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """
+    Fan-out of small dashboard events ("status", "ticket", "stats") to every
+    subscriber, e.g. one per open SSE stream. publish() never blocks: a
+    subscriber whose queue is full loses its oldest event.
+    """
+
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._ids = itertools.count(1)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, kind, data):
+        with self._lock:
+            event = (next(self._ids), kind, data)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            while True:
+                try:
+                    sub.queue.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        sub.queue.get_nowait()
+                        sub.dropped += 1
+                    except queue.Empty:
+                        pass
+        return event[0]
+
+    def subscribe(self, limit=None):
+        """New subscription, or None when `limit` subscribers already exist."""
+        sub = Subscription(self.queue_size)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+event_bus = EventBus()
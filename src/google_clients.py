@@ -0,0 +1,175 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from config import Config
+from metrics import metrics
+
+# googleapiclient, google.auth and httplib2 are imported on first use: they take
+# longer to import than the rest of the app together, and most processes (web
+# workers serving cached pages, the reader before its first ticket) never need them.
+
+SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+DISCOVERY_URL = "https://{api}.googleapis.com/$discovery/rest?version={version}"
+
+
+# -------------------------------
+# 📚 Discovery Document Cache
+# -------------------------------
+class DiscoveryCache:
+    """
+    Discovery documents kept on disk, so building a service is a file read plus
+    build_from_document() rather than a lookup (or a download) on every build.
+    Files are named after the API, its version and the googleapiclient release
+    that wrote them; a new library release, or a file older than `max_age`,
+    makes the next build fetch the document again.
+    """
+
+    def __init__(self, directory=None, max_age=None):
+        self.directory = directory or Config.DISCOVERY_CACHE_DIR
+        self.max_age = Config.DISCOVERY_CACHE_MAX_AGE if max_age is None else max_age
+
+    def path(self, api, version):
+        from googleapiclient.version import __version__ as library_version
+        return os.path.join(self.directory, f"{api}.{version}.{library_version}.json")
+
+    def load(self, api, version):
+        """The discovery document for api/version as a dict."""
+        path = self.path(api, version)
+        try:
+            if time.time() - os.path.getmtime(path) < self.max_age:
+                with open(path) as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        try:
+            document = json.loads(self._fetch(api, version))
+        except Exception as e:
+            # Offline or the API is down: an older cached copy is better than nothing
+            older = sorted(glob.glob(os.path.join(self.directory, f"{api}.{version}.*.json")), key=os.path.getmtime)
+            if not older:
+                raise
+            logging.warning(f"⚠️ Could not refresh the {api} {version} discovery document ({e}); using {older[-1]}.")
+            with open(older[-1]) as f:
+                return json.load(f)
+
+        self._save(path, document)
+        return document
+
+    def _fetch(self, api, version):
+        try:
+            # googleapiclient 2.x ships the documents of the public APIs
+            from googleapiclient.discovery_cache import get_static_doc
+            document = get_static_doc(api, version)
+        except ImportError:
+            document = None
+        if document is None:
+            import httplib2
+            response, content = httplib2.Http(timeout=30).request(DISCOVERY_URL.format(api=api, version=version))
+            if response.status != 200:
+                raise RuntimeError(f"discovery request for {api} {version} returned HTTP {response.status}")
+            document = content.decode("utf-8")
+        return document
+
+    def _save(self, path, document):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(document, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.warning(f"⚠️ Could not cache the discovery document at {path}: {e}")
+
+
+discovery_cache = DiscoveryCache()
+
+
+# -------------------------------
+# 🔌 Shared Google API Client
+# -------------------------------
+class GoogleServiceHolder:
+    """
+    Builds a Google API service once per process and shares it between threads.
+
+    httplib2 connections are not thread-safe, so every thread gets its own
+    authorized HTTP object; the credentials (and their access token) are shared
+    and only refreshed when they have actually expired.
+    """
+
+    def __init__(self, api, version, credentials_factory):
+        self.api = api
+        self.version = version
+        self._credentials_factory = credentials_factory
+        self._credentials = None
+        self._service = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._local = threading.local()
+
+    def get(self):
+        """Return the shared service, building it on first use."""
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    from googleapiclient.discovery import build_from_document
+                    with metrics.timer("google_build"):
+                        self._credentials = self._credentials_factory()
+                        self._service = build_from_document(
+                            discovery_cache.load(self.api, self.version),
+                            http=self._thread_http(),
+                            requestBuilder=self._build_request,
+                        )
+        self._ensure_token()
+        return self._service
+
+    def set_service(self, service):
+        """Use a prebuilt service (or a stand-in) instead of building one."""
+        with self._lock:
+            self._service = service
+            self._credentials = None
+
+    def reset(self):
+        """Drop the cached service so the next get() rebuilds it."""
+        with self._lock:
+            self._service = None
+            self._credentials = None
+            self._local = threading.local()
+
+    def _thread_http(self):
+        import httplib2
+        import google_auth_httplib2
+        http = getattr(self._local, "http", None)
+        if http is None or http.credentials is not self._credentials:
+            http = google_auth_httplib2.AuthorizedHttp(self._credentials, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def _build_request(self, http, *args, **kwargs):
+        # Ignore the http captured at build time and use this thread's own
+        from googleapiclient.http import HttpRequest
+        return HttpRequest(self._thread_http(), *args, **kwargs)
+
+    def _ensure_token(self):
+        creds = self._credentials
+        if creds is None or creds.valid:
+            return
+        import httplib2
+        import google_auth_httplib2
+        with self._refresh_lock:
+            if not creds.valid:
+                creds.refresh(google_auth_httplib2.Request(httplib2.Http()))
+
+
+def _sheets_credentials():
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_file(
+        Config.SERVICE_JSON,
+        scopes=SHEETS_SCOPES
+    )
+
+
+sheets_client = GoogleServiceHolder("sheets", "v4", _sheets_credentials)
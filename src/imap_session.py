@@ -0,0 +1,149 @@
+import imaplib
+import logging
+import random
+import select
+import ssl
+import time
+from config import Config
+
+
+class IdleRejected(imaplib.IMAP4.error):
+    """The server answered IDLE with something other than a continuation."""
+
+
+# -------------------------------
+# 📡 Persistent IMAP Session (IDLE)
+# -------------------------------
+class ImapSession:
+    """
+    Keeps one IMAP connection open between inbox checks.
+
+    wait_for_mail() blocks in IMAP IDLE until the server reports new mail (or
+    the IDLE timeout passes), so tickets are created seconds after mail lands.
+    Servers without IDLE (or sessions watching several folders, use_idle=False)
+    are polled every POLL_INTERVAL seconds instead, as are servers that
+    advertise IDLE but then refuse it.
+    Dropped connections are re-opened with exponential backoff, which keeps
+    growing while every new session fails again before its first wait.
+    """
+
+    def __init__(self, connect, idle_timeout=None, poll_interval=None, wait=None, use_idle=True):
+        self._connect = connect
+        self.use_idle = use_idle
+        self.idle_timeout = idle_timeout or Config.IMAP_IDLE_TIMEOUT
+        self.poll_interval = poll_interval or Config.POLL_INTERVAL
+        self._wait = wait or time.sleep
+        self.mail = None
+        self.supports_idle = False
+        self._idling = False
+        self._failures = 0  # sessions dropped since the last completed wait
+
+    def mailbox(self):
+        """Return a connected, selected mailbox, reconnecting (with backoff) as needed."""
+        attempt = self._failures
+        while self.mail is None:
+            if attempt:
+                delay = min(Config.IMAP_RECONNECT_MAX_DELAY, 2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+                logging.info(f"Reconnecting to IMAP in {delay:.0f}s...")
+                self._wait(delay)
+            try:
+                mail = self._connect()
+            except (OSError, imaplib.IMAP4.error) as e:
+                logging.error(f"IMAP connection failed: {e}")
+                mail = None
+
+            if mail is not None:
+                self.mail = mail
+                self.supports_idle = self.use_idle and "IDLE" in mail.capabilities
+                if self.use_idle and not self.supports_idle:
+                    logging.warning("Server does not support IMAP IDLE; falling back to polling.")
+                break
+            attempt += 1
+        return self.mail
+
+    def wait_for_mail(self):
+        """Block until new mail may be waiting. Raises imaplib.IMAP4.error if the session fails."""
+        if self.supports_idle:
+            self._idling = True  # stays set if IDLE is interrupted, see drop()
+            try:
+                new_mail = self._idle(self.mail, self.idle_timeout)
+            except IdleRejected as e:
+                self._idling = False
+                logging.warning(f"{e}; falling back to polling.")
+                self.use_idle = self.supports_idle = False
+                return self.wait_for_mail()
+            self._idling = False
+            if new_mail:
+                logging.info("📬 New mail reported by IMAP IDLE.")
+        else:
+            logging.info(f"Waiting {self.poll_interval} seconds before next check...\n")
+            self._wait(self.poll_interval)
+            self.mail.noop()
+        self._failures = 0
+
+    def drop(self):
+        """Forget the current connection; the next mailbox() call reconnects."""
+        mail, self.mail = self.mail, None
+        if mail is not None:
+            self._failures += 1
+            try:
+                if self._idling:
+                    # Interrupted mid-IDLE (e.g. on shutdown): LOGOUT would not be answered
+                    mail.shutdown()
+                else:
+                    mail.logout()
+            except Exception:
+                pass
+        self._idling = False
+
+    close = drop
+
+    def _idle(self, mail, timeout):
+        """Run one IDLE command. Returns True if the server announced new messages."""
+        tag = mail._new_tag()
+        mail.send(tag + b" IDLE\r\n")
+        line = mail.readline()
+        if not line.startswith(b"+"):
+            raise IdleRejected(f"IDLE rejected: {line.strip()!r}")
+
+        new_mail = False
+        deadline = time.monotonic() + timeout
+        while not new_mail:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not _data_waiting(mail):
+                ready, _, _ = select.select([mail.sock], [], [], remaining)
+                if not ready:
+                    break
+            line = mail.readline()
+            if not line or line.startswith(b"* BYE"):
+                raise imaplib.IMAP4.abort("server closed the IDLE session")
+            if line.rstrip().endswith((b"EXISTS", b"RECENT")):
+                new_mail = True
+
+        mail.send(b"DONE\r\n")
+        while True:
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("connection lost while ending IDLE")
+            if line.startswith(tag):
+                if not line[len(tag):].strip().upper().startswith(b"OK"):
+                    raise imaplib.IMAP4.error(f"IDLE failed: {line.strip()!r}")
+                return new_mail
+            if line.rstrip().endswith((b"EXISTS", b"RECENT")):
+                new_mail = True
+
+
+def _data_waiting(mail):
+    """True if a response is already buffered locally (select() would not see it)."""
+    sock = mail.sock
+    if isinstance(sock, ssl.SSLSocket) and sock.pending():
+        return True
+    sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.setblocking(True)
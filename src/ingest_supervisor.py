@@ -0,0 +1,336 @@
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from config import Config
+import log_pipeline
+
+
+def load_mailboxes(raw=None, path=None):
+    """
+    Mailboxes to watch, from MAILBOXES_JSON (a JSON list) or the JSON file named
+    by MAILBOXES_FILE. Each entry looks like:
+
+        {"email": "support@example.com", "password_env": "SUPPORT_IMAP_PASSWORD",
+         "imap_server": "imap.gmail.com", "folders": ["INBOX", "Billing"],
+         "folders_per_worker": 1}
+
+    Only "email" is required; "password" may be given inline instead of
+    "password_env". Without either setting, the single EMAIL_ADDRESS account is used.
+    Raises ValueError naming the offending entry if the list is malformed.
+    """
+    raw = raw if raw is not None else Config.MAILBOXES_JSON
+    path = path if path is not None else Config.MAILBOXES_FILE
+    source = "MAILBOXES_JSON"
+    if not raw and path and os.path.exists(path):
+        with open(path) as f:
+            raw = f.read()
+        source = path
+    if not raw:
+        entries = [{"email": Config.EMAIL}]
+    else:
+        try:
+            entries = json.loads(raw)
+        except ValueError as e:
+            raise ValueError(f"{source} is not valid JSON: {e}") from None
+        if not isinstance(entries, list) or not entries:
+            raise ValueError(f"{source} must be a non-empty JSON list of mailboxes")
+
+    mailboxes = []
+    for number, entry in enumerate(entries, start=1):
+        # Named by position and address only: an entry may hold an inline password
+        if not isinstance(entry, dict):
+            raise ValueError(f"Mailbox #{number} in {source} is not a JSON object")
+        email = entry.get("email")
+        if not isinstance(email, str) or not email:
+            raise ValueError(f"Mailbox #{number} in {source} has no \"email\"")
+        name = f"Mailbox #{number} ({email}) in {source}"
+
+        folders = entry.get("folders") or [Config.IMAP_FOLDER]
+        if not isinstance(folders, list) or not all(isinstance(f, str) and f for f in folders):
+            raise ValueError(f"{name}: \"folders\" must be a list of folder names")
+        try:
+            folders_per_worker = max(1, int(entry.get("folders_per_worker", 1)))
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"{name}: \"folders_per_worker\" must be a number, not {entry['folders_per_worker']!r}"
+            ) from None
+
+        password = entry.get("password")
+        if password is None:
+            password = os.getenv(entry.get("password_env", "EMAIL_APP_PASSWORD"))
+        mailboxes.append({
+            "email": email,
+            "password": password,
+            "imap_server": entry.get("imap_server", Config.IMAP_SERVER),
+            "folders": folders,
+            "folders_per_worker": folders_per_worker,
+        })
+    return mailboxes
+
+
+def mailbox_shards(mailboxes=None):
+    """
+    Split the configured mailboxes into worker shards: one per account and group of
+    `folders_per_worker` folders. Each shard is watched by its own process.
+    """
+    shards = []
+    for mailbox in mailboxes or load_mailboxes():
+        folders = mailbox["folders"]
+        size = mailbox["folders_per_worker"]
+        for i in range(0, len(folders), size):
+            group = folders[i:i + size]
+            shards.append({
+                "name": f"{mailbox['email']}:{'+'.join(group)}",
+                "account": {k: mailbox[k] for k in ("email", "password", "imap_server")},
+                "folders": group,
+            })
+    return shards
+
+
+def read_ingest_status(path=None):
+    """Latest per-worker throughput written by a running supervisor, or None."""
+    try:
+        with open(path or Config.INGEST_STATUS_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _worker_main(shard, stats_queue, log_queue):
+    """Entry point of a worker process: ingest one shard until terminated."""
+    from log_pipeline import setup_logging
+    setup_logging(log_queue=log_queue)  # the supervisor writes the log file
+    from email_reader import run_reader
+    from metrics import metrics
+    from ticket_manager import discard_pending_tickets
+
+    def on_term(*_):
+        # Tickets still buffered belong to mail not yet marked read; it is re-read next time
+        discard_pending_tickets()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, on_term)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor decides when to stop
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+
+    def on_pass(folder, processed, seconds):
+        stats_queue.put((shard["name"], processed, seconds, time.time()))
+
+    metrics.start_exporter("ingest")
+    logging.info(f"👷 Worker {os.getpid()} watching {shard['name']}")
+    run_reader(shard["account"], shard["folders"], on_pass=on_pass)
+
+
+def _exit_with_parent(parent_pid, interval=1.0):
+    # A killed supervisor cannot stop its workers; orphans stop themselves so a
+    # relaunched supervisor does not end up with two readers per mailbox
+    while os.getppid() == parent_pid:
+        time.sleep(interval)
+    logging.warning(f"Supervisor {parent_pid} is gone; worker {os.getpid()} exiting.")
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+# -------------------------------
+# 🧑‍✈️ Ingest Supervisor
+# -------------------------------
+class IngestSupervisor:
+    """
+    Runs one ingestion process per mailbox shard, so independent mailboxes are
+    read in parallel on separate cores. Crashed workers are restarted with
+    exponential backoff; workers report each inbox pass back over a queue and the
+    totals are logged and written to INGEST_STATUS_FILE.
+    """
+
+    STABLE_SECONDS = 60  # a worker that ran this long has its crash backoff reset
+
+    def __init__(self, shards=None, status_file=None, report_interval=None):
+        self.shards = shards if shards is not None else mailbox_shards()
+        self.status_file = status_file or Config.INGEST_STATUS_FILE
+        self.report_interval = Config.INGEST_REPORT_SECONDS if report_interval is None else report_interval
+        # Spawned (not forked) children: the supervisor itself runs threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stats_queue = self._ctx.Queue()
+        self._log_queue = self._ctx.Queue()
+        self._workers = {}
+        self._stopping = False
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.time()
+        log_pipeline.listen(self._log_queue)
+        for shard in self.shards:
+            self._workers[shard["name"]] = {
+                "shard": shard, "process": None, "restarts": 0, "crashes": 0,
+                "restart_at": 0.0, "started_at": None,
+                "messages": 0, "passes": 0, "busy_seconds": 0.0, "last_pass_at": None,
+            }
+            self._spawn(self._workers[shard["name"]])
+        logging.info(f"🧑‍✈️ Ingest supervisor started {len(self.shards)} worker(s).")
+
+    def run(self, poll=1.0, keep_running=None):
+        """
+        Supervise until interrupted or stop() is called. `keep_running()` is called
+        every `poll` seconds; returning False ends the loop.
+        """
+        last_report = time.monotonic()
+        while not self._stopping:
+            if keep_running is not None and not keep_running():
+                logging.info("⏹ Stop requested from the dashboard.")
+                break
+            self._collect_stats(timeout=poll)
+            self._check_workers()
+            if time.monotonic() - last_report >= self.report_interval:
+                self.report()
+                last_report = time.monotonic()
+
+    def stop(self, timeout=15):
+        self._stopping = True
+        for worker in self._workers.values():
+            if worker["process"] is not None and worker["process"].is_alive():
+                worker["process"].terminate()
+        for worker in self._workers.values():
+            if worker["process"] is not None:
+                worker["process"].join(timeout)
+                if worker["process"].is_alive():
+                    worker["process"].kill()
+        self._collect_stats(timeout=0)
+        self.report()
+
+    def stats(self):
+        """Per-worker and total throughput since the supervisor started."""
+        now = time.time()
+        workers = {}
+        for name, w in self._workers.items():
+            process = w["process"]
+            workers[name] = {
+                "pid": process.pid if process is not None else None,
+                "alive": process is not None and process.is_alive(),
+                "restarts": w["restarts"],
+                "messages": w["messages"],
+                "passes": w["passes"],
+                "busy_seconds": round(w["busy_seconds"], 2),
+                "messages_per_busy_second": round(w["messages"] / w["busy_seconds"], 2) if w["busy_seconds"] else 0.0,
+                "last_pass_at": w["last_pass_at"],
+            }
+        uptime = now - self._started_at if self._started_at else 0
+        total = sum(w["messages"] for w in workers.values())
+        return {
+            "updated_at": now,
+            "uptime_seconds": round(uptime, 1),
+            "total_messages": total,
+            "messages_per_minute": round(total * 60 / uptime, 2) if uptime else 0.0,
+            "workers": workers,
+        }
+
+    def report(self):
+        stats = self.stats()
+        alive = sum(1 for w in stats["workers"].values() if w["alive"])
+        logging.info(
+            f"📈 Ingest: {stats['total_messages']} message(s) in {stats['uptime_seconds']}s "
+            f"({stats['messages_per_minute']}/min), {alive}/{len(stats['workers'])} worker(s) alive."
+        )
+        if os.path.dirname(self.status_file):
+            os.makedirs(os.path.dirname(self.status_file), exist_ok=True)
+        tmp = f"{self.status_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(stats, f)
+        os.replace(tmp, self.status_file)
+
+    def _spawn(self, worker):
+        process = self._ctx.Process(
+            target=_worker_main, args=(worker["shard"], self._stats_queue, self._log_queue),
+            name=f"ingest-{worker['shard']['name']}", daemon=True,
+        )
+        process.start()
+        worker["process"] = process
+        worker["started_at"] = time.monotonic()
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for name, worker in self._workers.items():
+            process = worker["process"]
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                # Just exited: schedule a restart, backing off if it keeps crashing
+                if now - worker["started_at"] >= self.STABLE_SECONDS:
+                    worker["crashes"] = 0
+                delay = min(Config.WORKER_RESTART_MAX_DELAY, 2 ** worker["crashes"])
+                worker["crashes"] += 1
+                worker["process"] = None
+                worker["restart_at"] = now + delay
+                logging.error(
+                    f"💥 Ingest worker {name} exited with code {process.exitcode}; restarting in {delay}s."
+                )
+            elif now >= worker["restart_at"]:
+                worker["restarts"] += 1
+                self._spawn(worker)
+
+    def _collect_stats(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                name, processed, seconds, at = self._stats_queue.get(
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            except queue.Empty:
+                return
+            worker = self._workers.get(name)
+            if worker is not None:
+                worker["messages"] += processed
+                worker["passes"] += 1
+                worker["busy_seconds"] += seconds
+                worker["last_pass_at"] = at
+            # After the first item only drain what is already waiting
+            deadline = time.monotonic()
+
+
+# -------------------------------
+# ▶️ Main
+# -------------------------------
+if __name__ == "__main__":
+    from startup_report import startup_report
+    startup_report.start()
+    from email_reader import send_auto_reply, send_auto_replies  # also sets up logging
+    from reply_queue import reply_queue, ReplyWorkerPool
+    from automation_runner import automation_runner
+    from metrics import metrics
+
+    try:
+        shards = mailbox_shards()
+    except ValueError as e:
+        logging.error(f"❌ Mailbox configuration error: {e}")
+        sys.exit(1)
+
+    # Only one reader may run, however many web workers asked for one
+    reader_lock = automation_runner.acquire_reader_lock()
+    if reader_lock is None:
+        logging.info("Another mail reader is already running; exiting.")
+        sys.exit(0)
+    automation_runner.register()
+    metrics.start_exporter("supervisor")
+    startup_report.finish("Mail reader")
+
+    supervisor = IngestSupervisor(shards)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    logging.info("Auto-Ticketing System Started. Monitoring emails...\n")
+    supervisor.start()
+    # Replies are sent from here; workers only ingest and queue them
+    reply_workers = ReplyWorkerPool(reply_queue, send_auto_reply, send_batch=send_auto_replies)
+    reply_workers.start()
+    try:
+        supervisor.run(keep_running=automation_runner.heartbeat)
+    except KeyboardInterrupt:
+        logging.info("Exiting safely. Auto-Ticketing System stopped by user.")
+    finally:
+        supervisor.stop()
+        reply_workers.stop()
+        automation_runner.unregister()
+        reader_lock.release()
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from config import Config
+from automation_runner import automation_runner
+from event_bus import event_bus
+from ticket_db import ticket_db
+from ticket_manager import sync_ticket_mirror
+
+
+def _day_counts(pairs):
+    return [{"date": day, "count": count} for day, count in pairs]
+
+
+# -------------------------------
+# 📡 Live Dashboard Feed
+# -------------------------------
+class LiveFeed:
+    """
+    Puts changes made by other processes on this web worker's event bus.
+
+    Tickets are written by the reader, not by the web app, so one background
+    thread per web worker watches the local ticket database (PRAGMA
+    data_version tells it when anything was committed) and the shared runner
+    state, and publishes "ticket", "stats" and "status" events. However many
+    dashboards are open, the database (and, with the Sheets backend, the sheet
+    sync) is polled once per interval, and only while someone is listening.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = Config.LIVE_FEED_POLL_SECONDS if interval is None else interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._marker = None
+        self._last_row = None
+        self._counts = {}
+        self._today = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+                self._thread.start()
+
+    def snapshot(self):
+        """Current status and stats, sent to a client when it connects."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        return [
+            ("status", automation_runner.status()),
+            ("stats", {"full": True, "days": _day_counts(ticket_db.counts_by_day()),
+                       "today": ticket_db.daily_summary(today)}),
+        ]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not event_bus.subscriber_count():
+                # Nobody listening: start over from the current state next time
+                self._marker = None
+                continue
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error(f"❌ Live feed poll failed: {e}")
+
+    def poll(self):
+        automation_runner.publish_status()
+        sync_ticket_mirror()
+
+        marker = ticket_db.change_marker()
+        if self._marker is None:
+            # (Re)starting: remember where things stand without replaying history
+            self._marker = marker
+            self._last_row = ticket_db.last_row_index()
+            self._counts = dict(ticket_db.counts_by_day())
+            self._today = None
+            return
+        if marker == self._marker:
+            return
+        self._marker = marker
+
+        while True:
+            new = ticket_db.tickets_after(self._last_row)
+            for row_index, ticket in new:
+                event_bus.publish("ticket", ticket)
+                self._last_row = row_index
+            if len(new) < 100:
+                break
+
+        counts = dict(ticket_db.counts_by_day())
+        changed = sorted(day for day in counts.keys() | self._counts.keys()
+                         if counts.get(day, 0) != self._counts.get(day, 0))
+        self._counts = counts
+        today = ticket_db.daily_summary(datetime.now().strftime("%Y-%m-%d"))
+        if changed or today != self._today:
+            self._today = today
+            event_bus.publish("stats", {
+                "full": False,
+                "days": [{"date": day, "count": counts.get(day, 0)} for day in changed],
+                "today": today,
+            })
+
+
+live_feed = LiveFeed()
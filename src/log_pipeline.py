@@ -0,0 +1,133 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from config import Config
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+_lock = threading.Lock()
+_handlers = None   # the file + console handlers owned by this process
+_listeners = []
+
+
+# -------------------------------
+# 🪵 Queue-Based Logging
+# -------------------------------
+def setup_logging(level=logging.INFO, log_queue=None):
+    """
+    Route the root logger through a queue so callers never wait for disk or
+    console I/O: logging.info() only enqueues the record, and a QueueListener
+    thread writes it to LOG_FILE (rotated by size) and the console.
+
+    Ingest workers pass the supervisor's multiprocessing queue as `log_queue`;
+    their records are then written by the supervisor, so only one process ever
+    writes (and rotates) the file. Safe to call more than once.
+    """
+    global _handlers
+    with _lock:
+        root = logging.getLogger()
+        if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+            return
+        root.setLevel(level)
+
+        if log_queue is not None:
+            root.addHandler(logging.handlers.QueueHandler(log_queue))
+            return
+
+        if os.path.dirname(Config.LOG_FILE):
+            os.makedirs(os.path.dirname(Config.LOG_FILE), exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            Config.LOG_FILE, maxBytes=Config.LOG_MAX_BYTES, backupCount=Config.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, "%Y-%m-%d %H:%M:%S"))
+        # Also print logs to console
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(LOG_FORMAT, "%H:%M:%S"))
+        _handlers = [file_handler, console]
+
+        records = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(records))
+        _start_listener(records)
+        atexit.register(stop_logging)
+
+
+def listen(log_queue):
+    """Write records that other processes put on `log_queue` through this process's handlers."""
+    setup_logging()
+    with _lock:
+        _start_listener(log_queue)
+
+
+def _start_listener(log_queue):
+    # Caller holds _lock
+    listener = logging.handlers.QueueListener(log_queue, *_handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+
+def stop_logging():
+    """Write out everything still queued and stop the listener threads."""
+    with _lock:
+        while _listeners:
+            _listeners.pop().stop()
+
+
+# -------------------------------
+# 📜 Log File Tail
+# -------------------------------
+def _cursor(stat, offset):
+    # The inode tells a rotated (new) file apart from the one the offset belongs to
+    return f"{stat.st_ino}-{offset}"
+
+
+def tail_lines(path, count, block_size=8192):
+    """
+    The last `count` complete lines of `path`, read backwards from the end in
+    `block_size` chunks, so a large log costs the same as a small one.
+    Returns (lines, cursor); pass the cursor to read_new_lines() later.
+    """
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        position = stat.st_size
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    # A line still being written (no newline yet) is left for the next read
+    complete = data[:data.rfind(b"\n") + 1]
+    lines = complete.decode("utf-8", errors="replace").splitlines()[-count:] if count else []
+    return lines, _cursor(stat, position + len(complete))
+
+
+def read_new_lines(path, cursor, max_lines=1000, max_bytes=1 << 20):
+    """
+    Complete lines appended since `cursor`. If the file was rotated or truncated
+    in the meantime, the cursor no longer applies and the last `max_lines` lines
+    are returned instead. Returns (lines, cursor, reset).
+    """
+    try:
+        inode, offset = (int(part) for part in cursor.rsplit("-", 1))
+    except (ValueError, AttributeError):
+        inode, offset = None, None
+
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if inode != stat.st_ino or offset is None or offset > stat.st_size:
+            lines, cursor = tail_lines(path, max_lines)
+            return lines, cursor, True
+        f.seek(offset)
+        data = f.read(max_bytes)
+
+    complete = data[:data.rfind(b"\n") + 1]
+    lines = complete.decode("utf-8", errors="replace").splitlines()
+    if len(lines) > max_lines:
+        # Far behind: skip ahead rather than send a huge batch
+        lines = lines[-max_lines:]
+    return lines, _cursor(stat, offset + len(complete)), False
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    message_id  TEXT PRIMARY KEY,  -- Message-ID header (or a digest of From/Date/Subject)
+    ticket_id   TEXT NOT NULL,
+    kind        TEXT NOT NULL,     -- new (opened the ticket) | reply (follow-up on it)
+    received_at TEXT NOT NULL,
+    preview     TEXT NOT NULL DEFAULT ''  -- start of the body as plain text
+);
+CREATE INDEX IF NOT EXISTS idx_messages_ticket ON messages(ticket_id);
+"""
+
+# SQLite's default limit on bound parameters is 999
+LOOKUP_CHUNK = 500
+
+
+# -------------------------------
+# 🧾 Processed Message Index
+# -------------------------------
+class MessageIndex:
+    """
+    Every ingested message, keyed by Message-ID, with the ticket it belongs to.
+    A message that is read again (e.g. marking it \\Seen failed after its ticket
+    was written) is recognised and skipped, and replies whose In-Reply-To /
+    References point at an indexed message are threaded onto that ticket.
+    Shared by all ingest workers through READER_STATE_DB.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.READER_STATE_DB
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._add_preview_column(conn)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _add_preview_column(conn):
+        # Indexes created before body previews existed
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if "preview" not in columns:
+            try:
+                conn.execute("ALTER TABLE messages ADD COLUMN preview TEXT NOT NULL DEFAULT ''")
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+
+    def lookup(self, message_ids):
+        """Return {message_id: ticket_id} for the given IDs that are already indexed."""
+        message_ids = list(set(message_ids))
+        found = {}
+        conn = self._connection()
+        for i in range(0, len(message_ids), LOOKUP_CHUNK):
+            chunk = message_ids[i:i + LOOKUP_CHUNK]
+            rows = conn.execute(
+                f"SELECT message_id, ticket_id FROM messages WHERE message_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def has_ticket(self, ticket_id):
+        return self._connection().execute(
+            "SELECT 1 FROM messages WHERE ticket_id = ? LIMIT 1", (ticket_id,)
+        ).fetchone() is not None
+
+    def record(self, entries):
+        """Index (message_id, ticket_id, kind, preview) tuples; IDs already present are left alone."""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO messages (message_id, ticket_id, kind, received_at, preview) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(message_id, ticket_id, kind, now, preview) for message_id, ticket_id, kind, preview in entries],
+            )
+
+    def previews(self, ticket_ids):
+        """{ticket_id: body preview} of the messages that opened the given tickets."""
+        ticket_ids = list(set(ticket_ids))
+        found = {}
+        conn = self._connection()
+        for i in range(0, len(ticket_ids), LOOKUP_CHUNK):
+            chunk = ticket_ids[i:i + LOOKUP_CHUNK]
+            rows = conn.execute(
+                f"SELECT ticket_id, preview FROM messages WHERE kind = 'new' AND preview != '' "
+                f"AND ticket_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def version(self):
+        """Moves whenever a message is indexed (rows are only ever added)."""
+        return self._connection().execute("SELECT MAX(rowid) FROM messages").fetchone()[0] or 0
+
+
+message_index = MessageIndex()
@@ -0,0 +1,228 @@
+import atexit
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from config import Config
+
+# Latency bucket upper bounds in seconds (Prometheus style; +Inf is implied)
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+# -------------------------------
+# ⏱ Pipeline Metrics
+# -------------------------------
+class StageStats:
+    """Latency histogram plus call and error counts for one pipeline stage."""
+
+    __slots__ = ("buckets", "count", "errors", "total")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def to_dict(self):
+        return {"buckets": list(self.buckets), "count": self.count, "errors": self.errors, "sum": self.total}
+
+    def add(self, data):
+        for i, n in enumerate(data["buckets"]):
+            self.buckets[i] += n
+        self.count += data["count"]
+        self.errors += data["errors"]
+        self.total += data["sum"]
+
+    def percentile(self, q):
+        """Estimate the q-th quantile (0..1) by interpolating inside the histogram bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.count, 4) if self.count else 0.0,
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+        }
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "started", "failed")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+        self.failed = False
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.stage, time.perf_counter() - self.started, self.failed or exc_type is not None)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process stage timings and counters. Recording is a perf_counter() pair, a
+    bisect and a few integer additions under a lock, so it is cheap enough for
+    the per-message path.
+
+    Reader processes write snapshots to METRICS_DIR (see start_exporter); the
+    web process merges those with its own numbers when serving /api/metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._exporter = None
+
+    # --- recording ---
+    def timer(self, stage):
+        """`with metrics.timer("stage") as t:` times the block; exceptions (or t.failed = True) count as errors."""
+        return _Timer(self, stage)
+
+    def timed(self, stage):
+        """Decorator form of timer()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, stage, seconds, error=False):
+        index = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.buckets[index] += 1
+            stats.count += 1
+            stats.total += seconds
+            if error:
+                stats.errors += 1
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    # --- reading ---
+    def snapshot(self):
+        """Raw, mergeable numbers for this process."""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "updated_at": time.time(),
+                "stages": {name: s.to_dict() for name, s in self._stages.items()},
+                "counters": dict(self._counters),
+            }
+
+    def combined(self, directory=None):
+        """This process's numbers merged with every reader snapshot in METRICS_DIR."""
+        snapshots = [self.snapshot()]
+        for path in glob.glob(os.path.join(directory or Config.METRICS_DIR, "*.json")):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            # Skip our own file and processes that stopped reporting long ago
+            stale = time.time() - data.get("updated_at", 0) > Config.METRICS_RETENTION_SECONDS
+            if data.get("pid") != os.getpid() and not stale:
+                snapshots.append(data)
+
+        stages, counters = {}, {}
+        for data in snapshots:
+            for name, raw in data["stages"].items():
+                stages.setdefault(name, StageStats()).add(raw)
+            for name, value in data["counters"].items():
+                counters[name] = counters.get(name, 0) + value
+        return stages, counters, len(snapshots)
+
+    def report(self, directory=None):
+        """JSON-friendly summary: per-stage count, error rate and p50/p95/p99."""
+        stages, counters, processes = self.combined(directory)
+        return {
+            "processes": processes,
+            "stages": {name: stages[name].summary() for name in sorted(stages)},
+            "counters": dict(sorted(counters.items())),
+        }
+
+    def prometheus(self, directory=None):
+        """Prometheus text exposition format."""
+        stages, counters, _ = self.combined(directory)
+        lines = [
+            "# HELP ticketing_stage_seconds Time spent in each pipeline stage.",
+            "# TYPE ticketing_stage_seconds histogram",
+        ]
+        for name in sorted(stages):
+            stats = stages[name]
+            cumulative = 0
+            for bound, n in zip(list(BUCKETS) + ["+Inf"], stats.buckets):
+                cumulative += n
+                lines.append(f'ticketing_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'ticketing_stage_seconds_sum{{stage="{name}"}} {stats.total}')
+            lines.append(f'ticketing_stage_seconds_count{{stage="{name}"}} {stats.count}')
+        lines += [
+            "# HELP ticketing_stage_errors_total Failed calls per pipeline stage.",
+            "# TYPE ticketing_stage_errors_total counter",
+        ]
+        lines += [f'ticketing_stage_errors_total{{stage="{name}"}} {stages[name].errors}' for name in sorted(stages)]
+        lines += [
+            "# HELP ticketing_events_total Pipeline event counters.",
+            "# TYPE ticketing_events_total counter",
+        ]
+        lines += [f'ticketing_events_total{{event="{name}"}} {counters[name]}' for name in sorted(counters)]
+        return "\n".join(lines) + "\n"
+
+    # --- cross-process export ---
+    def start_exporter(self, name, interval=None):
+        """Periodically write this process's snapshot to METRICS_DIR/<name>-<pid>.json."""
+        if self._exporter is not None:
+            return
+        path = os.path.join(Config.METRICS_DIR, f"{name}-{os.getpid()}.json")
+        interval = Config.METRICS_EXPORT_SECONDS if interval is None else interval
+        self._exporter = threading.Thread(
+            target=self._export_loop, args=(path, interval), name="metrics-exporter", daemon=True
+        )
+        self._exporter.start()
+        atexit.register(self._write_snapshot, path)
+
+    def _export_loop(self, path, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self._write_snapshot(path)
+            except OSError as e:
+                logging.error(f"❌ Could not write metrics snapshot: {e}")
+
+    def _write_snapshot(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+
+metrics = MetricsRegistry()
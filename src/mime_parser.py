@@ -0,0 +1,96 @@
+import html
+import re
+from email.errors import HeaderParseError
+from email.header import decode_header
+from email.parser import BytesFeedParser
+from email.policy import compat32
+from config import Config
+
+TAG_PATTERN = re.compile(r"<(script|style)\b.*?</\1\s*>|<[^>]*>", re.IGNORECASE | re.DOTALL)
+
+
+# -------------------------------
+# 🔤 Charset-Safe Decoding
+# -------------------------------
+def decode_bytes(data, charset=None):
+    """Decode `data` as `charset`, falling back to UTF-8 for unknown charsets; bad bytes become U+FFFD."""
+    try:
+        return data.decode(charset or "utf-8", errors="replace")
+    except (LookupError, ValueError):
+        # e.g. "unknown-8bit", "x-user-defined" or a garbled charset name
+        return data.decode("utf-8", errors="replace")
+
+
+def decode_mime_words(header_value, limit=None):
+    """Decode MIME-encoded email headers (e.g., =?UTF-8?...), cut to `limit` characters."""
+    if not header_value:
+        return ""
+    limit = Config.MAIL_HEADER_MAX_CHARS if limit is None else limit
+    try:
+        decoded_parts = decode_header(header_value)
+    except HeaderParseError:
+        # Malformed encoded word: keep the raw text rather than lose the header
+        return str(header_value)[:limit]
+    return ''.join(
+        decode_bytes(part, charset) if isinstance(part, bytes) else part
+        for part, charset in decoded_parts
+    )[:limit]
+
+
+# -------------------------------
+# 🧩 Bounded MIME Parsing
+# -------------------------------
+def _complete_headers(header):
+    """Header block ending in a blank line; a block cut off by the fetch limit loses its partial last line."""
+    if len(header) >= Config.MAIL_HEADER_MAX_BYTES:
+        header = header[:header.rfind(b"\n") + 1]
+    header = header.rstrip(b"\r\n")
+    return header + b"\r\n\r\n" if header else b"\r\n"
+
+
+def parse_message(header, text=None):
+    """
+    Parse a message from its fetched header block and, optionally, the first
+    bytes of its body. Both are already capped by the IMAP fetch (see
+    fetch_messages in email_reader), so memory stays the same for a one-line
+    note and for a mail with a 30 MB attachment; a multipart body cut off
+    mid-part simply parses as fewer, shorter parts. Without `text` only the
+    headers are parsed.
+    """
+    parser = BytesFeedParser(policy=compat32)
+    parser.feed(_complete_headers(header))
+    if text:
+        parser.feed(text)
+    return parser.close()
+
+
+def _text_parts(msg, subtype):
+    for part in msg.walk():
+        if (not part.is_multipart() and part.get_content_type() == f"text/{subtype}"
+                and part.get_content_disposition() != "attachment"):
+            yield part
+
+
+def body_preview(msg, limit=None):
+    """
+    Plain-text preview of the message body, at most `limit` characters: the
+    first text/plain part, else the first text/html part with tags stripped.
+    Returns "" when neither was fetched.
+    """
+    limit = Config.BODY_PREVIEW_CHARS if limit is None else limit
+    for subtype in ("plain", "html"):
+        for part in _text_parts(msg, subtype):
+            try:
+                payload = part.get_payload(decode=True)
+            except Exception:
+                # Truncated or corrupt transfer encoding
+                continue
+            if not payload:
+                continue
+            text = decode_bytes(payload, part.get_content_charset())
+            if subtype == "html":
+                text = html.unescape(TAG_PATTERN.sub(" ", text))
+            text = " ".join(text.split())
+            if text:
+                return text[:limit]
+    return ""
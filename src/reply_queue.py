@@ -0,0 +1,222 @@
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from config import Config
+from metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS replies (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_email        TEXT NOT NULL,
+    subject         TEXT NOT NULL,
+    ticket_id       TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending',   -- pending | sending | failed
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at      REAL NOT NULL,
+    last_error      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_replies_due ON replies(status, next_attempt_at);
+"""
+
+
+# -------------------------------
+# 📮 Durable Outbound Reply Queue
+# -------------------------------
+class ReplyQueue:
+    """
+    SQLite-backed queue of auto-replies waiting to be sent.
+    Rows are deleted once sent; rows that run out of attempts stay as 'failed'.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.REPLY_QUEUE_DB
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def enqueue_many(self, replies):
+        """Queue (to_email, subject, ticket_id) tuples in one transaction."""
+        if not replies:
+            return 0
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO replies (to_email, subject, ticket_id, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(to_email, subject, ticket_id, now, now) for to_email, subject, ticket_id in replies],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.wake()
+        return len(replies)
+
+    def enqueue(self, to_email, subject, ticket_id):
+        return self.enqueue_many([(to_email, subject, ticket_id)])
+
+    def claim(self, limit=1):
+        """Atomically move up to `limit` due replies to 'sending' and return them."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT * FROM replies WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE replies SET status = 'sending' WHERE id = ?",
+                    [(row["id"],) for row in rows],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [dict(row) for row in rows]
+
+    def complete(self, reply_id):
+        self._connection().execute("DELETE FROM replies WHERE id = ?", (reply_id,))
+
+    def retry(self, reply, error):
+        """Schedule another attempt with exponential backoff, or mark the reply failed."""
+        attempts = reply["attempts"] + 1
+        metrics.inc("reply_retries")
+        if attempts >= Config.REPLY_MAX_ATTEMPTS:
+            status, next_at = "failed", time.time()
+            metrics.inc("replies_given_up")
+            logging.error(f"❌ Giving up on auto-reply for {reply['ticket_id']} after {attempts} attempts: {error}")
+        else:
+            delay = min(3600, Config.REPLY_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            status, next_at = "pending", time.time() + delay * random.uniform(0.8, 1.2)
+        self._connection().execute(
+            "UPDATE replies SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (status, attempts, next_at, str(error), reply["id"]),
+        )
+
+    def recover(self):
+        """Return replies left in 'sending' by a crashed or stopped process to the queue."""
+        cur = self._connection().execute("UPDATE replies SET status = 'pending' WHERE status = 'sending'")
+        return cur.rowcount
+
+    def stats(self):
+        """Queue depth and age of the oldest waiting reply, for monitoring."""
+        row = self._connection().execute(
+            """
+            SELECT SUM(CASE WHEN status IN ('pending', 'sending') THEN 1 ELSE 0 END) AS depth,
+                   SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) AS failed,
+                   MIN(CASE WHEN status IN ('pending', 'sending') THEN created_at END) AS oldest
+            FROM replies
+            """
+        ).fetchone()
+        oldest = row["oldest"]
+        return {
+            "depth": row["depth"] or 0,
+            "failed": row["failed"] or 0,
+            "oldest_age_seconds": round(time.time() - oldest, 1) if oldest else 0,
+        }
+
+    def wait_for_work(self, timeout):
+        """Sleep until something is enqueued in this process, a retry falls due, or `timeout` passes."""
+        row = self._connection().execute(
+            "SELECT MIN(next_attempt_at) FROM replies WHERE status = 'pending'"
+        ).fetchone()
+        if row[0] is not None:
+            timeout = max(0.0, min(timeout, row[0] - time.time()))
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def wake(self):
+        self._wakeup.set()
+
+
+# -------------------------------
+# 👷 Reply Worker Pool
+# -------------------------------
+class ReplyWorkerPool:
+    """
+    Threads that drain the reply queue concurrently, independent of inbox ingestion.
+    With `send_batch`, a worker claims up to REPLY_CLAIM_BATCH replies and sends
+    them together (e.g. one Gmail batch request after a bulk ingest).
+    """
+
+    def __init__(self, queue, send, workers=None, send_batch=None):
+        self.queue = queue
+        self.send = send
+        self.send_batch = send_batch
+        self.workers = workers or Config.REPLY_WORKERS
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        recovered = self.queue.recover()
+        if recovered:
+            logging.info(f"📮 Re-queued {recovered} auto-reply(s) left over from the last run.")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"reply-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self.queue.wake()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                jobs = self.queue.claim(Config.REPLY_CLAIM_BATCH if self.send_batch else 1)
+                if not jobs:
+                    self.queue.wait_for_work(Config.REPLY_POLL_SECONDS)
+                    continue
+            except Exception as e:
+                logging.error(f"❌ Reply queue unavailable: {e}")
+                self._stop.wait(Config.REPLY_POLL_SECONDS)
+                continue
+            if len(jobs) > 1:
+                self._deliver_batch(jobs)
+            else:
+                self._deliver(jobs[0])
+
+    def _deliver_batch(self, jobs):
+        try:
+            results = self.send_batch([(j["to_email"], j["subject"], j["ticket_id"]) for j in jobs])
+        except Exception as e:
+            results = [e] * len(jobs)
+        for job, ok in zip(jobs, results):
+            if ok is True:
+                self.queue.complete(job["id"])
+            else:
+                self.queue.retry(job, ok if isinstance(ok, Exception) else "all reply backends failed")
+
+    def _deliver(self, job):
+        try:
+            if not self.send(job["to_email"], job["subject"], job["ticket_id"]):
+                raise RuntimeError("all reply backends failed")
+        except Exception as e:
+            self.queue.retry(job, e)
+        else:
+            self.queue.complete(job["id"])
+
+
+reply_queue = ReplyQueue()
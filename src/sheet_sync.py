@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+import time
+from config import Config
+from google_clients import sheets_client
+from ticket_db import ticket_db, sheet_row_values
+from metrics import metrics
+
+
+# -------------------------------
+# 🔄 Sheet → SQLite Sync Engine
+# -------------------------------
+class SheetSync:
+    """
+    Keeps the local ticket database in step with the "Ticket Log" sheet.
+
+    Normal syncs only download rows from the last synced row onwards. That last
+    row is re-read and compared with the local copy; if it changed, disappeared,
+    or the header row no longer matches, rows were edited or deleted above it
+    and a full resync is done instead.
+
+    Status changes made through this app are written to the local copy as they
+    happen. Ones made directly in the sheet (operators close tickets there) are
+    found by re-reading the status column, once every MIRROR_STATUS_SCAN_INTERVAL
+    rather than on every sync.
+    """
+
+    def __init__(self, db=None, sheet_name=None):
+        self.db = db or ticket_db
+        self.sheet_name = sheet_name or Config.SHEET_NAME
+        self._lock = threading.Lock()
+        self._last_sync = None
+
+    def sync(self, full=False):
+        """Pull new rows from the sheet. Returns the number of rows written locally."""
+        with self._lock:
+            return self._sync_locked(full)
+
+    def sync_if_due(self, max_age=None):
+        """
+        Sync unless one ran within `max_age` seconds. If another thread is already
+        syncing, return straight away and let the caller read the current mirror.
+        """
+        max_age = Config.MIRROR_SYNC_INTERVAL if max_age is None else max_age
+        if self._is_recent(max_age):
+            return 0
+
+        # Only the very first sync is waited for, so the mirror is never served empty
+        if not self._lock.acquire(blocking=self._last_sync is None):
+            return 0
+        try:
+            if self._is_recent(max_age):
+                return 0
+            return self._sync_locked()
+        except Exception as e:
+            logging.error(f"❌ Ticket mirror sync failed: {e}")
+            self._last_sync = time.monotonic()
+            return 0
+        finally:
+            self._lock.release()
+
+    def _is_recent(self, max_age):
+        return self._last_sync is not None and time.monotonic() - self._last_sync < max_age
+
+    @metrics.timed("sheet_sync")
+    def _sync_locked(self, full=False):
+        last_row = int(self.db.get_state("last_row", 0))
+        header = self.db.get_state("header")
+
+        if full or last_row < 2 or header is None:
+            written = self._full_sync()
+        else:
+            written = self._incremental_sync(last_row, header)
+
+        self._last_sync = time.monotonic()
+        return written
+
+    def _values(self):
+        return sheets_client.get().spreadsheets().values()
+
+    def _status_scan_due(self):
+        scanned_at = float(self.db.get_state("status_scan_at", 0))
+        return time.time() - scanned_at >= Config.MIRROR_STATUS_SCAN_INTERVAL
+
+    def _incremental_sync(self, last_row, header):
+        ranges = [f"{self.sheet_name}!A1:E1", f"{self.sheet_name}!A{last_row}:E"]
+        scan_statuses = self._status_scan_due()
+        if scan_statuses:
+            ranges.append(f"{self.sheet_name}!E2:E{last_row}")
+        result = self._values().batchGet(spreadsheetId=Config.SHEET_ID, ranges=ranges).execute()
+        value_ranges = result.get("valueRanges", [])
+        value_ranges += [{}] * (len(ranges) - len(value_ranges))
+        sheet_header = (value_ranges[0].get("values") or [[]])[0]
+        tail = value_ranges[1].get("values", [])
+
+        if json.dumps(sheet_header) != header:
+            logging.info("Sheet header changed; running a full ticket resync.")
+            return self._full_sync()
+
+        # The first row returned is the last one we already have: it must still match
+        if not tail or sheet_row_values(tail[0]) != self.db.row_values(last_row):
+            logging.info("Sheet rows moved or were removed; running a full ticket resync.")
+            return self._full_sync()
+
+        new_rows = [
+            (last_row + offset, sheet_row_values(values))
+            for offset, values in enumerate(tail[1:], start=1)
+            if any(values)
+        ]
+        status_changes = self._status_changes(value_ranges[2].get("values", [])) if scan_statuses else []
+        if not new_rows and not status_changes and not scan_statuses:
+            return 0
+
+        conn = self.db.connection()
+        with conn:
+            for row_index, status in status_changes:
+                self.db.set_status(conn, row_index, status)
+            self.db.insert_rows(conn, new_rows)
+            self.db.set_state(conn, "last_row", last_row + len(tail) - 1)
+            if scan_statuses:
+                self.db.set_state(conn, "status_scan_at", time.time())
+        if status_changes:
+            logging.info(f"🔄 Synced {len(status_changes)} status change(s) made in the sheet.")
+        if new_rows:
+            logging.info(f"🔄 Synced {len(new_rows)} new ticket row(s) from the sheet.")
+        return len(new_rows) + len(status_changes)
+
+    def _status_changes(self, sheet_statuses):
+        """(row_index, status) for local rows whose status differs from column E of the sheet."""
+        changes = []
+        for row_index, status in self.db.statuses().items():
+            offset = row_index - 2
+            # Trailing empty cells are left out of the response, hence the padding
+            cells = sheet_statuses[offset] if offset < len(sheet_statuses) else []
+            sheet_status = str(cells[0]) if cells else ""
+            if sheet_status != status:
+                changes.append((row_index, sheet_status))
+        return changes
+
+    def _full_sync(self):
+        result = self._values().get(
+            spreadsheetId=Config.SHEET_ID, range=f"{self.sheet_name}!A:E"
+        ).execute()
+        values = result.get("values", [])
+        header = values[0] if values else []
+        rows = [
+            (index, sheet_row_values(row))
+            for index, row in enumerate(values[1:], start=2)
+            if any(row)
+        ]
+
+        conn = self.db.connection()
+        with conn:
+            self.db.clear(conn)
+            self.db.insert_rows(conn, rows)
+            self.db.set_state(conn, "header", json.dumps(header))
+            self.db.set_state(conn, "last_row", len(values))
+            self.db.set_state(conn, "status_scan_at", time.time())
+        logging.info(f"🔄 Full ticket resync: {len(rows)} row(s).")
+        return len(rows)
+
+
+sheet_sync = SheetSync()
@@ -0,0 +1,83 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from config import Config
+
+
+# -------------------------------
+# 🚀 Startup Import-Time Report
+# -------------------------------
+class StartupReport:
+    """
+    Opt-in (STARTUP_REPORT=1) breakdown of where process start-up time goes.
+
+    start() wraps __import__ so every first-time import is timed, with the time
+    of nested imports subtracted (like `python -X importtime`); finish() prints
+    the total and the slowest top-level packages to stderr. With the flag off
+    both calls do nothing.
+    """
+
+    def __init__(self, enabled=None, top=15):
+        self.enabled = Config.STARTUP_REPORT if enabled is None else enabled
+        self.top = top
+        self._original_import = None
+        self._started = None
+        self._records = []  # (module, self seconds); a module may appear more than once
+        self._nested = []   # per open import: seconds spent in imports it triggered
+        self._thread = None
+
+    def start(self):
+        if not self.enabled or self._original_import is not None:
+            return
+        self._started = time.perf_counter()
+        self._thread = threading.get_ident()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module = name
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            module = importlib.util.resolve_name("." * level + name, package) if package else name
+        # Modules already loaded (unless `from x import submodule`) and other threads pass straight through
+        if (module in sys.modules and not fromlist) or threading.get_ident() != self._thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+        started = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            self._records.append((module, elapsed - nested))
+
+    def finish(self, label):
+        """Stop timing and print the report for this process (`label` names it)."""
+        if self._original_import is None:
+            return None
+        builtins.__import__ = self._original_import
+        self._original_import = None
+        total = time.perf_counter() - self._started
+
+        packages = {}
+        for name, seconds in self._records:
+            package = packages.setdefault(name.split(".")[0], [0.0, set()])
+            package[0] += seconds
+            package[1].add(name)
+        slowest = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+        imported = sum(seconds for _, seconds in self._records)
+
+        lines = [f"🚀 {label} started in {total * 1000:.0f} ms ({imported * 1000:.0f} ms in imports). "
+                 f"Slowest packages:"]
+        lines += [f"   {seconds * 1000:8.1f} ms  {name} ({len(modules)} modules)"
+                  for name, (seconds, modules) in slowest]
+        print("\n".join(lines), file=sys.stderr, flush=True)
+        return {"total_seconds": total, "import_seconds": imported,
+                "packages": {name: seconds for name, (seconds, _) in slowest}}
+
+
+startup_report = StartupReport()
@@ -1,4 +0,0 @@
-from email_sender import send_auto_reply
-
-# Test Gmail API Authentication
-send_auto_reply("gomes.jiprem@gmail.com", "Test Ticket - Gmail Auth", "T-TEST001")
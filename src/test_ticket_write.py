@@ -1,8 +0,0 @@
-from ticket_manager import add_ticket
-
-test_ticket = {
-    "from": "test@example.com",
-    "subject": "Test Ticket Entry"
-}
-
-add_ticket(test_ticket)
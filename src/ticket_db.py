@@ -0,0 +1,409 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import Config
+
+# Sheet columns A:E, in order, and the ticket keys they map to
+TICKET_FIELDS = ["id", "timestamp", "from", "subject", "status"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    row_index INTEGER PRIMARY KEY,  -- row number in the sheet (2 = first ticket)
+    id        TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL DEFAULT '',
+    sender    TEXT NOT NULL DEFAULT '',
+    subject   TEXT NOT NULL DEFAULT '',
+    status    TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_timestamp ON tickets(timestamp);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_tickets_sender ON tickets(sender COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_tickets_id ON tickets(id);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_timestamp ON tickets(status COLLATE NOCASE, timestamp);
+
+-- Rows changed locally that still have to be written to the sheet (sqlite+sheets mode)
+CREATE TABLE IF NOT EXISTS sheet_outbox (
+    row_index INTEGER PRIMARY KEY,
+    version   INTEGER NOT NULL DEFAULT 1  -- bumped on every change, so a newer edit is not lost
+);
+
+-- Bumped by the triggers below on every change to `tickets`; dashboard pages are
+-- cached (and their ETags derived) per version. It starts from the creation time,
+-- so a rebuilt database never reuses an old database's numbers.
+CREATE TABLE IF NOT EXISTS store_version (
+    id      INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_version (id, version) VALUES (1, CAST(strftime('%s', 'now') AS INTEGER) * 1000000);
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_version_insert AFTER INSERT ON tickets
+BEGIN
+    UPDATE store_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_version_update AFTER UPDATE ON tickets
+BEGIN
+    UPDATE store_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_version_delete AFTER DELETE ON tickets
+BEGIN
+    UPDATE store_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Per-day, per-status ticket counts, kept current by the triggers below
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day    TEXT NOT NULL,      -- YYYY-MM-DD
+    status TEXT NOT NULL,      -- lower-cased status
+    count  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, status)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_count_insert AFTER INSERT ON tickets
+WHEN NEW.id != ''
+BEGIN
+    INSERT INTO daily_counts (day, status, count)
+    VALUES (substr(NEW.timestamp, 1, 10), lower(NEW.status), 1)
+    ON CONFLICT(day, status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_count_delete AFTER DELETE ON tickets
+WHEN OLD.id != ''
+BEGIN
+    UPDATE daily_counts SET count = count - 1
+    WHERE day = substr(OLD.timestamp, 1, 10) AND status = lower(OLD.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tickets_count_update AFTER UPDATE OF id, timestamp, status ON tickets
+BEGIN
+    UPDATE daily_counts SET count = count - 1
+    WHERE OLD.id != '' AND day = substr(OLD.timestamp, 1, 10) AND status = lower(OLD.status);
+    INSERT INTO daily_counts (day, status, count)
+    SELECT substr(NEW.timestamp, 1, 10), lower(NEW.status), 1 WHERE NEW.id != ''
+    ON CONFLICT(day, status) DO UPDATE SET count = count + 1;
+END;
+"""
+
+REBUILD_AGGREGATES = """
+DELETE FROM daily_counts;
+INSERT INTO daily_counts (day, status, count)
+SELECT substr(timestamp, 1, 10), lower(status), COUNT(*)
+FROM tickets WHERE id != ''
+GROUP BY 1, 2;
+"""
+
+
+# Sortable ticket fields -> (column, collation); each has an index
+SORT_COLUMNS = {
+    "timestamp": ("timestamp", "BINARY"),
+    "id": ("id", "BINARY"),
+    "from": ("sender", "NOCASE"),
+    "status": ("status", "NOCASE"),
+}
+
+
+def encode_cursor(value, row_index):
+    raw = json.dumps([value, row_index]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    value, row_index = json.loads(raw)
+    return str(value), int(row_index)
+
+
+def row_to_ticket(row):
+    """Convert a `tickets` table row into the dict shape used by the templates."""
+    return {
+        "id": row["id"],
+        "timestamp": row["timestamp"],
+        "from": row["sender"],
+        "subject": row["subject"],
+        "status": row["status"],
+    }
+
+
+def sheet_row_values(values):
+    """Pad/trim a raw sheet row to the five ticket columns."""
+    values = [str(v) for v in values[:len(TICKET_FIELDS)]]
+    return values + [""] * (len(TICKET_FIELDS) - len(values))
+
+
+# -------------------------------
+# 🗄 Local Ticket Database
+# -------------------------------
+class TicketDB:
+    """
+    SQLite store holding a local copy of the ticket log.
+    Each thread gets its own connection; WAL mode lets readers run while a sync writes.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.TICKET_DB
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                # Databases created before the aggregate table need one rebuild
+                built = conn.execute(
+                    "SELECT value FROM sync_state WHERE key = 'aggregates_built'"
+                ).fetchone()
+                if not built:
+                    self.rebuild_aggregates(conn)
+                self._initialized = True
+
+    def rebuild_aggregates(self, conn=None):
+        """Recount daily_counts from the tickets table (normally kept current by triggers)."""
+        conn = conn or self.connection()
+        with conn:
+            conn.executescript("BEGIN;" + REBUILD_AGGREGATES)
+            self.set_state(conn, "aggregates_built", 1)
+
+    # --- sync state ---
+    def get_state(self, key, default=None):
+        row = self.connection().execute(
+            "SELECT value FROM sync_state WHERE key = ?", (key,)
+        ).fetchone()
+        return row["value"] if row else default
+
+    def set_state(self, conn, key, value):
+        conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, None if value is None else str(value)),
+        )
+
+    def try_lease(self, name, owner, seconds):
+        """
+        Take or renew a named lease for `seconds`. Returns False while another
+        owner holds an unexpired one, so only one process does the work.
+        """
+        key = f"lease:{name}"
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            current = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+            if current:
+                holder, expires_at = json.loads(current["value"])
+                if holder != owner and expires_at > now:
+                    return False
+            self.set_state(conn, key, json.dumps([owner, now + seconds]))
+        return True
+
+    # --- row access used by the sync engine ---
+    def row_values(self, row_index):
+        row = self.connection().execute(
+            "SELECT id, timestamp, sender, subject, status FROM tickets WHERE row_index = ?",
+            (row_index,),
+        ).fetchone()
+        return list(row) if row else None
+
+    def insert_rows(self, conn, rows):
+        """Insert or overwrite (row_index, [id, timestamp, from, subject, status]) pairs."""
+        # An upsert (rather than INSERT OR REPLACE) so the count triggers see an UPDATE
+        conn.executemany(
+            "INSERT INTO tickets (row_index, id, timestamp, sender, subject, status) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(row_index) DO UPDATE SET id = excluded.id, timestamp = excluded.timestamp, "
+            "sender = excluded.sender, subject = excluded.subject, status = excluded.status",
+            [(index, *values) for index, values in rows],
+        )
+
+    def append_rows(self, rows, mirror=False):
+        """
+        Add [id, timestamp, from, subject, status] rows after the last one, numbering
+        them like sheet rows. With `mirror`, the rows are also queued for the sheet.
+        Returns the row indexes assigned.
+        """
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")  # other processes may be appending too
+            last = conn.execute("SELECT MAX(row_index) FROM tickets").fetchone()[0]
+            start = max(last or 1, 1) + 1
+            indexed = [(start + i, sheet_row_values(row)) for i, row in enumerate(rows)]
+            self.insert_rows(conn, indexed)
+            if mirror:
+                self.queue_for_sheet(conn, [index for index, _ in indexed])
+        return [index for index, _ in indexed]
+
+    def all_tickets(self):
+        """Every ticket, in row order."""
+        rows = self.connection().execute(
+            "SELECT * FROM tickets WHERE id != '' ORDER BY row_index"
+        ).fetchall()
+        return [row_to_ticket(r) for r in rows]
+
+    # --- outbox of rows waiting to be copied to the sheet ---
+    def queue_for_sheet(self, conn, row_indexes):
+        conn.executemany(
+            "INSERT INTO sheet_outbox (row_index) VALUES (?) "
+            "ON CONFLICT(row_index) DO UPDATE SET version = version + 1",
+            [(index,) for index in row_indexes],
+        )
+
+    def pending_for_sheet(self, limit):
+        """[(row_index, version, values), ...] for the oldest-numbered queued rows."""
+        rows = self.connection().execute(
+            "SELECT o.row_index, o.version, t.id, t.timestamp, t.sender, t.subject, t.status "
+            "FROM sheet_outbox o JOIN tickets t ON t.row_index = o.row_index "
+            "ORDER BY o.row_index LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [(r[0], r[1], list(r[2:])) for r in rows]
+
+    def mark_sent_to_sheet(self, sent):
+        """Drop (row_index, version) pairs from the outbox unless they changed meanwhile."""
+        conn = self.connection()
+        with conn:
+            conn.executemany(
+                "DELETE FROM sheet_outbox WHERE row_index = ? AND version = ?", sent
+            )
+
+    def sheet_backlog(self):
+        return self.connection().execute("SELECT COUNT(*) FROM sheet_outbox").fetchone()[0]
+
+    def store_version(self):
+        """Counter that moves whenever any ticket row is added, changed or removed."""
+        return self.connection().execute("SELECT version FROM store_version WHERE id = 1").fetchone()[0]
+
+    def change_marker(self):
+        """
+        A value that changes whenever the database does: PRAGMA data_version
+        covers commits from other connections, total_changes this thread's own.
+        """
+        conn = self.connection()
+        return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+    def last_row_index(self):
+        return self.connection().execute("SELECT COALESCE(MAX(row_index), 0) FROM tickets").fetchone()[0]
+
+    def tickets_after(self, row_index, limit=100):
+        """[(row_index, ticket), ...] for rows numbered after `row_index`, oldest first."""
+        rows = self.connection().execute(
+            "SELECT * FROM tickets WHERE row_index > ? AND id != '' ORDER BY row_index LIMIT ?",
+            (row_index, limit),
+        ).fetchall()
+        return [(r["row_index"], row_to_ticket(r)) for r in rows]
+
+    def find_row_index(self, ticket_id):
+        row = self.connection().execute(
+            "SELECT row_index FROM tickets WHERE id = ?", (ticket_id,)
+        ).fetchone()
+        return row["row_index"] if row else None
+
+    def get_ticket(self, ticket_id):
+        row = self.connection().execute(
+            "SELECT * FROM tickets WHERE id = ?", (ticket_id,)
+        ).fetchone()
+        return row_to_ticket(row) if row else None
+
+    def statuses(self):
+        """{row_index: status} for every local ticket row."""
+        return dict(self.connection().execute("SELECT row_index, status FROM tickets").fetchall())
+
+    def set_status(self, conn, row_index, status):
+        conn.execute("UPDATE tickets SET status = ? WHERE row_index = ?", (status, row_index))
+
+    def clear(self, conn):
+        conn.execute("DELETE FROM tickets")
+
+    # --- queries used by the dashboard ---
+    def query_tickets(self, status=None, date_from=None, date_to=None, sender=None,
+                      sort="timestamp", order="desc", limit=50, cursor=None):
+        """
+        One page of tickets using keyset pagination on (sort column, row_index),
+        so the cost depends on the page size rather than on how deep the page is.
+        `date_from`/`date_to` are inclusive YYYY-MM-DD days; `sender` is a substring.
+        Returns (tickets, next_cursor); next_cursor is None on the last page.
+        """
+        column, collation = SORT_COLUMNS.get(sort, SORT_COLUMNS["timestamp"])
+        descending = order != "asc"
+        where, params = ["id != ''"], []
+
+        if status:
+            where.append("status = ? COLLATE NOCASE")
+            params.append(status)
+        if date_from:
+            where.append("timestamp >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("timestamp < ?")
+            params.append(date_to + "~")  # '~' sorts after any time on that day
+        if sender:
+            where.append("sender LIKE ?")
+            params.append(f"%{sender}%")
+        if cursor:
+            value, row_index = decode_cursor(cursor)
+            op = "<" if descending else ">"
+            # Row-value comparison lets SQLite seek straight into the index
+            where.append(f"({column}, row_index) {op} (? COLLATE {collation}, ?)")
+            params += [value, row_index]
+
+        direction = "DESC" if descending else "ASC"
+        rows = self.connection().execute(
+            f"SELECT * FROM tickets WHERE {' AND '.join(where)} "
+            f"ORDER BY {column} COLLATE {collation} {direction}, row_index {direction} LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][column], rows[-1]["row_index"])
+        return [row_to_ticket(r) for r in rows], next_cursor
+
+    def daily_summary(self, day):
+        """Total/open/closed counts for tickets created on `day` (YYYY-MM-DD)."""
+        rows = self.connection().execute(
+            "SELECT status, count FROM daily_counts WHERE day = ?", (day,)
+        ).fetchall()
+        counts = {r["status"]: r["count"] for r in rows}
+        return {
+            "total": sum(counts.values()),
+            "open": counts.get("open", 0),
+            "closed": counts.get("closed", 0),
+        }
+
+    def counts_by_day(self):
+        """[(YYYY-MM-DD, count), ...] sorted by day."""
+        rows = self.connection().execute(
+            """
+            SELECT day, SUM(count) AS n
+            FROM daily_counts
+            WHERE day != ''
+            GROUP BY day
+            HAVING n > 0
+            ORDER BY day
+            """
+        ).fetchall()
+        return [(r["day"], r["n"]) for r in rows]
+
+
+ticket_db = TicketDB()
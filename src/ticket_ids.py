@@ -0,0 +1,76 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from config import Config
+
+
+# -------------------------------
+# 🆔 Ticket ID Generator
+# -------------------------------
+class TicketIdGenerator:
+    """
+    Time-ordered, collision-free ticket IDs:
+
+        T-20251018143005123-3fa91c-0007
+          └ creation time (ms) ┘ └node┘ └seq┘
+
+    The node part is a hash of the instance (NODE_ID, or the host name) and the
+    process ID, so separate processes and machines do not clash. Within one
+    process a lock plus a per-millisecond sequence keeps IDs unique and strictly
+    increasing, even if the clock steps backwards. IDs sort by creation time.
+    """
+
+    SEQ_LIMIT = 10000
+
+    def __init__(self, node_id=None):
+        self._node_id = node_id
+        self._node_pid = None
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._seq = 0
+
+    @property
+    def node(self):
+        with self._lock:
+            return self._current_node()
+
+    def _current_node(self):
+        # Caller holds self._lock. Re-derive after a fork so child processes get
+        # their own node part; under the lock, so no thread sees the sequence reset
+        if self._node_pid != os.getpid() and (self._node_id is None or self._node_pid is not None):
+            self._node_id = _default_node_id()
+            self._node_pid = os.getpid()
+            self._last_ms, self._seq = 0, 0
+        return self._node_id
+
+    def new_id(self):
+        with self._lock:
+            node = self._current_node()
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms, self._seq = now_ms, 0
+            else:
+                self._seq += 1
+                if self._seq >= self.SEQ_LIMIT:
+                    # Sequence exhausted for this millisecond: borrow the next one
+                    self._last_ms, self._seq = self._last_ms + 1, 0
+            ms, seq = self._last_ms, self._seq
+
+        stamp = datetime.fromtimestamp(ms / 1000).strftime("%Y%m%d%H%M%S") + f"{ms % 1000:03d}"
+        return f"T-{stamp}-{node}-{seq:04d}"
+
+
+def _default_node_id():
+    seed = f"{Config.NODE_ID or socket.gethostname()}:{os.getpid()}".encode()
+    return hashlib.sha1(seed).hexdigest()[:6]
+
+
+_generator = TicketIdGenerator()
+
+
+def new_ticket_id():
+    """Return a new unique, time-sortable ticket ID (keeps the `T-` prefix)."""
+    return _generator.new_id()
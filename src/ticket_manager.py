@@ -1,24 +1,170 @@
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import atexit
+import logging
+import threading
+import time
 from datetime import datetime
 from config import Config
+from google_clients import sheets_client
+from ticket_db import ticket_db, TICKET_FIELDS
+from ticket_ids import new_ticket_id
+from ticket_storage import ticket_storage
+from metrics import metrics
+from event_bus import event_bus
+from message_index import message_index
 
 
 def get_sheets_service():
-    creds = service_account.Credentials.from_service_account_file(
-        Config.SERVICE_JSON,
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
-    return build("sheets", "v4", credentials=creds)
+    """Return the process-wide Sheets service (built once, shared by threads)."""
+    return sheets_client.get()
+
+
+# -------------------------------
+# 🧺 Batched Ticket Writer
+# -------------------------------
+class TicketBatchWriter:
+    """
+    Buffers ticket rows and writes them to the ticket storage in one multi-row call.
+    A flush happens when the buffer reaches `batch_size` rows, when the oldest
+    buffered row is older than `flush_seconds`, or when `flush()` is called.
+
+    A row may come with an `on_written` callback. Whichever flush commits the
+    row (inline, timer or explicit) calls it with [(ticket_id, context), ...]
+    for its rows in that batch, so callers learn exactly what was written.
+    """
+
+    def __init__(self, batch_size=None, flush_seconds=None):
+        self.batch_size = batch_size or Config.SHEET_BATCH_SIZE
+        self.flush_seconds = flush_seconds or Config.SHEET_FLUSH_SECONDS
+        self._rows = []
+        self._first_row_at = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def add(self, row, on_written=None, context=None):
+        """Queue a row; flushes inline once the batch is full."""
+        with self._lock:
+            self._rows.append((row, on_written, context))
+            if self._first_row_at is None:
+                self._first_row_at = time.monotonic()
+            full = len(self._rows) >= self.batch_size
+            if not full:
+                self._schedule_timer()
+        if full:
+            try:
+                self.flush()
+            except Exception as e:
+                # Rows stay buffered; the timer or the end-of-pass flush retries
+                logging.error(f"❌ Ticket batch flush failed: {e}")
+                with self._lock:
+                    self._schedule_timer()
+
+    def pending(self):
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self):
+        """Write all buffered rows in one storage call. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._first_row_at = None
+                self._cancel_timer()
+            if not rows:
+                return 0
+
+            try:
+                with metrics.timer("ticket_append"):
+                    ticket_storage.append([row for row, _, _ in rows])
+            except Exception:
+                # Put the rows back in front so the next flush retries them
+                with self._lock:
+                    self._rows = rows + self._rows
+                    if self._first_row_at is None:
+                        self._first_row_at = time.monotonic()
+                raise
+
+            _ticket_cache.invalidate()
+            metrics.inc("tickets_written", len(rows))
+            written = {}  # callback -> [(ticket_id, context)], one call per callback
+            for row, on_written, context in rows:
+                event_bus.publish("ticket", dict(zip(TICKET_FIELDS, row)))
+                if on_written is not None:
+                    written.setdefault(on_written, []).append((row[0], context))
+            for on_written, tickets in written.items():
+                try:
+                    on_written(tickets)
+                except Exception as e:
+                    logging.error(f"❌ Ticket write callback failed: {e}")
+            logging.info(f"✅ Flushed {len(rows)} ticket(s) to {ticket_storage.label}")
+            return len(rows)
+
+    def discard(self):
+        """Drop buffered rows without writing them. Returns how many were dropped."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._first_row_at = None
+            self._cancel_timer()
+            return len(rows)
+
+    def _schedule_timer(self):
+        # Caller holds self._lock
+        if self._timer is not None:
+            return
+        delay = max(0.0, self.flush_seconds - (time.monotonic() - self._first_row_at))
+        self._timer = threading.Timer(delay, self._flush_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        # Caller holds self._lock
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"❌ Timed ticket flush failed: {e}")
+            with self._lock:
+                if self._rows:
+                    self._schedule_timer()
+
 
+_writer = TicketBatchWriter()
 
-def add_ticket(ticket):
-    service = get_sheets_service()
-    sheet = service.spreadsheets()
-    spreadsheet_id = Config.SHEET_ID
-    sheet_name = Config.SHEET_NAME
 
-    ticket_id = f"T-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+def flush_tickets():
+    """Write any buffered tickets to the ticket storage now."""
+    return _writer.flush()
+
+
+def discard_pending_tickets():
+    """Drop buffered tickets that could not be written (their emails will be re-read)."""
+    return _writer.discard()
+
+
+def _flush_at_exit():
+    try:
+        _writer.flush()
+    except Exception as e:
+        logging.error(f"❌ Failed to flush tickets on exit: {e}")
+    ticket_storage.close()
+
+
+atexit.register(_flush_at_exit)
+
+
+def add_ticket(ticket, on_written=None):
+    """
+    Queue a ticket row for the ticket storage and return its ID straight away.
+    The row is written by the batch writer (see flush_tickets); once it is,
+    `on_written([(ticket_id, ticket), ...])` is called.
+    """
+    ticket_id = new_ticket_id()
     row = [
         ticket_id,
         datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -27,47 +173,253 @@ def add_ticket(ticket):
         "Open"
     ]
 
-    sheet.values().append(
-        spreadsheetId=spreadsheet_id,
-        range=f"{sheet_name}!A:E",
-        valueInputOption="RAW",
-        insertDataOption="INSERT_ROWS",
-        body={"values": [row]}
-    ).execute()
+    _writer.add(row, on_written, ticket)
 
-    print(f"✅ Ticket added to Google Sheet: {ticket_id}")
+    print(f"🧺 Ticket queued for {ticket_storage.label}: {ticket_id}")
     return ticket_id
 
 
+# -------------------------------
+# 🗃 Ticket Read Cache
+# -------------------------------
+class TicketCache:
+    """
+    Read-through cache for the ticket list with a time-to-live.
+
+    Fresh data is returned as-is. Once it has expired, been invalidated, or
+    `version()` reports that the store changed (a write from another process),
+    the old list is still returned while a single background thread reloads it;
+    only the very first read, with nothing cached yet, waits for the storage.
+    Hits, stale hits and misses are counted in the metrics registry as well.
+    """
+
+    def __init__(self, loader, ttl=None, version=None):
+        self.loader = loader
+        self.ttl = Config.TICKET_CACHE_TTL if ttl is None else ttl
+        self.version = version
+        self._data = None
+        self._loaded_at = None
+        self._loaded_version = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+    def get(self):
+        current = self.version() if self.version else None
+        with self._lock:
+            if self._data is not None:
+                if self._is_fresh(current):
+                    self._count("hits")
+                else:
+                    self._count("stale_hits")
+                    self._start_refresh()
+                return self._data
+            self._count("misses")
+
+        # Nothing cached yet: load inline, letting only one caller hit the storage
+        with self._load_lock:
+            with self._lock:
+                if self._data is not None:
+                    return self._data
+            return self._load()
+
+    def invalidate(self):
+        """Mark the cached list as expired; the next read triggers a refresh."""
+        with self._lock:
+            self._loaded_at = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["age_seconds"] = (
+                round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None
+            )
+            stats["size"] = len(self._data) if self._data is not None else 0
+            return stats
+
+    def _count(self, name):
+        # Caller holds self._lock
+        self._stats[name] += 1
+        metrics.inc(f"ticket_cache_{name}")
+
+    def _is_fresh(self, current):
+        return (self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+                and current == self._loaded_version)
+
+    def _load(self):
+        # Read the version first: a write landing during the load makes the result stale, not lost
+        version = self.version() if self.version else None
+        try:
+            data = self.loader()
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        with self._lock:
+            self._data = data
+            self._loaded_at = time.monotonic()
+            self._loaded_version = version
+            self._stats["refreshes"] += 1
+        return data
+
+    def _start_refresh(self):
+        # Caller holds self._lock
+        if self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name="ticket-cache", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            with self._load_lock:
+                self._load()
+        except Exception as e:
+            logging.error(f"❌ Background ticket refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
 def fetch_all_tickets():
-    creds = service_account.Credentials.from_service_account_file(
-        Config.SERVICE_JSON,
-        scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
+    """Return all tickets, served from the TTL cache when possible."""
+    return _ticket_cache.get()
+
+
+def ticket_cache_stats():
+    """Hit/miss counters for the ticket read cache."""
+    return _ticket_cache.stats()
+
+
+# -------------------------------
+# 🗄 Local Mirror Queries (used by the dashboard)
+# -------------------------------
+# Dashboard reads never wait for Google: they serve the mirror as it is and
+# leave the refresh to sync_ticket_mirror_in_background().
+def sync_ticket_mirror(max_age=None):
+    """
+    Bring the local SQLite mirror up to date if the last sync is older than `max_age`.
+    Nothing to do when SQLite is the ticket store itself.
+    """
+    return ticket_storage.refresh(max_age)
+
+
+_background_sync = None
+_background_sync_at = 0.0
+_background_sync_lock = threading.Lock()
+
+
+def sync_ticket_mirror_in_background():
+    """
+    Like sync_ticket_mirror(), but on a background thread so the caller never
+    waits for Google; at most one such thread runs, started at most once per
+    MIRROR_SYNC_INTERVAL.
+    """
+    global _background_sync, _background_sync_at
+    with _background_sync_lock:
+        if _background_sync is not None and _background_sync.is_alive():
+            return
+        if time.monotonic() - _background_sync_at < Config.MIRROR_SYNC_INTERVAL:
+            return
+        _background_sync_at = time.monotonic()
+        _background_sync = threading.Thread(target=sync_ticket_mirror, name="mirror-sync", daemon=True)
+        _background_sync.start()
+
+
+def ticket_store_version():
+    """Version counter of the local ticket table; moves on every ticket change."""
+    return ticket_db.store_version()
+
+
+def ticket_preview_version():
+    """Moves whenever the reader stores another message (and maybe a body preview)."""
+    return message_index.version()
+
+
+@metrics.timed("dashboard_query")
+def query_tickets(status=None, date_from=None, date_to=None, sender=None,
+                  sort="timestamp", order="desc", per_page=50, cursor=None):
+    """
+    Filtered, sorted page of tickets from the local mirror.
+    Returns {"tickets": [...], "next_cursor": str or None}; pass next_cursor back
+    to get the following page.
+    """
+    sync_ticket_mirror_in_background()
+    per_page = max(1, min(int(per_page), 200))
+    tickets, next_cursor = ticket_db.query_tickets(
+        status=status, date_from=date_from, date_to=date_to, sender=sender,
+        sort=sort, order=order, limit=per_page, cursor=cursor,
     )
-    service = build("sheets", "v4", credentials=creds)
+    # Body previews are kept by the mail reader with its message index
+    previews = message_index.previews([ticket["id"] for ticket in tickets])
+    for ticket in tickets:
+        ticket["preview"] = previews.get(ticket["id"], "")
+    return {"tickets": tickets, "next_cursor": next_cursor}
+
+
+@metrics.timed("dashboard_summary")
+def daily_summary(day):
+    """Total/open/closed ticket counts for `day` (YYYY-MM-DD) from the precomputed aggregates."""
+    sync_ticket_mirror_in_background()
+    return ticket_db.daily_summary(day)
+
+
+@metrics.timed("dashboard_stats")
+def ticket_counts_by_day():
+    """[(YYYY-MM-DD, count), ...] from the precomputed aggregates."""
+    sync_ticket_mirror_in_background()
+    return ticket_db.counts_by_day()
+
+
+def iter_tickets(date_from=None, date_to=None, chunk_size=1000):
+    """
+    Yield every ticket in creation order, reading the mirror `chunk_size` rows
+    at a time so memory stays flat however long the history is.
+    """
+    sync_ticket_mirror()
+    cursor = None
+    while True:
+        tickets, cursor = ticket_db.query_tickets(
+            date_from=date_from, date_to=date_to,
+            sort="timestamp", order="asc", limit=chunk_size, cursor=cursor,
+        )
+        yield from tickets
+        if cursor is None:
+            return
+
+
+def rebuild_ticket_aggregates():
+    """Recount the per-day / per-status aggregates from scratch."""
+    ticket_db.rebuild_aggregates()
+
 
-    spreadsheet_id = Config.SHEET_ID
-    sheet_name = Config.SHEET_NAME
-    range_name = f"{sheet_name}!A:E"
+def update_ticket_status(ticket_id, status):
+    """
+    Set a ticket's status in the ticket storage and the local database.
+    The database triggers move the ticket between the per-status counts.
+    Returns False if the ticket is not known.
+    """
+    if not ticket_storage.set_status(ticket_id, status):
+        return False
+    _ticket_cache.invalidate()
+    return True
 
-    result = service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id, range=range_name
-    ).execute()
 
-    values = result.get("values", [])
+def find_ticket(ticket_id):
+    """The ticket with `ticket_id` from the local mirror, or None."""
+    sync_ticket_mirror()
+    return ticket_db.get_ticket(ticket_id)
 
-    if not values or len(values) < 2:
-        return []
 
-    headers = values[0]
-    rows = values[1:]
-    tickets = []
+def reopen_ticket(ticket_id):
+    """
+    Put a closed ticket back to Open because the customer wrote again.
+    Returns True if the status changed.
+    """
+    ticket = find_ticket(ticket_id)
+    if ticket is None or ticket["status"].lower() != "closed":
+        return False
+    return update_ticket_status(ticket_id, "Open")
 
-    for row in rows:
-        ticket = {}
-        for i, header in enumerate(headers):
-            if i < len(row):
-                ticket[header.lower()] = row[i]
-        tickets.append(ticket)
 
-    return tickets
+_ticket_cache = TicketCache(metrics.timed("ticket_load")(ticket_storage.load_all), version=ticket_store_version)
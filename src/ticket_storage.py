@@ -0,0 +1,400 @@
+import logging
+import os
+import socket
+import threading
+from config import Config
+from google_clients import sheets_client
+from sheet_sync import SheetSync, sheet_sync
+from ticket_db import ticket_db
+from metrics import metrics
+
+SHEET_HEADER = ["ID", "Timestamp", "From", "Subject", "Status"]
+
+
+# -------------------------------
+# 🗂 Ticket Storage Backends
+# -------------------------------
+class TicketStorage:
+    """
+    Where ticket rows live. Rows are [id, timestamp, from, subject, status] lists;
+    tickets are returned as dicts keyed like the sheet header (id, timestamp, ...).
+    """
+
+    label = "storage"
+
+    def append(self, rows):
+        """Store new ticket rows."""
+        raise NotImplementedError
+
+    def load_all(self):
+        """Return every ticket as a list of dicts."""
+        raise NotImplementedError
+
+    def set_status(self, ticket_id, status):
+        """Change a ticket's status. Returns False if the ticket is not known."""
+        raise NotImplementedError
+
+    def refresh(self, max_age=None):
+        """Bring the local SQLite copy up to date (nothing to do where SQLite is the record)."""
+        return 0
+
+    def close(self):
+        """Finish any background work before the process exits."""
+
+
+class SheetsStorage(TicketStorage):
+    """The Google Sheet is the record; the SQLite mirror is refreshed from it for queries."""
+
+    label = "Google Sheet"
+
+    def __init__(self, sheet_name=None):
+        self.sheet_name = sheet_name or Config.SHEET_NAME
+
+    def _values(self):
+        return sheets_client.get().spreadsheets().values()
+
+    def append(self, rows):
+        self._values().append(
+            spreadsheetId=Config.SHEET_ID,
+            range=f"{self.sheet_name}!A:E",
+            valueInputOption="RAW",
+            insertDataOption="INSERT_ROWS",
+            body={"values": rows}
+        ).execute()
+
+    @metrics.timed("sheets_fetch")
+    def load_all(self):
+        result = self._values().get(
+            spreadsheetId=Config.SHEET_ID, range=f"{self.sheet_name}!A:E"
+        ).execute()
+
+        values = result.get("values", [])
+
+        if not values or len(values) < 2:
+            return []
+
+        headers = values[0]
+        tickets = []
+
+        for row in values[1:]:
+            ticket = {}
+            for i, header in enumerate(headers):
+                if i < len(row):
+                    ticket[header.lower()] = row[i]
+            tickets.append(ticket)
+
+        return tickets
+
+    def _row_holds(self, row_index, ticket_id):
+        result = self._values().get(
+            spreadsheetId=Config.SHEET_ID, range=f"{self.sheet_name}!A{row_index}"
+        ).execute()
+        cells = (result.get("values") or [[]])[0]
+        return bool(cells) and cells[0] == ticket_id
+
+    def set_status(self, ticket_id, status):
+        self.refresh()
+        row_index = ticket_db.find_row_index(ticket_id)
+        if row_index is None:
+            return False
+        # The mirror may be up to MIRROR_SYNC_INTERVAL old: if rows were deleted or
+        # moved since, this row now holds another ticket. Check before writing.
+        if not self._row_holds(row_index, ticket_id):
+            logging.info(f"Ticket {ticket_id} moved in the sheet; resyncing before updating it.")
+            sheet_sync.sync(full=True)
+            row_index = ticket_db.find_row_index(ticket_id)
+            if row_index is None or not self._row_holds(row_index, ticket_id):
+                return False
+
+        self._values().update(
+            spreadsheetId=Config.SHEET_ID,
+            range=f"{self.sheet_name}!E{row_index}",
+            valueInputOption="RAW",
+            body={"values": [[status]]}
+        ).execute()
+
+        conn = ticket_db.connection()
+        with conn:
+            ticket_db.set_status(conn, row_index, status)
+        return True
+
+    def refresh(self, max_age=None):
+        return sheet_sync.sync_if_due(max_age)
+
+
+class SqliteStorage(TicketStorage):
+    """SQLite is the record; writes never leave the machine."""
+
+    label = "local ticket database"
+
+    def __init__(self, db=None):
+        self.db = db or ticket_db
+
+    def append(self, rows):
+        self.db.append_rows(rows)
+
+    def load_all(self):
+        return self.db.all_tickets()
+
+    def set_status(self, ticket_id, status):
+        row_index = self.db.find_row_index(ticket_id)
+        if row_index is None:
+            return False
+        conn = self.db.connection()
+        with conn:
+            self.db.set_status(conn, row_index, status)
+        return True
+
+
+class MirroredStorage(SqliteStorage):
+    """
+    SQLite is the record and every change is also queued in an outbox table;
+    a background SheetMirror copies queued rows to the sheet for people who
+    work from it. Ingestion never waits for Google.
+
+    On first use with an empty database the existing sheet is imported, so
+    local row numbers and sheet rows line up from then on. Tickets created
+    before this mode was switched on are appended after the sheet's own rows.
+    """
+
+    def __init__(self, db=None, mirror=None):
+        super().__init__(db)
+        self.mirror = mirror or SheetMirror(self.db)
+        self._seed_lock = threading.Lock()
+        self._seeded = False
+
+    def append(self, rows):
+        self._seed()
+        self.db.append_rows(rows, mirror=True)
+        self.mirror.start()
+        self.mirror.wake()
+
+    def load_all(self):
+        self._seed()
+        return super().load_all()
+
+    def set_status(self, ticket_id, status):
+        self._seed()
+        row_index = self.db.find_row_index(ticket_id)
+        if row_index is None:
+            return False
+        conn = self.db.connection()
+        with conn:
+            self.db.set_status(conn, row_index, status)
+            self.db.queue_for_sheet(conn, [row_index])
+        self.mirror.start()
+        self.mirror.wake()
+        return True
+
+    def refresh(self, max_age=None):
+        self._seed()
+        return 0
+
+    def close(self):
+        self.mirror.stop()
+
+    def _seed(self):
+        # One-off on the first run in this mode: line local row numbers up with the sheet
+        if self._seeded:
+            return
+        with self._seed_lock:
+            if self._seeded or self.db.get_state("sheet_rows") is not None:
+                self._seeded = True
+                return
+            last_row = self.db.get_state("last_row")
+            queue_all, offset = False, 0
+            if last_row is None and not self.db.all_tickets():
+                # Fresh store: import the sheet (raises if Google is unreachable, so nothing
+                # is numbered before the sheet's rows are known)
+                imported = SheetSync(self.db, self.mirror.sheet_name).sync(full=True)
+                logging.info(f"📥 Imported {imported} ticket(s) from the sheet into SQLite.")
+                sheet_rows = int(self.db.get_state("last_row", 0))
+            elif last_row is None:
+                # Tickets created in sqlite-only mode: copy them all to the sheet, after
+                # any rows it already has (raises if Google is unreachable, as above)
+                queue_all = True
+                existing = self.mirror.sheet_length()
+                if existing:
+                    # Keep its header and rows; local row N goes to sheet row N + offset
+                    logging.warning(
+                        f"⚠️ Local tickets were never in the sheet; queueing them all for the mirror, "
+                        f"after the sheet's {existing - 1} existing row(s)."
+                    )
+                    sheet_rows, offset = 1, existing - 1
+                else:
+                    logging.warning("⚠️ Local tickets were never in the sheet; queueing them all for the mirror.")
+                    sheet_rows = 0
+            else:
+                # Previously a mirror of the sheet: it already matches up to last_row
+                sheet_rows = int(last_row)
+
+            conn = self.db.connection()
+            with conn:
+                if queue_all:
+                    conn.execute(
+                        "INSERT INTO sheet_outbox (row_index) SELECT row_index FROM tickets "
+                        "WHERE true ON CONFLICT(row_index) DO NOTHING"
+                    )
+                self.db.set_state(conn, "sheet_offset", offset)
+                self.db.set_state(conn, "sheet_rows", sheet_rows)
+            self._seeded = True
+
+
+# -------------------------------
+# 🪞 Background Sheet Mirror
+# -------------------------------
+class SheetMirror:
+    """
+    Drains the sheet outbox: rows past the end of the sheet are appended in
+    order, rows already in the sheet are rewritten in place once column A
+    shows the row still holds that ticket. A lease in the database keeps two
+    processes from appending the same rows.
+    """
+
+    def __init__(self, db=None, interval=None, batch_size=None, sheet_name=None):
+        self.db = db or ticket_db
+        self.interval = Config.SHEET_MIRROR_INTERVAL if interval is None else interval
+        self.batch_size = batch_size or Config.SHEET_MIRROR_BATCH
+        self.sheet_name = sheet_name or Config.SHEET_NAME
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="sheet-mirror", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the thread and make one last pass so queued rows are not left behind."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.drain()
+        except Exception as e:
+            logging.error(f"❌ Final sheet mirror pass failed: {e}")
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                while self.drain() and not self._stop.is_set():
+                    pass
+            except Exception as e:
+                logging.error(f"❌ Sheet mirror pass failed, will retry: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    @metrics.timed("sheet_mirror")
+    def drain(self):
+        """Write one batch of queued rows to the sheet. Returns the number written."""
+        if not self.db.try_lease("sheet_mirror", self.owner, max(60, 3 * self.interval)):
+            return 0
+        pending = self.db.pending_for_sheet(self.batch_size)
+        if not pending:
+            return 0
+
+        sheet_rows = int(self.db.get_state("sheet_rows", 0))
+        updates = [p for p in pending if p[0] <= sheet_rows]
+        appends = []
+        for p in (p for p in pending if p[0] > sheet_rows):
+            # Appends must continue the sheet exactly, one row after another
+            if p[0] != max(sheet_rows, 1) + len(appends) + 1:
+                break
+            appends.append(p)
+
+        values = self._values()
+        if updates:
+            offset = int(self.db.get_state("sheet_offset", 0))
+            located = self._locate(values, [(index + offset, row[0]) for index, _, row in updates])
+            data = []
+            for sheet_row, (_, _, row) in zip(located, updates):
+                if sheet_row is None:
+                    logging.warning(f"⚠️ Ticket {row[0]} is no longer in the sheet; not mirroring its change.")
+                else:
+                    data.append({"range": f"{self.sheet_name}!A{sheet_row}:E{sheet_row}", "values": [row]})
+            if data:
+                values.batchUpdate(
+                    spreadsheetId=Config.SHEET_ID,
+                    body={"valueInputOption": "RAW", "data": data},
+                ).execute()
+            self.db.mark_sent_to_sheet([(index, version) for index, version, _ in updates])
+
+        if appends:
+            rows = [row for _, _, row in appends]
+            if sheet_rows == 0:
+                rows = [SHEET_HEADER] + rows
+            values.append(
+                spreadsheetId=Config.SHEET_ID,
+                range=f"{self.sheet_name}!A:E",
+                valueInputOption="RAW",
+                insertDataOption="INSERT_ROWS",
+                body={"values": rows}
+            ).execute()
+            conn = self.db.connection()
+            with conn:
+                self.db.set_state(conn, "sheet_rows", appends[-1][0])
+            self.db.mark_sent_to_sheet([(index, version) for index, version, _ in appends])
+
+        written = len(updates) + len(appends)
+        if written:
+            logging.info(f"🪞 Mirrored {written} ticket row(s) to the Google Sheet.")
+        return written
+
+    def _locate(self, values, expected):
+        """
+        The sheet row of each (expected_row, ticket_id): the expected row while its
+        column A still holds the ticket, otherwise wherever the ticket is now (the
+        sheet may have been sorted or edited by hand), or None if it is gone.
+        """
+        result = values.batchGet(
+            spreadsheetId=Config.SHEET_ID,
+            ranges=[f"{self.sheet_name}!A{row}" for row, _ in expected],
+        ).execute()
+        cells = [(r.get("values") or [[""]])[0] for r in result.get("valueRanges", [])]
+        located = [
+            row if found and found[0] == ticket_id else None
+            for (row, ticket_id), found in zip(expected, cells)
+        ]
+        if len(located) == len(expected) and None not in located:
+            return located
+
+        column = values.get(spreadsheetId=Config.SHEET_ID, range=f"{self.sheet_name}!A:A").execute()
+        rows_by_id = {}
+        for row, found in enumerate(column.get("values", []), start=1):
+            if found:
+                rows_by_id.setdefault(found[0], row)
+        return [rows_by_id.get(ticket_id) for _, ticket_id in expected]
+
+    def sheet_length(self):
+        """Number of rows in the sheet, header included, counted on column A."""
+        result = self._values().get(spreadsheetId=Config.SHEET_ID, range=f"{self.sheet_name}!A:A").execute()
+        return len(result.get("values", []))
+
+    def _values(self):
+        return sheets_client.get().spreadsheets().values()
+
+
+BACKENDS = {
+    "sheets": SheetsStorage,
+    "sqlite": SqliteStorage,
+    "sqlite+sheets": MirroredStorage,
+}
+
+
+def create_storage(backend=None):
+    backend = backend or Config.TICKET_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown TICKET_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[backend]()
+
+
+ticket_storage = create_storage()
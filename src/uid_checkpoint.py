@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    mailbox     TEXT PRIMARY KEY,   -- "<account>/<folder>"
+    uidvalidity INTEGER NOT NULL,
+    last_uid    INTEGER NOT NULL,
+    updated_at  TEXT NOT NULL
+);
+"""
+
+
+# -------------------------------
+# 📌 Mailbox UID Checkpoints
+# -------------------------------
+class UidCheckpoint:
+    """
+    Durable record of the last processed UID (and its UIDVALIDITY) per mailbox.
+    Lets each pass search only `UID last+1:*` instead of scanning for UNSEEN.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.READER_STATE_DB
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def load(self, mailbox):
+        """Return (uidvalidity, last_uid) for `mailbox`, or None if never checkpointed."""
+        row = self._connection().execute(
+            "SELECT uidvalidity, last_uid FROM checkpoints WHERE mailbox = ?", (mailbox,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def save(self, mailbox, uidvalidity, last_uid):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO checkpoints (mailbox, uidvalidity, last_uid, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(mailbox) DO UPDATE SET uidvalidity = excluded.uidvalidity, "
+                "last_uid = excluded.last_uid, updated_at = excluded.updated_at",
+                (mailbox, uidvalidity, last_uid, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            )
+
+
+uid_checkpoint = UidCheckpoint()
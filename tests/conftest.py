@@ -0,0 +1,78 @@
+import imaplib
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Config reads the environment once, at import: point every store at a scratch
+# directory and keep tickets in SQLite, before any src module is imported
+DATA_DIR = tempfile.mkdtemp(prefix="ticketing-tests-")
+os.environ.update(
+    DATA_DIR=DATA_DIR,
+    LOG_FILE=os.path.join(DATA_DIR, "automation.log"),
+    TICKET_BACKEND="sqlite",
+    EMAIL_ADDRESS="support@example.com",
+    SHEET_FLUSH_SECONDS="60",
+)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fakes import FakeImapServer, FakeSheets  # noqa: E402
+
+
+@pytest.fixture
+def imap_server():
+    """A fresh fake IMAP server (and mailbox) per test."""
+    server = FakeImapServer(idle=False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sheets():
+    """An empty fake ticket sheet (header row only), installed as the shared Sheets client."""
+    from google_clients import sheets_client
+    sheets = FakeSheets()
+    sheets_client.set_service(sheets)
+    yield sheets
+    sheets_client.reset()
+
+
+@pytest.fixture
+def client():
+    """A logged-in test client for the dashboard."""
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    app = create_app()
+    app.testing = True
+    with app.test_client() as client:
+        with client.session_transaction() as session:
+            session["logged_in"] = True
+        yield client
+
+
+@pytest.fixture
+def account():
+    """An account of its own per test, so UID checkpoints never carry over."""
+    return {"email": f"{uuid.uuid4().hex[:8]}@example.com"}
+
+
+@pytest.fixture
+def run_pass(imap_server, account):
+    """Run one check_inbox pass against the fake server; returns the messages processed."""
+    import email_reader
+
+    def run():
+        mail = imaplib.IMAP4("127.0.0.1", imap_server.port)
+        mail.login(account["email"], "password")
+        mail.select("INBOX")
+        try:
+            return email_reader.check_inbox(mail, "INBOX", account)
+        finally:
+            mail.logout()
+    return run
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import automation_runner as runner_module
+from automation_runner import AutomationRunner
+from event_bus import event_bus
+
+
+@pytest.fixture
+def runner(tmp_path):
+    return AutomationRunner(path=str(tmp_path / "state.db"), lock_file=str(tmp_path / "reader.lock"))
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    """Supervisor launches, with a short-lived stand-in process instead of the real one."""
+    launched, real_popen = [], subprocess.Popen
+
+    def popen(args, **kwargs):
+        launched.append(args)
+        return real_popen([sys.executable, "-c", "pass"])
+
+    monkeypatch.setattr(runner_module.subprocess, "Popen", popen)
+    return launched
+
+
+def test_status_only_reads(runner, launches, monkeypatch):
+    runner._update(desired="running")  # wanted, but nothing is running
+    monkeypatch.setattr(runner_module._FileLock, "acquire", lambda self: pytest.fail("status() took a lock"))
+    sub = event_bus.subscribe()
+    try:
+        assert runner.status()["state"] == "stopped"
+        assert runner.status()["state"] == "stopped"
+        assert launches == []
+        assert sub.get(timeout=0.1) is None
+    finally:
+        event_bus.unsubscribe(sub)
+
+
+def test_watchdog_relaunches_a_reader_that_should_run(runner, launches):
+    runner._update(desired="running")
+
+    assert runner.watch()["state"] == "starting"
+    assert runner.watch()["state"] == "starting"  # within the launch grace period
+    assert len(launches) == 1
+
+
+def test_start_launches_once_and_stop_is_recorded(runner, launches):
+    runner.start()
+    runner.start()
+    assert len(launches) == 1
+
+    runner.stop()
+    assert runner.status()["desired"] == "stopped"
+    runner.watch()
+    assert len(launches) == 1
+
+
+def test_single_reader_lock(runner):
+    lock = runner.acquire_reader_lock(wait=0)
+    try:
+        assert lock is not None
+        assert runner.acquire_reader_lock(wait=0) is None
+    finally:
+        lock.release()
+    runner.acquire_reader_lock(wait=0).release()
+
+
+def test_heartbeat_reports_liveness_and_stop_requests(runner):
+    runner.register()
+    runner._update(host="another-host")  # so stop() does not signal this process
+    assert runner.heartbeat() is True
+    assert runner.status()["state"] == "running"
+
+    runner._update(heartbeat_at=1.0)
+    assert runner.status()["state"] == "stopped"  # another host, no recent heartbeat
+
+    runner.stop()
+    assert runner.heartbeat() is False
+
+
+def test_crashed_reader_on_this_host_is_not_running(runner):
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    runner.register()
+    runner._update(pid=child.pid)
+    runner._update(heartbeat_at=1.0)
+    assert runner.status()["state"] == "stopped"
+
+    runner._update(pid=os.getpid())
+    assert runner.status()["state"] == "unresponsive"
+
+
+def test_dashboard_reads_the_status_once_per_request(client, monkeypatch):
+    from app import routes
+    calls = []
+    status = routes.automation_runner.status
+    monkeypatch.setattr(routes.automation_runner, "status", lambda: calls.append(1) or status())
+
+    assert client.get("/").status_code == 200
+    assert len(calls) == 1
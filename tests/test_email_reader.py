@@ -0,0 +1,149 @@
+import uuid
+
+import pytest
+
+import email_reader
+import ticket_manager
+from message_index import message_index
+from ticket_db import ticket_db
+from ticket_storage import ticket_storage
+from uid_checkpoint import uid_checkpoint
+
+
+def make_message(message_id, subject, extra=""):
+    return (
+        f"Message-ID: <{message_id}@customer.example>\r\n"
+        f"From: Ann <ann@customer.example>\r\n"
+        f"Subject: {subject}\r\n{extra}\r\n"
+        f"Hello, this is the body.\r\n"
+    ).encode()
+
+
+def tickets_with_subject(tag):
+    return [t for t in ticket_db.all_tickets() if tag in t["subject"]]
+
+
+@pytest.fixture
+def tag():
+    """Unique text for this test's subjects; every test shares the ticket database."""
+    return uuid.uuid4().hex[:10]
+
+
+def checkpoint(account):
+    return uid_checkpoint.load(f"{account['email']}/INBOX")
+
+
+def test_creates_one_ticket_per_message(imap_server, run_pass, account, tag):
+    for i in range(3):
+        imap_server.mailbox.add(make_message(f"{tag}-{i}", f"Printer {tag} {i}"))
+
+    assert run_pass() == 3
+    assert len(tickets_with_subject(tag)) == 3
+    assert all("\\Seen" in m["flags"] for m in imap_server.mailbox.messages)
+    assert checkpoint(account) == (1, 3)
+
+
+def test_duplicate_message_id_makes_one_ticket(imap_server, run_pass, tag):
+    imap_server.mailbox.add(make_message(tag, f"Printer {tag}"))
+    imap_server.mailbox.add(make_message(tag, f"Printer {tag}"))
+
+    assert run_pass() == 2
+    assert len(tickets_with_subject(tag)) == 1
+
+
+def test_reread_message_is_not_ticketed_again(imap_server, run_pass, account, tag):
+    imap_server.mailbox.add(make_message(tag, f"Printer {tag}"))
+    run_pass()
+
+    # As if marking it read failed: unread again and the checkpoint lost
+    imap_server.mailbox.messages[0]["flags"].clear()
+    uid_checkpoint.save(f"{account['email']}/INBOX", 1, 0)
+    run_pass()
+
+    assert len(tickets_with_subject(tag)) == 1
+    assert "\\Seen" in imap_server.mailbox.messages[0]["flags"]
+
+
+def test_reply_is_threaded_onto_its_ticket(imap_server, run_pass, tag):
+    imap_server.mailbox.add(make_message(tag, f"Printer {tag}"))
+    run_pass()
+    (ticket,) = tickets_with_subject(tag)
+
+    imap_server.mailbox.add(make_message(f"{tag}-re", f"Re: Printer {tag}",
+                                         f"In-Reply-To: <{tag}@customer.example>\r\n"))
+    run_pass()
+
+    assert len(tickets_with_subject(tag)) == 1
+    assert message_index.lookup([f"<{tag}-re@customer.example>"]) == {
+        f"<{tag}-re@customer.example>": ticket["id"]
+    }
+
+
+def test_checkpoint_stays_below_skipped_message(imap_server, run_pass, account, tag, monkeypatch):
+    for i in range(3):
+        imap_server.mailbox.add(make_message(f"{tag}-{i}", f"Printer {tag} {i}"))
+
+    fetch = email_reader.fetch_messages
+
+    def fetch_without_uid_2(mail, uids):
+        fetched = fetch(mail, uids)
+        fetched.pop(2, None)
+        return fetched
+
+    monkeypatch.setattr(email_reader, "fetch_messages", fetch_without_uid_2)
+    assert run_pass() == 2
+    assert checkpoint(account) == (1, 1)
+    assert "\\Seen" not in imap_server.mailbox.messages[1]["flags"]
+
+    monkeypatch.setattr(email_reader, "fetch_messages", fetch)
+    run_pass()
+    assert len(tickets_with_subject(tag)) == 3
+    assert checkpoint(account) == (1, 3)
+
+
+def test_failed_final_flush_keeps_batches_already_written(imap_server, run_pass, account, tag, monkeypatch):
+    for i in range(5):
+        imap_server.mailbox.add(make_message(f"{tag}-{i}", f"Printer {tag} {i}"))
+
+    # Batches of two: rows 1-2 and 3-4 are written inline, the flush of row 5 fails
+    monkeypatch.setattr(ticket_manager._writer, "batch_size", 2)
+    append = ticket_storage.append
+    calls = []
+
+    def flaky_append(rows):
+        calls.append(rows)
+        if len(calls) == 3:
+            raise RuntimeError("sheet unavailable")
+        return append(rows)
+
+    monkeypatch.setattr(ticket_storage, "append", flaky_append)
+    assert run_pass() == 4
+    assert len(tickets_with_subject(tag)) == 4
+    assert checkpoint(account) == (1, 4)
+    assert "\\Seen" not in imap_server.mailbox.messages[4]["flags"]
+
+    run_pass()
+    assert len(tickets_with_subject(tag)) == 5
+    assert checkpoint(account) == (1, 5)
+
+
+def test_skip_counts_are_forgotten_once_the_checkpoint_passes(imap_server, run_pass, account, tag, monkeypatch):
+    for i in range(3):
+        imap_server.mailbox.add(make_message(f"{tag}-{i}", f"Printer {tag} {i}"))
+    fetch = email_reader.fetch_messages
+    key = f"{account['email']}/INBOX"
+
+    def fetch_without_uid_2(mail, uids):
+        fetched = fetch(mail, uids)
+        fetched.pop(2, None)
+        return fetched
+
+    monkeypatch.setattr(email_reader, "fetch_messages", fetch_without_uid_2)
+    run_pass()
+    assert [k for k in email_reader._skip_counts if k[0] == key] == [(key, 1, 2)]
+
+    # Retried until given up; once the checkpoint is past UID 2 its count goes
+    for _ in range(email_reader.Config.SKIPPED_MESSAGE_RETRIES):
+        run_pass()
+    assert checkpoint(account) == (1, 3)
+    assert [k for k in email_reader._skip_counts if k[0] == key] == []
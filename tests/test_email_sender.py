@@ -0,0 +1,204 @@
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+import pytest
+
+import email_sender
+from config import Config
+from email_sender import CircuitBreaker, SmtpPool
+from fakes import FakeSmtpServer
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = FakeSmtpServer()
+    monkeypatch.setattr(Config, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(Config, "EMAIL_PASSWORD", None)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pool(smtp_server):
+    pool = SmtpPool(host="127.0.0.1", port=smtp_server.port, size=2)
+    connects = []
+    connect = pool._connect
+    pool._connect = lambda: connects.append(1) or connect()
+    pool.connects = connects
+    yield pool
+    pool.close()
+
+
+def message(n=0):
+    msg = MIMEText(f"Ticket {n}")
+    msg["From"], msg["To"], msg["Subject"] = "support@example.com", "c@example.com", f"Ticket {n}"
+    return msg
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_breaker_opens_after_repeated_failures_and_lets_one_trial_through():
+    breaker = CircuitBreaker("test", threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_success()
+    assert not breaker.is_open and breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker("test", threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_pool_reuses_one_connection(pool, smtp_server):
+    for n in range(5):
+        pool.send_message(message(n))
+
+    assert wait_for(lambda: smtp_server.messages == 5)
+    assert len(pool.connects) == 1
+
+
+class RefusingServer:
+    def __init__(self, error):
+        self.error, self.sent, self.closed = error, 0, False
+
+    def send_message(self, msg):
+        self.sent += 1
+        raise self.error
+
+    def quit(self):
+        self.closed = True
+
+
+def test_dropped_connection_is_retried_once_on_a_fresh_one(pool, smtp_server):
+    stale = RefusingServer(smtplib.SMTPServerDisconnected("Connection unexpectedly closed"))
+    pool._release(stale)
+
+    pool.send_message(message())
+
+    assert stale.sent == 1 and stale.closed
+    assert wait_for(lambda: smtp_server.messages == 1)
+    assert len(pool.connects) == 1
+
+
+def test_server_error_reply_is_not_resent(pool, smtp_server):
+    refused = RefusingServer(smtplib.SMTPRecipientsRefused({"c@example.com": (550, b"no such user")}))
+    pool._release(refused)
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send_message(message())
+    assert refused.sent == 1
+    assert pool.connects == []
+
+
+def test_reply_skips_gmail_while_its_breaker_is_open(monkeypatch, tmp_path):
+    token = tmp_path / "token.json"
+    token.write_text("{}")
+    monkeypatch.setattr(email_sender, "TOKEN_FILE", str(token))
+    monkeypatch.delenv("SENDGRID_API_KEY", raising=False)
+    monkeypatch.setitem(email_sender.breakers, "gmail", CircuitBreaker("Gmail API", threshold=1, cooldown=60))
+    monkeypatch.setitem(email_sender.breakers, "smtp", CircuitBreaker("SMTP", threshold=1, cooldown=60))
+    email_sender.breakers["gmail"].record_failure()
+    sent = []
+    monkeypatch.setattr(email_sender.smtp_pool, "send_message", sent.append)
+    monkeypatch.setattr(email_sender.gmail_client, "get", lambda: pytest.fail("Gmail was not skipped"))
+
+    assert email_sender.send_auto_reply("Ann (ann@example.com)", "Printer", "T-1") is True
+    assert sent[0]["To"] == "ann@example.com"
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service, self.callback, self.requests = service, callback, []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batches.append(len(self.requests))
+        for request_id, request in self.requests:
+            failed = request_id in self.service.failing
+            self.callback(request_id, None if failed else {"id": request_id}, RuntimeError("quota") if failed else None)
+
+
+class FakeGmail:
+    def __init__(self):
+        self.batches, self.failing = [], set()
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId, body):
+        return {"userId": userId, "body": body}
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+@pytest.fixture
+def gmail(monkeypatch, tmp_path):
+    token = tmp_path / "token.json"
+    token.write_text("{}")
+    monkeypatch.setattr(email_sender, "TOKEN_FILE", str(token))
+    monkeypatch.setitem(email_sender.breakers, "gmail", CircuitBreaker("Gmail API", threshold=3, cooldown=60))
+    service = FakeGmail()
+    email_sender.gmail_client.set_service(service)
+    yield service
+    email_sender.gmail_client.reset()
+
+
+def replies(count):
+    return [(f"c{n}@example.com", f"Subject {n}", f"T-{n}") for n in range(count)]
+
+
+def test_replies_go_out_in_gmail_batches(gmail, monkeypatch):
+    monkeypatch.setattr(Config, "GMAIL_BATCH_SIZE", 2)
+    monkeypatch.setattr(email_sender, "send_auto_reply", lambda *a, **k: pytest.fail("fell back needlessly"))
+
+    assert email_sender.send_auto_replies(replies(5)) == [True] * 5
+    assert gmail.batches == [2, 2, 1]
+
+
+def test_messages_the_batch_rejects_fall_back_one_by_one(gmail, monkeypatch):
+    batch = replies(3)
+    gmail.failing.add("1")  # the batch request_id is the reply's index
+    fallback = []
+    monkeypatch.setattr(email_sender, "send_auto_reply",
+                        lambda to, subject, tid, use_gmail=True: fallback.append((tid, use_gmail)) or True)
+
+    assert email_sender.send_auto_replies(batch) == [True, True, True]
+    assert fallback == [("T-1", False)]
+    assert not email_sender.breakers["gmail"].is_open
+
+
+def test_failed_batch_request_falls_back_and_counts_against_gmail(gmail, monkeypatch):
+    def broken(callback):
+        raise OSError("connection reset")
+    monkeypatch.setattr(gmail, "new_batch_http_request", broken)
+    fallback = []
+    monkeypatch.setattr(email_sender, "send_auto_reply",
+                        lambda to, subject, tid, use_gmail=True: fallback.append(tid) or True)
+
+    assert email_sender.send_auto_replies(replies(2)) == [True, True]
+    assert fallback == ["T-0", "T-1"]
+    assert email_sender.breakers["gmail"]._failures == 1
@@ -0,0 +1,70 @@
+import imaplib
+
+import pytest
+
+import email_reader
+from fakes import FakeImapServer
+
+
+class Stop(Exception):
+    pass
+
+
+@pytest.fixture
+def reader(monkeypatch, account):
+    """Run run_reader against a fake server until `passes` inbox checks are done."""
+    servers = []
+
+    def run(server, passes):
+        servers.append(server)
+        waits, checks, connects = [], [], []
+
+        def connect(acct, folder):
+            connects.append(folder)
+            mail = imaplib.IMAP4("127.0.0.1", server.port)
+            mail.login(acct["email"], "password")
+            mail.select(folder)
+            return mail
+
+        def on_pass(folder, processed, seconds):
+            checks.append(processed)
+            if len(checks) == passes:
+                raise Stop
+
+        monkeypatch.setattr(email_reader, "connect_to_mailbox", connect)
+        with pytest.raises(Stop):
+            email_reader.run_reader(account, ["INBOX"], on_pass=on_pass, wait=waits.append)
+        return waits, checks, connects
+
+    yield run
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_refused_fetch_reconnects_and_keeps_reading(reader, monkeypatch):
+    server = FakeImapServer(idle=False)
+    server.mailbox.add(b"Message-ID: <refused-fetch@example.com>\r\nSubject: Hi\r\n\r\nBody\r\n")
+    fetch, failures = email_reader.fetch_messages, []
+
+    def fetch_refused_twice(mail, uids):
+        if len(failures) < 2:
+            failures.append(uids)
+            raise imaplib.IMAP4.error("UID FETCH failed: [b'NO try later']")
+        return fetch(mail, uids)
+
+    monkeypatch.setattr(email_reader, "fetch_messages", fetch_refused_twice)
+    waits, checks, connects = reader(server, passes=1)
+
+    assert checks == [1]
+    assert len(connects) == 3
+    assert len(waits) == 2 and waits[0] < waits[1]  # backed off before each reconnect
+
+
+def test_rejected_idle_falls_back_to_polling(reader):
+    server = FakeImapServer(idle="reject")
+    waits, checks, connects = reader(server, passes=3)
+
+    assert checks == [0, 0, 0]
+    assert len(connects) == 1
+    assert waits == [email_reader.Config.POLL_INTERVAL] * 2
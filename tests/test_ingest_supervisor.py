@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ingest_supervisor import IngestSupervisor, load_mailboxes, mailbox_shards
+
+
+def test_shards_split_folders_per_worker(monkeypatch):
+    monkeypatch.setenv("BILLING_PASSWORD", "secret")
+    mailboxes = load_mailboxes(json.dumps([
+        {"email": "support@example.com", "folders": ["INBOX", "Billing", "Sales"], "folders_per_worker": 2},
+        {"email": "billing@example.com", "password_env": "BILLING_PASSWORD"},
+    ]))
+    shards = mailbox_shards(mailboxes)
+
+    assert [s["name"] for s in shards] == [
+        "support@example.com:INBOX+Billing", "support@example.com:Sales", "billing@example.com:INBOX",
+    ]
+    assert shards[2]["account"]["password"] == "secret"
+
+
+@pytest.mark.parametrize("raw,message", [
+    ("[{", "MAILBOXES_JSON is not valid JSON"),
+    ('{"email": "a@example.com"}', "must be a non-empty JSON list"),
+    ('[{"email": "a@example.com"}, {"password": "hunter2"}]', 'Mailbox #2 in MAILBOXES_JSON has no "email"'),
+    ('[{"email": "a@example.com", "folders_per_worker": "two"}]', "Mailbox #1 (a@example.com)"),
+    ('[{"email": "a@example.com", "folders": "INBOX"}]', '"folders" must be a list'),
+])
+def test_bad_entries_are_named(raw, message):
+    with pytest.raises(ValueError) as error:
+        load_mailboxes(raw)
+    assert message in str(error.value)
+    assert "hunter2" not in str(error.value)
+
+
+def test_malformed_mailboxes_do_not_break_importing_config():
+    env = {**os.environ, "MAILBOXES_JSON": "[{"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import config; print(config.Config.MAILBOXES_JSON)"],
+        env=env, cwd=os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"),
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[{"
+
+
+class ExitedProcess:
+    pid, exitcode = 4242, 1
+
+    def is_alive(self):
+        return False
+
+
+def test_crashed_worker_is_restarted_with_backoff(tmp_path, monkeypatch):
+    supervisor = IngestSupervisor(
+        shards=mailbox_shards(load_mailboxes('[{"email": "a@example.com"}]')),
+        status_file=str(tmp_path / "ingest.json"),
+    )
+    spawned = []
+    monkeypatch.setattr(supervisor, "_spawn", lambda w: spawned.append(w) or w.update(process=ExitedProcess(), started_at=0))
+    monkeypatch.setattr("ingest_supervisor.log_pipeline.listen", lambda q: None)
+    supervisor.start()
+    worker = supervisor._workers["a@example.com:INBOX"]
+
+    supervisor._check_workers()  # notices the exit, schedules a restart
+    assert len(spawned) == 1 and worker["process"] is None
+    worker["restart_at"] = 0
+    supervisor._check_workers()
+    assert len(spawned) == 2 and worker["restarts"] == 1
+
+    supervisor._stats_queue.put(("a@example.com:INBOX", 5, 2.0, 1.0))
+    supervisor._collect_stats(timeout=5)
+    supervisor.report()
+    stats = json.loads((tmp_path / "ingest.json").read_text())
+    assert stats["workers"]["a@example.com:INBOX"]["messages"] == 5
+    assert stats["total_messages"] == 5
@@ -0,0 +1,69 @@
+import json
+
+from config import Config
+from event_bus import EventBus, event_bus
+
+
+def test_every_subscriber_gets_each_event():
+    bus = EventBus()
+    a, b = bus.subscribe(), bus.subscribe()
+    event_id = bus.publish("ticket", {"id": "T-1"})
+
+    assert a.get(timeout=0) == (event_id, "ticket", {"id": "T-1"})
+    assert b.get(timeout=0) == (event_id, "ticket", {"id": "T-1"})
+    bus.unsubscribe(b)
+    bus.publish("stats", {})
+    assert a.get(timeout=0)[1] == "stats" and b.get(timeout=0) is None
+
+
+def test_full_queue_drops_the_oldest_event_without_blocking():
+    bus = EventBus(queue_size=2)
+    sub = bus.subscribe()
+    for n in range(3):
+        bus.publish("ticket", n)
+
+    assert sub.dropped == 1
+    assert [sub.get(timeout=0)[2] for _ in range(2)] == [1, 2]
+
+
+def test_subscribe_refuses_past_the_limit():
+    bus = EventBus()
+    first = bus.subscribe(limit=1)
+    assert bus.subscribe(limit=1) is None
+    bus.unsubscribe(first)
+    assert bus.subscribe(limit=1) is not None
+
+
+def parse(stream):
+    events = []
+    for block in stream.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_starts_with_a_snapshot_then_relays_events(client, monkeypatch):
+    monkeypatch.setattr(Config, "SSE_STREAM_SECONDS", 0.2)
+    monkeypatch.setattr(Config, "SSE_KEEPALIVE_SECONDS", 0.05)
+
+    response = client.get("/api/events", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    event_bus.publish("ticket", {"id": "T-42"})
+    events = parse(b"".join(response.response).decode())
+    response.close()
+
+    assert [kind for kind, _ in events] == ["status", "stats", "ticket"]
+    assert events[2][1] == {"id": "T-42"}
+    assert event_bus.subscriber_count() == 0
+
+
+def test_streams_past_the_cap_are_refused(client, monkeypatch):
+    monkeypatch.setattr(Config, "SSE_MAX_CLIENTS", 1)
+    held = event_bus.subscribe()
+    try:
+        response = client.get("/api/events")
+        assert response.status_code == 503
+        assert "/api/status" in response.get_json()["error"]
+    finally:
+        event_bus.unsubscribe(held)
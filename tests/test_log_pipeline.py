@@ -0,0 +1,60 @@
+import os
+
+from log_pipeline import tail_lines, read_new_lines
+
+
+def write(path, text, mode="a"):
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_tail_returns_last_complete_lines(tmp_path):
+    log = tmp_path / "app.log"
+    write(log, "".join(f"line {i}\n" for i in range(1000)) + "partial", "w")
+
+    lines, _ = tail_lines(str(log), 3, block_size=64)
+
+    assert lines == ["line 997", "line 998", "line 999"]
+
+
+def test_tail_of_short_file(tmp_path):
+    log = tmp_path / "app.log"
+    write(log, "only\n", "w")
+    assert tail_lines(str(log), 10)[0] == ["only"]
+
+
+def test_cursor_returns_only_new_lines(tmp_path):
+    log = tmp_path / "app.log"
+    write(log, "a\nb\n", "w")
+    _, cursor = tail_lines(str(log), 10)
+
+    write(log, "c\nd")  # "d" is still being written
+    lines, cursor, reset = read_new_lines(str(log), cursor)
+    assert (lines, reset) == (["c"], False)
+
+    write(log, "\ne\n")
+    lines, cursor, reset = read_new_lines(str(log), cursor)
+    assert (lines, reset) == (["d", "e"], False)
+
+    lines, _, reset = read_new_lines(str(log), cursor)
+    assert (lines, reset) == ([], False)
+
+
+def test_rotation_resets_the_cursor(tmp_path):
+    log = tmp_path / "app.log"
+    write(log, "old 1\nold 2\n", "w")
+    _, cursor = tail_lines(str(log), 10)
+
+    os.rename(log, tmp_path / "app.log.1")
+    write(log, "new 1\n", "w")
+    lines, _, reset = read_new_lines(str(log), cursor)
+
+    assert reset is True
+    assert lines == ["new 1"]
+
+
+def test_bad_cursor_falls_back_to_tail(tmp_path):
+    log = tmp_path / "app.log"
+    write(log, "x\ny\n", "w")
+    lines, _, reset = read_new_lines(str(log), "garbage", max_lines=1)
+    assert (lines, reset) == (["y"], True)
@@ -0,0 +1,77 @@
+import json
+import time
+
+from config import Config
+from metrics import MetricsRegistry
+
+
+def write_snapshot(directory, name, **fields):
+    data = {"pid": -1, "updated_at": time.time(), "stages": {}, "counters": {}}
+    data.update(fields)
+    (directory / f"{name}.json").write_text(json.dumps(data))
+
+
+def test_timer_records_latency_and_errors():
+    registry = MetricsRegistry()
+    with registry.timer("fetch"):
+        pass
+    try:
+        with registry.timer("fetch"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    with registry.timer("fetch") as t:
+        t.failed = True
+
+    stage = registry.snapshot()["stages"]["fetch"]
+    assert stage["count"] == 3 and stage["errors"] == 2
+    assert sum(stage["buckets"]) == 3
+
+
+def test_reader_snapshots_are_merged_with_this_process(tmp_path):
+    web, reader = MetricsRegistry(), MetricsRegistry()
+    web.observe("fetch", 0.002)
+    web.inc("tickets_created", 2)
+    reader.observe("fetch", 0.2, error=True)
+    reader.inc("tickets_created", 3)
+    reader.inc("replies_sent_smtp")
+    write_snapshot(tmp_path, "ingest-1", **{k: v for k, v in reader.snapshot().items() if k != "pid"})
+
+    report = web.report(str(tmp_path))
+
+    assert report["processes"] == 2
+    assert report["counters"] == {"replies_sent_smtp": 1, "tickets_created": 5}
+    assert report["stages"]["fetch"]["count"] == 2
+    assert report["stages"]["fetch"]["error_rate"] == 0.5
+
+
+def test_stale_and_unreadable_snapshots_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_RETENTION_SECONDS", 60)
+    write_snapshot(tmp_path, "old", updated_at=time.time() - 120, counters={"tickets_created": 7})
+    (tmp_path / "torn.json").write_text("{")
+
+    stages, counters, processes = MetricsRegistry().combined(str(tmp_path))
+    assert processes == 1 and counters == {}
+
+
+def test_own_exported_snapshot_is_not_counted_twice(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("tickets_created")
+    registry._write_snapshot(str(tmp_path / "web-self.json"))
+
+    assert registry.report(str(tmp_path))["counters"] == {"tickets_created": 1}
+
+
+def test_prometheus_histogram_is_cumulative(tmp_path):
+    registry = MetricsRegistry()
+    registry.observe("fetch", 0.003)
+    registry.observe("fetch", 0.3, error=True)
+    registry.inc("tickets_created", 4)
+
+    lines = registry.prometheus(str(tmp_path)).splitlines()
+    assert 'ticketing_stage_seconds_bucket{stage="fetch",le="0.005"} 1' in lines
+    assert 'ticketing_stage_seconds_bucket{stage="fetch",le="0.5"} 2' in lines
+    assert 'ticketing_stage_seconds_bucket{stage="fetch",le="+Inf"} 2' in lines
+    assert 'ticketing_stage_seconds_count{stage="fetch"} 2' in lines
+    assert 'ticketing_stage_errors_total{stage="fetch"} 1' in lines
+    assert 'ticketing_events_total{event="tickets_created"} 4' in lines
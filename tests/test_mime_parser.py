@@ -0,0 +1,64 @@
+import base64
+
+from config import Config
+from mime_parser import body_preview, decode_bytes, decode_mime_words, parse_message
+
+MULTIPART_HEADER = (
+    b"From: Ann <ann@example.com>\r\nSubject: Printer\r\nMIME-Version: 1.0\r\n"
+    b'Content-Type: multipart/mixed; boundary="b1"\r\n\r\n'
+)
+
+
+def part(content_type, body, extra=b""):
+    return b"--b1\r\nContent-Type: " + content_type + b"\r\n" + extra + b"\r\n" + body + b"\r\n"
+
+
+def test_plain_text_is_preferred_and_whitespace_collapsed():
+    text = (part(b"text/html", b"<p>HTML copy</p>")
+            + part(b"text/plain; charset=utf-8", b"The printer\r\n\r\n  is   jammed.")
+            + b"--b1--\r\n")
+    msg = parse_message(MULTIPART_HEADER, text)
+    assert body_preview(msg) == "The printer is jammed."
+
+
+def test_html_only_mail_is_stripped_of_tags_scripts_and_entities():
+    html = b"<html><style>p {color: red}</style><script>alert(1)</script><p>Fish &amp; chips</p></html>"
+    msg = parse_message(b"Content-Type: text/html; charset=utf-8\r\n\r\n", html)
+    assert body_preview(msg) == "Fish & chips"
+
+
+def test_attachments_are_never_previewed():
+    text = part(b"text/plain", b"secret.csv contents", b"Content-Disposition: attachment; filename=a.csv\r\n") + b"--b1--\r\n"
+    assert body_preview(parse_message(MULTIPART_HEADER, text)) == ""
+
+
+def test_body_cut_off_mid_part_still_yields_a_preview():
+    text = part(b"text/plain", b"Order 1234 never arrived and") + b"--b1\r\nContent-Type: image/png\r\n\r\n\x89PNG"
+    assert body_preview(parse_message(MULTIPART_HEADER, text)) == "Order 1234 never arrived and"
+
+
+def test_preview_is_limited_and_decoded(monkeypatch):
+    monkeypatch.setattr(Config, "BODY_PREVIEW_CHARS", 10)
+    body = base64.b64encode("Grüße aus München".encode("latin-1"))
+    header = b"Content-Type: text/plain; charset=iso-8859-1\r\nContent-Transfer-Encoding: base64\r\n\r\n"
+    assert body_preview(parse_message(header, body)) == "Grüße aus "
+    assert body_preview(parse_message(header, body), limit=5) == "Grüße"
+
+
+def test_headers_only_has_no_preview():
+    msg = parse_message(b"Subject: Hello\r\nContent-Type: text/plain\r\n\r\n")
+    assert msg["Subject"] == "Hello"
+    assert body_preview(msg) == ""
+
+
+def test_header_block_cut_by_the_fetch_limit_drops_its_partial_line(monkeypatch):
+    monkeypatch.setattr(Config, "MAIL_HEADER_MAX_BYTES", 40)
+    header = b"Subject: Refund\r\nFrom: ann@example.com\r\nX-Long: " + b"x" * 20
+    msg = parse_message(header[:40])
+    assert msg["Subject"] == "Refund" and msg["X-Long"] is None
+
+
+def test_unknown_charsets_and_bad_encoded_words_do_not_raise():
+    assert decode_bytes("café".encode(), "x-unknown-8bit") == "café"
+    assert decode_mime_words("=?UTF-8?B?Q2Fmw6k=?=") == "Café"
+    assert decode_mime_words("=?UTF-8?B?Q2Fmw6k=?= " + "a" * 50, limit=8) == "Café aaa"
@@ -0,0 +1,63 @@
+import threading
+
+import ticket_manager
+from ticket_storage import ticket_storage
+
+
+def test_not_modified_is_answered_without_rendering(client, monkeypatch):
+    from app import routes
+
+    first = client.get("/tickets", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["ETag"].strip('"')
+    assert first.status_code == 200
+
+    # A fresh worker: nothing cached, and the page must not be rendered
+    monkeypatch.setattr(routes, "_page_cache", routes.PageCache(10))
+    monkeypatch.setattr(routes, "query_tickets", lambda **_: 1 / 0)
+
+    for encoding in ("gzip", "identity"):
+        again = client.get("/tickets", headers={"Accept-Encoding": encoding, "If-None-Match": f'"{etag}"'})
+        assert again.status_code == 304
+        assert again.headers["ETag"] == f'"{etag}"'
+
+
+def test_changed_store_renders_again(client, monkeypatch):
+    etag = client.get("/tickets").headers["ETag"]
+    ticket_manager.add_ticket({"from": "a@example.com", "subject": "New printer", "status": "Open"})
+    ticket_manager.flush_tickets()
+
+    again = client.get("/tickets", headers={"If-None-Match": etag})
+    assert again.status_code == 200
+    assert again.headers["ETag"] != etag
+    assert b"New printer" in again.data
+
+
+def test_gzip_for_clients_that_accept_it(client):
+    plain = client.get("/tickets")
+    gzipped = client.get("/tickets", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gz"'
+
+
+def test_conditional_json_revalidates_with_gzip(client):
+    headers = {"Accept-Encoding": "gzip"}
+    stats = client.get("/api/stats", headers=headers)
+    again = client.get("/api/stats", headers={**headers, "If-None-Match": stats.headers["ETag"]})
+
+    assert again.status_code == 304
+    assert again.headers["ETag"] == stats.headers["ETag"]
+
+
+def test_dashboard_reads_do_not_wait_for_the_mirror(monkeypatch):
+    callers = []
+    monkeypatch.setattr(ticket_storage, "refresh", lambda max_age=None: callers.append(threading.current_thread()))
+    monkeypatch.setattr(ticket_manager, "_background_sync_at", 0.0)
+
+    ticket_manager.query_tickets()
+    ticket_manager.daily_summary("2026-10-18")
+    ticket_manager.ticket_counts_by_day()
+    ticket_manager._background_sync.join(5)
+
+    assert callers and threading.current_thread() not in callers
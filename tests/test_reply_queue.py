@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from config import Config
+from reply_queue import ReplyQueue, ReplyWorkerPool
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return ReplyQueue(path=str(tmp_path / "replies.db"))
+
+
+def run_pool(pool, queue, until, timeout=10):
+    pool.start()
+    deadline = time.monotonic() + timeout
+    try:
+        while not until() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        pool.stop()
+
+
+def test_each_reply_is_claimed_once(queue):
+    queue.enqueue_many([(f"c{i}@example.com", "Hi", f"T-{i}") for i in range(50)])
+    claimed, lock = [], threading.Lock()
+
+    def claim_all():
+        while True:
+            jobs = queue.claim(3)
+            if not jobs:
+                return
+            with lock:
+                claimed.extend(j["ticket_id"] for j in jobs)
+
+    threads = [threading.Thread(target=claim_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(f"T-{i}" for i in range(50))
+
+
+def test_failed_send_is_retried_with_backoff_then_given_up(queue, monkeypatch):
+    monkeypatch.setattr(Config, "REPLY_MAX_ATTEMPTS", 2)
+    queue.enqueue("c@example.com", "Hi", "T-1")
+
+    (job,) = queue.claim()
+    queue.retry(job, RuntimeError("smtp down"))
+    assert queue.claim() == []  # not due yet
+    assert queue.stats()["depth"] == 1
+
+    queue._connection().execute("UPDATE replies SET next_attempt_at = 0")
+    (job,) = queue.claim()
+    queue.retry(job, RuntimeError("smtp down"))
+    assert queue.stats() == {"depth": 0, "failed": 1, "oldest_age_seconds": 0}
+
+
+def test_replies_left_sending_are_recovered(queue):
+    queue.enqueue("c@example.com", "Hi", "T-1")
+    queue.claim()  # the process stopped before sending
+
+    assert queue.recover() == 1
+    assert [j["ticket_id"] for j in queue.claim()] == ["T-1"]
+
+
+def test_pool_sends_every_reply(queue, monkeypatch):
+    monkeypatch.setattr(Config, "REPLY_POLL_SECONDS", 0.05)
+    sent, lock = [], threading.Lock()
+
+    def send(to_email, subject, ticket_id):
+        with lock:
+            sent.append(ticket_id)
+        return True
+
+    queue.enqueue_many([(f"c{i}@example.com", "Hi", f"T-{i}") for i in range(20)])
+    run_pool(ReplyWorkerPool(queue, send, workers=4), queue, lambda: queue.stats()["depth"] == 0)
+
+    assert sorted(sent) == sorted(f"T-{i}" for i in range(20))
+
+
+def test_pool_batches_and_retries_only_the_failed_replies(queue, monkeypatch):
+    monkeypatch.setattr(Config, "REPLY_POLL_SECONDS", 0.05)
+    batches = []
+
+    def send_batch(replies):
+        batches.append([ticket_id for _, _, ticket_id in replies])
+        return [ticket_id != "T-3" for _, _, ticket_id in replies]
+
+    queue.enqueue_many([(f"c{i}@example.com", "Hi", f"T-{i}") for i in range(5)])
+    run_pool(ReplyWorkerPool(queue, lambda *a: True, workers=1, send_batch=send_batch), queue,
+             lambda: queue.stats()["depth"] == 1)
+
+    assert batches[0] == [f"T-{i}" for i in range(5)]
+    row = queue._connection().execute("SELECT ticket_id, attempts, last_error FROM replies").fetchone()
+    assert tuple(row) == ("T-3", 1, "all reply backends failed")
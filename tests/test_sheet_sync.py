@@ -0,0 +1,66 @@
+import pytest
+
+from config import Config
+from sheet_sync import SheetSync
+from ticket_db import TicketDB
+
+
+def row(n, status="Open"):
+    return [f"T-{n}", f"2026-10-1{n % 10} 09:00:00", f"user{n}@example.com", f"Subject {n}", status]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return TicketDB(path=str(tmp_path / "tickets.db"))
+
+
+@pytest.fixture
+def ranges_read(sheets, monkeypatch):
+    """Every A1 range read from the fake sheet, in order."""
+    read = []
+    get, batch_get = sheets.get, sheets.batchGet
+    monkeypatch.setattr(sheets, "get", lambda range, **kw: read.append(range) or get(range=range, **kw))
+    monkeypatch.setattr(sheets, "batchGet", lambda ranges, **kw: read.extend(ranges) or batch_get(ranges=ranges, **kw))
+    return read
+
+
+def test_incremental_sync_reads_only_new_rows(sheets, db, ranges_read, monkeypatch):
+    monkeypatch.setattr(Config, "MIRROR_STATUS_SCAN_INTERVAL", 3600)
+    sheets.rows += [row(i) for i in range(1, 6)]
+    sync = SheetSync(db)
+    assert sync.sync() == 5
+
+    sheets.rows += [row(6), row(7)]
+    ranges_read.clear()
+    assert sync.sync() == 2
+
+    assert ranges_read == ["Ticket Log!A1:E1", "Ticket Log!A6:E"]
+    assert [t["id"] for t in db.all_tickets()] == [f"T-{i}" for i in range(1, 8)]
+
+
+def test_rows_removed_above_trigger_a_full_resync(sheets, db):
+    sheets.rows += [row(i) for i in range(1, 6)]
+    sync = SheetSync(db)
+    sync.sync()
+
+    del sheets.rows[2]
+    sync.sync()
+    assert [t["id"] for t in db.all_tickets()] == ["T-1", "T-3", "T-4", "T-5"]
+
+
+def test_status_edits_in_the_sheet_wait_for_the_status_scan(sheets, db, ranges_read, monkeypatch):
+    monkeypatch.setattr(Config, "MIRROR_STATUS_SCAN_INTERVAL", 3600)
+    sheets.rows += [row(i) for i in range(1, 4)]
+    sync = SheetSync(db)
+    sync.sync()
+
+    sheets.rows[1][4] = "Closed"  # closed by hand in the sheet
+    sync.sync()
+    assert db.get_ticket("T-1")["status"] == "Open"
+
+    monkeypatch.setattr(Config, "MIRROR_STATUS_SCAN_INTERVAL", 0)
+    ranges_read.clear()
+    assert sync.sync() == 1
+    assert "Ticket Log!E2:E4" in ranges_read
+    assert db.get_ticket("T-1")["status"] == "Closed"
+    assert db.daily_summary("2026-10-11")["closed"] == 1
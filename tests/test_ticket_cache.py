@@ -0,0 +1,82 @@
+import threading
+
+import ticket_manager
+from metrics import metrics
+from ticket_manager import TicketCache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.release.wait(5)
+        self.calls += 1
+        return [{"id": f"T-{self.calls}"}]
+
+
+def wait_for_refresh(cache):
+    for thread in threading.enumerate():
+        if thread.name == "ticket-cache":
+            thread.join(5)
+
+
+def test_fresh_reads_are_hits():
+    loader = Loader()
+    cache = TicketCache(loader, ttl=60)
+
+    assert cache.get() == [{"id": "T-1"}]
+    assert cache.get() == [{"id": "T-1"}]
+    assert loader.calls == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+
+def test_expired_data_is_served_while_one_refresh_runs():
+    loader = Loader()
+    cache = TicketCache(loader, ttl=0)
+    cache.get()
+
+    loader.release.clear()
+    assert [cache.get() for _ in range(3)] == [[{"id": "T-1"}]] * 3
+    loader.release.set()
+    wait_for_refresh(cache)
+
+    assert loader.calls == 2
+    assert cache.stats()["stale_hits"] == 3
+    assert cache.get() == [{"id": "T-2"}]
+
+
+def test_invalidate_and_store_changes_trigger_a_refresh():
+    loader, version = Loader(), [1]
+    cache = TicketCache(loader, ttl=60, version=lambda: version[0])
+    cache.get()
+
+    cache.invalidate()
+    cache.get()
+    wait_for_refresh(cache)
+    assert loader.calls == 2
+
+    version[0] = 2  # another process wrote a ticket
+    cache.get()
+    wait_for_refresh(cache)
+    assert loader.calls == 3
+    assert cache.get() == [{"id": "T-3"}]
+
+
+def cache_reads():
+    counters = metrics.snapshot()["counters"]
+    return sum(counters.get(f"ticket_cache_{name}", 0) for name in ("hits", "stale_hits", "misses"))
+
+
+def test_add_ticket_invalidates_and_counters_reach_metrics():
+    before = cache_reads()
+    ticket_manager.fetch_all_tickets()
+    ticket_manager.add_ticket({"from": "a@example.com", "subject": "Cache me", "status": "Open"})
+    ticket_manager.flush_tickets()
+    ticket_manager.fetch_all_tickets()  # stale: served while the refresh runs
+    wait_for_refresh(ticket_manager._ticket_cache)
+
+    assert any(t["subject"] == "Cache me" for t in ticket_manager.fetch_all_tickets())
+    assert cache_reads() == before + 3
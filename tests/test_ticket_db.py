@@ -0,0 +1,59 @@
+import pytest
+
+from ticket_db import TicketDB
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = TicketDB(path=str(tmp_path / "tickets.db"))
+    rows = []
+    for i in range(40):
+        # Repeated timestamps, so paging has to break ties on the row number
+        rows.append([
+            f"T-{i:03d}",
+            f"2026-10-{10 + i % 5:02d} 09:{i % 3:02d}:00",
+            f"user{i % 4}@example.com",
+            f"Subject {i}",
+            "Closed" if i % 3 == 0 else "Open",
+        ])
+    db.append_rows(rows)
+    return db
+
+
+def all_pages(db, per_page, **filters):
+    pages, cursor = [], None
+    while True:
+        tickets, cursor = db.query_tickets(limit=per_page, cursor=cursor, **filters)
+        pages.append(tickets)
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("sort,order", [("timestamp", "desc"), ("timestamp", "asc"), ("from", "asc"), ("id", "desc")])
+def test_keyset_pages_cover_every_ticket_once_in_order(db, sort, order):
+    expected, _ = db.query_tickets(sort=sort, order=order, limit=1000)
+    pages = all_pages(db, 7, sort=sort, order=order)
+
+    assert [len(page) for page in pages[:-1]] == [7] * (len(pages) - 1)
+    assert [t["id"] for page in pages for t in page] == [t["id"] for t in expected]
+    assert len(expected) == 40
+
+
+def test_filters_apply_on_every_page(db):
+    pages = all_pages(db, 3, status="open", date_from="2026-10-11", date_to="2026-10-13", sender="user1")
+    tickets = [t for page in pages for t in page]
+
+    assert tickets
+    assert len({t["id"] for t in tickets}) == len(tickets)
+    for t in tickets:
+        assert t["status"] == "Open"
+        assert "2026-10-11" <= t["timestamp"][:10] <= "2026-10-13"
+        assert "user1" in t["from"]
+    expected = [i for i in range(40) if i % 3 and i % 4 == 1 and 11 <= 10 + i % 5 <= 13]
+    assert len(tickets) == len(expected)
+
+
+def test_last_page_has_no_cursor(db):
+    tickets, cursor = db.query_tickets(limit=40)
+    assert len(tickets) == 40
+    assert cursor is None
@@ -0,0 +1,61 @@
+import multiprocessing
+import re
+import threading
+
+from ticket_ids import TicketIdGenerator, new_ticket_id
+
+ID_PATTERN = re.compile(r"^T-\d{17}-[0-9a-f]{6}-\d{4}$")
+
+
+def _ids_from_child(count, queue):
+    queue.put([new_ticket_id() for _ in range(count)])
+
+
+def test_ids_are_unique_and_increasing_within_a_thread():
+    ids = [new_ticket_id() for _ in range(20000)]
+    assert all(ID_PATTERN.match(i) for i in ids[:10])
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+
+
+def test_ids_are_unique_across_threads():
+    generator = TicketIdGenerator()
+    results = [[] for _ in range(8)]
+
+    def make(bucket):
+        bucket.extend(generator.new_id() for _ in range(2000))
+
+    threads = [threading.Thread(target=make, args=(bucket,)) for bucket in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [i for bucket in results for i in bucket]
+    assert len(set(ids)) == len(ids)
+
+
+def test_ids_are_unique_across_processes():
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    children = [context.Process(target=_ids_from_child, args=(500, queue)) for _ in range(3)]
+    for child in children:
+        child.start()
+    ids = [i for _ in children for i in queue.get(timeout=60)]
+    for child in children:
+        child.join()
+
+    ids += [new_ticket_id() for _ in range(500)]
+    assert len(set(ids)) == len(ids)
+    assert len({i.split("-")[2] for i in ids}) == 4  # one node part per process
+
+
+def test_clock_stepping_back_keeps_ids_increasing(monkeypatch):
+    import ticket_ids
+    generator = TicketIdGenerator(node_id="abcdef")
+    clock = iter([2_000_000_000_000_000_000, 1_999_999_999_000_000_000, 2_000_000_000_000_000_000])
+    monkeypatch.setattr(ticket_ids.time, "time_ns", lambda: next(clock))
+
+    ids = [generator.new_id() for _ in range(3)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 3
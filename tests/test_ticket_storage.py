@@ -0,0 +1,73 @@
+import pytest
+
+from ticket_db import TicketDB
+from ticket_storage import MirroredStorage, SheetMirror, SqliteStorage
+
+
+def ticket(n, status="Open"):
+    return [f"T-{n}", f"2026-10-1{n % 10} 09:00:00", f"user{n}@example.com", f"Subject {n}", status]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return TicketDB(path=str(tmp_path / "tickets.db"))
+
+
+@pytest.fixture
+def mirrored(db, monkeypatch):
+    mirror = SheetMirror(db, interval=0, batch_size=100)
+    monkeypatch.setattr(mirror, "start", lambda: None)  # drained by hand below
+    return MirroredStorage(db, mirror)
+
+
+def drain(storage):
+    while storage.mirror.drain():
+        pass
+
+
+def test_local_tickets_go_after_rows_already_in_the_sheet(sheets, db, mirrored):
+    sheets.rows += [ticket(90), ticket(91)]
+    SqliteStorage(db).append([ticket(1), ticket(2)])  # created in sqlite-only mode
+
+    mirrored.load_all()
+    drain(mirrored)
+    assert [r[0] for r in sheets.rows] == ["ID", "T-90", "T-91", "T-1", "T-2"]
+
+    mirrored.set_status("T-1", "Closed")
+    mirrored.append([ticket(3)])
+    drain(mirrored)
+    assert sheets.rows[1] == ticket(90)
+    assert sheets.rows[3] == ticket(1, "Closed")
+    assert [r[0] for r in sheets.rows] == ["ID", "T-90", "T-91", "T-1", "T-2", "T-3"]
+
+
+def test_empty_sheet_gets_a_header_and_every_local_ticket(sheets, db, mirrored):
+    sheets.rows.clear()
+    SqliteStorage(db).append([ticket(1), ticket(2)])
+
+    mirrored.load_all()
+    drain(mirrored)
+    assert sheets.rows == [["ID", "Timestamp", "From", "Subject", "Status"], ticket(1), ticket(2)]
+
+
+def test_status_change_follows_the_ticket_when_the_sheet_was_sorted(sheets, db, mirrored):
+    sheets.rows += [ticket(1), ticket(2), ticket(3)]
+    mirrored.load_all()  # imports the sheet
+
+    sheets.rows[1:] = sorted(sheets.rows[1:], reverse=True)  # someone sorts by ID, Z-A
+    mirrored.set_status("T-3", "Closed")
+    drain(mirrored)
+
+    assert sheets.rows[1:] == [ticket(3, "Closed"), ticket(2), ticket(1)]
+
+
+def test_status_change_for_a_ticket_deleted_from_the_sheet_is_dropped(sheets, db, mirrored):
+    sheets.rows += [ticket(1), ticket(2)]
+    mirrored.load_all()
+
+    del sheets.rows[1]
+    mirrored.set_status("T-1", "Closed")
+    drain(mirrored)
+
+    assert sheets.rows[1:] == [ticket(2)]
+    assert db.sheet_backlog() == 0
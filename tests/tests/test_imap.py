@@ -1,8 +0,0 @@
-from src.email_reader import test_print_config
-
-def run_test():
-    print("Running simple config test...")
-    test_print_config()
-
-if __name__ == "__main__":
-    run_test()